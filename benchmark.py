@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+from pna import benchmark
+
+
+if __name__ == '__main__':
+    # usage: python benchmark.py [results.json] [scales] [repeat]
+    # e.g. python benchmark.py bench.json 1,10,100 5 - times the Logic
+    # methods and Dash callbacks on synthetic corpora of those scales (1 is
+    # about the size of the shipped corpus) and writes the results as JSON
+    path = sys.argv[1] if len(sys.argv) > 1 else 'benchmark.json'
+    scales = [float(s) for s in (
+        sys.argv[2] if len(sys.argv) > 2 else '1,10').split(',')]
+    repeat = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    results = benchmark.run(
+        scales, repeat=repeat, work_dir=os.environ.get('PNA_BENCH_DIR'))
+    with open(path, 'w') as f:
+        f.write(json.dumps(results, indent=2))
+    for result in results['results']:
+        print(f'scale {result["scale"]:g}:')
+        for kind in ['logic', 'callbacks']:
+            for name, timing in result.get(kind, {}).items():
+                print(f'  {kind:9} {name:60} '
+                      f'{timing["median"] * 1000:9.2f}ms')
+    print(f'Wrote {path}.')
@@ -0,0 +1,11 @@
+import sys
+
+from pna.logic import PhillipinesEmbassyLogic
+
+
+if __name__ == '__main__':
+    # usage: python build_bundle.py [bundle_dir] [data_dir]
+    bundle_dir = sys.argv[1] if len(sys.argv) > 1 else 'data/ph_bundle'
+    data_dir = sys.argv[2] if len(sys.argv) > 2 else 'data'
+    print(f'Building corpus bundle {bundle_dir} from {data_dir}.')
+    PhillipinesEmbassyLogic.build_bundle(bundle_dir, data_dir=data_dir)
@@ -0,0 +1,24 @@
+import sys
+
+import pandas as pd
+
+from pna.dbi import Dbi
+
+
+if __name__ == '__main__':
+    # usage: python import_labels.py labels.csv|xlsx [narratives.csv|xlsx]
+    # bulk adds narrative labels (narrative_code, annotator and text columns)
+    # and, first, any narratives they need (code and description columns)
+    def read(path):
+        if path.endswith(('.xls', '.xlsx')):
+            return pd.read_excel(path, dtype=str)
+        return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    dbi = Dbi()
+    if len(sys.argv) > 2:
+        narratives = read(sys.argv[2])
+        added = dbi.narratives.create_many(narratives)
+        print(f'Added {added} of {len(narratives)} narratives.')
+    labels = read(sys.argv[1])
+    added = dbi.narrative_labels.create_many(labels)
+    print(f'Added {added} narrative labels.')
@@ -0,0 +1,23 @@
+import json
+import sys
+
+import pandas as pd
+
+from pna.dbi import Dbi
+from pna.logic import PhillipinesEmbassyLogic
+
+
+if __name__ == '__main__':
+    # usage: python ingest.py tweets.json[l] [bundle_dir]
+    # adds annotated tweets (see pna/ingest.py for the fields) to the corpus
+    # bundle - a running app picks the new bundle up by itself
+    path = sys.argv[1]
+    bundle_dir = sys.argv[2] if len(sys.argv) > 2 else 'data/ph_bundle'
+    with open(path) as f:
+        if path.endswith('.jsonl'):
+            tweets = [json.loads(line) for line in f if line.strip()]
+        else:
+            tweets = json.loads(f.read())
+    logic = PhillipinesEmbassyLogic(Dbi(), bundle_dir=bundle_dir)
+    added = logic.ingest(pd.DataFrame(tweets))
+    print(f'Added {added} of {len(tweets)} tweets to {bundle_dir}.')
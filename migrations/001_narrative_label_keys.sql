@@ -0,0 +1,24 @@
+-- narrative_label: surrogate key and indexes (see schema.sql), for databases
+-- made before them. Safe to run more than once:
+--   psql -h $PGSQL_HOST -U $PGSQL_USERNAME -d $PGSQL_DB \
+--       -f migrations/001_narrative_label_keys.sql
+
+ALTER TABLE narrative_label
+    ADD COLUMN IF NOT EXISTS id BIGSERIAL PRIMARY KEY;
+
+CREATE INDEX IF NOT EXISTS narrative_label_narrative_code_idx
+    ON narrative_label (narrative_code, id);
+CREATE INDEX IF NOT EXISTS narrative_label_annotator_idx
+    ON narrative_label (annotator, id);
+CREATE INDEX IF NOT EXISTS narrative_label_text_idx
+    ON narrative_label USING hash (text);
+
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX IF NOT EXISTS narrative_label_text_trgm_idx
+        ON narrative_label USING gin (text gin_trgm_ops);
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'No trigram index on narrative_label.text: %', SQLERRM;
+END
+$$;
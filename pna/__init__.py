@@ -1,23 +1,86 @@
+from typing import Optional, Union
+
 from flask import Flask
 
 from pna.config import Config
+from pna.corpora import Corpora
+from pna.executor import Executor
+from pna.figures import FigureCache
 from pna.logic import Logic
+from pna.metrics import Metrics
+from pna.startup import Startup
+from pna.store import MemoryStore, ResultStore
 
 
 class PropagandaNarrativeAnalysis(Flask):
 
-    def set_logic(self, logic: Logic):
-        self.logic = logic
+    def set_corpora(self, corpora: Corpora):
+        self.corpora = corpora
+        self.dbi = corpora.dbi
+
+    def set_store(self, store: ResultStore):
+        self.store = store
+
+    def set_figures(self, figures: FigureCache):
+        self.figures = figures
+
+    def set_executor(self, executor: Executor):
+        self.executor = executor
 
+    def set_metrics(self, metrics: Metrics):
+        self.metrics = metrics
 
-def init_app(logic: Logic):
+    def set_startup(self, startup: Startup):
+        self.startup = startup
+
+    def warm_up(self):
+        # loads the default corpus, if not yet done, and declares the app
+        # ready - safe to run in the background while requests are served
+        if self.startup.ready:
+            return
+        with self.startup.phase('corpus'):
+            self.corpora.get()
+        self.startup.finish()
+
+
+def init_app(corpora: Union[Corpora, Logic],
+             store: Optional[ResultStore] = None,
+             figures: Optional[FigureCache] = None,
+             executor: Optional[Executor] = None,
+             metrics: Optional[Metrics] = None,
+             startup: Optional[Startup] = None):
+    # - startup: what (for /ready) needs warm_up() before the app is ready;
+    #   without one the app is ready as made
     app = PropagandaNarrativeAnalysis(
         __name__, static_url_path='/pna/pna/static')
     app.config.from_object(Config)
-    app.set_logic(logic)
+    if isinstance(corpora, Logic):
+        corpora = Corpora.of(corpora)
+    app.set_corpora(corpora)
+    app.set_store(store if store is not None else MemoryStore())
+    app.set_figures(figures if figures is not None else FigureCache())
+    corpora.on_evict(app.figures.forget)
+    app.set_executor(executor if executor is not None else Executor())
+    app.set_metrics(metrics if metrics is not None else Metrics())
+    app.set_startup(startup if startup is not None else Startup(ready=True))
+    app.metrics.gauges('pna_startup', app.startup.stats)
+    app.metrics.gauges('pna_corpora', app.corpora.stats)
+    app.metrics.gauges('pna_executor', app.executor.stats)
+    app.metrics.gauges('pna_figures', app.figures.stats)
+    if app.dbi is not None:
+        app.metrics.gauges('pna_db_pool', app.dbi.narratives.pool.stats)
+        for name in ['narratives', 'narrative_labels']:
+            app.metrics.gauges('pna_db_cache', getattr(app.dbi, name).stats,
+                               repository=name)
+
+    @app.before_request
+    def refresh_logic():
+        # serve corpus updates ingested by other processes
+        corpora.refresh()
 
     with app.app_context():
-        from . import routes
+        from .routes import routes
+        app.register_blueprint(routes)
 
         from .plotlydash import init_dashboard
         app = init_dashboard(app)
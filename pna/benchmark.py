@@ -0,0 +1,250 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pna import init_app, synthetic
+from pna.cache import CachedLogic
+from pna.corpora import Corpora
+from pna.dbi import Dbi
+from pna.logic import Logic, PhillipinesEmbassyLogic
+
+
+# Times the Logic methods, and every Dash callback end to end (a request to
+# the app, as the browser would make it), on synthetic corpora of a few
+# sizes - see pna.synthetic and benchmark.py.
+#
+# Each case is run `repeat` times. Its first run is reported apart as well,
+# since that is the one paying for loading and caching (the callbacks run on
+# a CachedLogic, as they are deployed).
+
+DASH_PREFIX = '/propaganda_analysis/'
+# the components of the callbacks using the database (narratives and their
+# labels), left out so the benchmark is of the corpus and runs without one
+SKIP = ('narrative_list', 'narrative_tag_code', 'tagged_data',
+        'tagged_narrative_table')
+
+
+def timings(fn: Callable[[], Any], repeat: int = 5) -> Dict[str, float]:
+    seconds = []
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - started)
+    return dict(
+        first=seconds[0],
+        min=min(seconds),
+        median=statistics.median(seconds),
+        max=max(seconds),
+        runs=len(seconds))
+
+
+def logic_cases(logic: Logic,
+                entity: str,
+                keywords: List[str],
+                start: str,
+                end: str) -> Dict[str, Callable[[], Any]]:
+    entities = list(logic.entity_counts().Entity[:5])
+    return {
+        'entity_counts': logic.entity_counts,
+        'date_range': logic.date_range,
+        'corpus_volume_over_time': logic.corpus_volume_over_time,
+        'corpus_volume_over_time[window]':
+            lambda: logic.corpus_volume_over_time(start, end),
+        'liwc_over_time': logic.liwc_over_time,
+        'liwc_over_time[window]': lambda: logic.liwc_over_time(start, end),
+        'entity_counts_over_time':
+            lambda: logic.entity_counts_over_time(entity),
+        'entity_counts_over_time[window]':
+            lambda: logic.entity_counts_over_time(entity, start, end),
+        'in_vocab': lambda: logic.in_vocab(entity),
+        'vector_neighbourhood': lambda: logic.vector_neighbourhood(entity),
+        'vector_neighbourhoods':
+            lambda: logic.vector_neighbourhoods(entities),
+        'liwc_profile': lambda: logic.liwc_profile(entity),
+        'liwc_profiles[window,combine]':
+            lambda: logic.liwc_profiles(entities, start, end, combine=True),
+        'sentences': lambda: logic.sentences(entity),
+        'sentences[window]': lambda: logic.sentences(entity, start, end),
+        'search_sentences[any]':
+            lambda: logic.search_sentences(entity, keywords),
+        'search_sentences[all]':
+            lambda: logic.search_sentences(entity, keywords, match_all=True),
+        'iter_sentences': lambda: list(logic.iter_sentences(entity)),
+    }
+
+
+class DashClient:
+    # calls the app's callbacks over its test client, as listed by Dash
+
+    def __init__(self, app, prefix: str = DASH_PREFIX):
+        self.client = app.test_client()
+        self.url = f'{prefix}_dash-update-component'
+        response = self.client.get(f'{prefix}_dash-dependencies')
+        self.callbacks = json.loads(response.data)
+
+    @staticmethod
+    def outputs(callback: Dict) -> List[str]:
+        # 'id.property' of each output
+        output = callback['output']
+        if output.startswith('..'):
+            return output[2:-2].split('...')
+        return [output]
+
+    def call(self,
+             callback: Dict,
+             values: Dict[str, Any]) -> Tuple[int, Dict, int]:
+        # status, response and its size in bytes - with the inputs and state
+        # taken from `values` (by 'id.property', None if missing)
+        def props(deps):
+            return [dict(id=d['id'], property=d['property'],
+                         value=values.get(f'{d["id"]}.{d["property"]}'))
+                    for d in deps]
+
+        outputs = [dict(zip(('id', 'property'), o.split('.', 1)))
+                   for o in self.outputs(callback)]
+        first = callback['inputs'][0]
+        body = dict(
+            output=callback['output'],
+            outputs=outputs if callback['output'].startswith('..')
+            else outputs[0],
+            inputs=props(callback['inputs']),
+            state=props(callback['state']),
+            changedPropIds=[f'{first["id"]}.{first["property"]}'])
+        response = self.client.post(self.url, json=body)
+        if response.status_code != 200:
+            return response.status_code, {}, len(response.data)
+        return 200, json.loads(response.data)['response'], len(response.data)
+
+    def ordered(self) -> List[Dict]:
+        # the callbacks, each after those making its inputs
+        made_by = {o: i for i, c in enumerate(self.callbacks)
+                   for o in self.outputs(c)}
+        pending, done, ordered = list(range(len(self.callbacks))), set(), []
+        while pending:
+            ready = [i for i in pending if all(
+                made_by.get(f'{d["id"]}.{d["property"]}', i) in done | {i}
+                for d in self.callbacks[i]['inputs'])]
+            for i in ready or pending[:1]:
+                pending.remove(i)
+                done.add(i)
+                ordered.append(self.callbacks[i])
+        return ordered
+
+
+def callback_timings(app,
+                     values: Dict[str, Any],
+                     repeat: int = 5) -> Dict[str, Dict]:
+    # every callback, fed the outputs of those before it, as a page would
+    client = DashClient(app)
+    values = dict(values)
+    results = {}
+    for callback in client.ordered():
+        outputs = client.outputs(callback)
+        if any(o.split('.', 1)[0] in SKIP for o in outputs):
+            continue
+        name = ','.join(outputs)
+        calls = []
+        result = timings(lambda: calls.append(client.call(callback, values)),
+                         repeat)
+        status, response, size = calls[-1]
+        for component, props in response.items():
+            for prop, value in props.items():
+                values[f'{component}.{prop}'] = value
+        results[name] = dict(status=status, bytes=size, **result)
+    return results
+
+
+def dashboard_values(corpus: str,
+                     entity: str,
+                     keywords: List[str]) -> Dict[str, Any]:
+    # what a user would have entered, by 'id.property'
+    return {
+        'document_set.value': corpus,
+        'initialize.n_clicks': 1,
+        'update_word_selection.n_clicks': 1,
+        'word_for_vectors.value': entity,
+        'find_sentences.n_clicks': 1,
+        'keywords_for_sentences.value': ', '.join(keywords),
+        'keyword_match.value': 'any',
+        'sentences_table.page_current': 0,
+        'sentences_table.page_size': 10,
+        'sentences_table.sort_by': [],
+        'sentences_table.filter_query': '',
+        'tagged_narrative_table.page_current': 0,
+        'tagged_narrative_table.page_size': 10,
+        'tagged_narrative_table.sort_by': [],
+        'tagged_narrative_table.filter_query': '',
+    }
+
+
+def run_scale(scale: float,
+              repeat: int = 5,
+              work_dir: Optional[str] = None,
+              dbi: Optional[Dbi] = None,
+              callbacks: bool = True) -> Dict:
+    # generates a corpus of the given scale and benchmarks it
+    with tempfile.TemporaryDirectory(dir=work_dir) as data_dir:
+        sizes = synthetic.sizes(scale)
+        started = time.perf_counter()
+        synthetic.write_corpus(data_dir, **sizes)
+        generate = time.perf_counter() - started
+        bundle_dir = os.path.join(data_dir, 'bundle')
+        started = time.perf_counter()
+        PhillipinesEmbassyLogic.build_bundle(bundle_dir, data_dir)
+        build = time.perf_counter() - started
+        dbi = dbi if dbi is not None else Dbi()
+        started = time.perf_counter()
+        logic = PhillipinesEmbassyLogic(
+            dbi, bundle_dir=bundle_dir, data_dir=data_dir)
+        load = time.perf_counter() - started
+
+        # the most mentioned entity, and a common and a rarer word
+        entity = str(logic.entity_counts().Entity.iloc[0])
+        keywords = ['word0', f'word{sizes["words"] // 10}']
+        # and the later half of the corpus for a window
+        first, last = (np.datetime64(d) for d in logic.date_range())
+        start, end = str(first + (last - first) // 2), str(last)
+        result = dict(
+            scale=scale,
+            sizes=sizes,
+            setup=dict(generate=generate, build_bundle=build, load=load),
+            nbytes=logic.nbytes(),
+            logic={name: timings(fn, repeat) for name, fn in logic_cases(
+                logic, entity, keywords, start, end).items()})
+        if callbacks:
+            corpora = Corpora.of(CachedLogic(logic), label='Synthetic')
+            app = init_app(corpora)
+            result['callbacks'] = callback_timings(
+                app, dashboard_values('default', entity, keywords), repeat)
+        return result
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(scales: List[float],
+        repeat: int = 5,
+        work_dir: Optional[str] = None,
+        callbacks: bool = True) -> Dict:
+    return dict(
+        created=datetime.now(timezone.utc).isoformat(),
+        commit=_commit(),
+        python=platform.python_version(),
+        machine=platform.machine(),
+        repeat=repeat,
+        results=[run_scale(scale, repeat, work_dir, callbacks=callbacks)
+                 for scale in scales])
@@ -0,0 +1,381 @@
+import fcntl
+import json
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+
+# A bundle is a directory of .npy files - one per column - plus a manifest.
+# Columns are loaded memory-mapped, so boot cost doesn't grow with the corpus
+# and forked workers share the same pages. Object arrays can't be mapped, so
+# a column of strings (text) is stored as its utf-8 bytes, one after the
+# other, plus the int64 offsets of each row's - rather than fixed-width,
+# where every row would take as much room as the longest.
+#
+# Columns that repeat a few strings over and over (entity names, categories)
+# can be stored as int32 codes into a dictionary - the sorted distinct
+# strings - shared by all the columns coded with it, so the same entity has
+# the same code in every table. And dates that are whole days are stored as
+# int32 days since 1970-01-01. The dictionaries (and grouped tables' keys)
+# are distinct strings, so those are stored fixed-width. column() gives the
+# stored values, values() and frame() the decoded ones.
+#
+# A bundle at `path` is a symlink to a directory of one version of it
+# (`path`.<id>), written in a directory of its own and published by
+# replacing the symlink - so readers see either the old or the new version,
+# never a mix. A Bundle pins the version it opened, and the previous version
+# is kept for readers still mapping its files lazily; older ones are
+# removed.
+
+MANIFEST = 'manifest.json'
+# bumped on every change to the layout, so older bundles get rebuilt rather
+# than misread:
+#   2: the bundle id, grouped tables' __keys__ / __offsets__ columns
+#   3: 'arrays' (matrices) in the manifest
+#   4: dictionary coded and int32 day columns
+#   5: text columns as utf-8 bytes and offsets
+VERSION = 5
+
+Rows = Optional[Union[slice, np.ndarray]]
+
+
+def date_window(dates: np.ndarray, start=None, end=None) -> slice:
+    # the rows of `dates` (datetime64, ascending) from start to end - both
+    # inclusive days, None for no limit - by binary search
+    # (or days, as stored in a bundle)
+    lo, hi = 0, len(dates)
+    if start is not None:
+        start = _day(np.datetime64(start, 'D'), dates.dtype)
+        lo = int(np.searchsorted(dates, start, side='left'))
+    if end is not None:
+        # up to the start of the next day
+        end = _day(np.datetime64(end, 'D') + 1, dates.dtype)
+        hi = int(np.searchsorted(dates, end, side='left'))
+    return slice(lo, max(lo, hi))
+
+
+def _day(day: np.datetime64, dtype: np.dtype):
+    if np.issubdtype(dtype, np.integer):
+        return day.astype(np.int64)
+    return day.astype(dtype)
+
+
+def _column_file(table: str, column: str) -> str:
+    return f'{table}.{column}.npy'
+
+
+def _dictionary_file(name: str) -> str:
+    return f'__dictionary__.{name}.npy'
+
+
+def _offsets(column: str) -> str:
+    # the column of a text column's offsets
+    return f'{column}.__offsets__'
+
+
+def _to_array(series: pd.Series) -> np.ndarray:
+    if series.dtype == object:
+        return np.asarray(series.astype(str).values, dtype=str)
+    return np.ascontiguousarray(series.values)
+
+
+def _to_text(series: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    # utf-8 bytes, and the n + 1 offsets of each string's in them
+    encoded = [s.encode('utf-8') for s in series.astype(str)]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _from_text(data: np.ndarray,
+               offsets: np.ndarray,
+               rows: Rows = None) -> np.ndarray:
+    index = np.arange(len(offsets) - 1)
+    if rows is not None:
+        index = index[rows]
+    data = memoryview(data)
+    return np.array(
+        [str(data[start:end], 'utf-8') for start, end
+         in zip(offsets[index].tolist(), offsets[index + 1].tolist())],
+        dtype=object)
+
+
+def _table_columns(info: Dict) -> List[str]:
+    # all the columns of a table's files
+    return info['columns'] + [_offsets(c) for c in info['texts']] + (
+        ['__keys__', '__offsets__'] if info['key'] is not None else [])
+
+
+def _to_days(values: np.ndarray) -> Optional[np.ndarray]:
+    # datetime64 values as int32 days, if they are all whole days
+    if not np.issubdtype(values.dtype, np.datetime64):
+        return None
+    days = values.astype('datetime64[D]')
+    if not (days == values).all():
+        return None
+    return days.astype(np.int64).astype(np.int32)
+
+
+def _link(from_path: str, to_path: str, file: str) -> None:
+    try:
+        os.link(os.path.join(from_path, file), os.path.join(to_path, file))
+    except OSError:
+        shutil.copyfile(
+            os.path.join(from_path, file), os.path.join(to_path, file))
+
+
+def write_bundle(path: str,
+                 tables: Dict[str, pd.DataFrame],
+                 groups: Optional[Dict[str, str]] = None,
+                 arrays: Optional[Dict[str, np.ndarray]] = None,
+                 meta: Optional[Dict] = None,
+                 dictionaries: Optional[Dict[str, List[str]]] = None,
+                 base: Optional['Bundle'] = None) -> None:
+    # `groups` maps a table to a key column: rows are (stably) grouped by key
+    # and the key -> row range offsets are written alongside, which is how
+    # dict-of-lists data (e.g. entity -> sentences) is stored. `arrays` are
+    # stored as they are, e.g. matrices. `dictionaries` maps a dictionary
+    # name to the 'table.column's coded with it. The tables and arrays of
+    # `base` not given are carried over as they are, hard-linked (or copied)
+    # rather than rewritten - they can't be dictionary coded, as the
+    # dictionaries are made anew.
+    groups = groups or {}
+    arrays = arrays or {}
+    coded = {}
+    for name, columns in (dictionaries or {}).items():
+        for table_column in columns:
+            table, column = table_column.split('.', 1)
+            if table in tables:
+                coded[(table, column)] = name
+    parent, name = os.path.split(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=parent, prefix=f'{name}.tmp-')
+    os.chmod(tmp_path, 0o755)
+
+    # the id changes on every build, so anything derived from a bundle can
+    # tell when it is stale
+    manifest = dict(
+        version=VERSION, id=uuid.uuid4().hex, meta=meta or {}, tables={},
+        arrays={}, dictionaries={})
+    values, texts, sorted_tables = {}, {}, {}
+    for name, df in tables.items():
+        key = groups.get(name)
+        if key is not None:
+            df = df.sort_values(by=key, kind='stable')
+        sorted_tables[name] = df
+        for column in df.columns:
+            if df[column].dtype == object and (name, column) not in coded:
+                texts[(name, column)] = _to_text(df[column])
+            else:
+                values[(name, column)] = _to_array(df[column])
+    for name in dict.fromkeys(coded.values()):
+        dictionary = np.unique(np.concatenate(
+            [np.empty(0, dtype=str)]
+            + [values[c] for c, d in coded.items() if d == name]))
+        np.save(os.path.join(tmp_path, _dictionary_file(name)), dictionary)
+        manifest['dictionaries'][name] = len(dictionary)
+        for c, d in coded.items():
+            if d == name:
+                values[c] = np.searchsorted(dictionary, values[c]) \
+                    .astype(np.int32)
+
+    for name, df in sorted_tables.items():
+        key = groups.get(name)
+        info = dict(rows=len(df), columns=list(df.columns), key=key,
+                    codes={}, days=[], texts=[])
+        for column in df.columns:
+            if (name, column) in texts:
+                data, offsets = texts[(name, column)]
+                info['texts'].append(column)
+                np.save(os.path.join(tmp_path, _column_file(name, column)),
+                        data)
+                np.save(os.path.join(
+                    tmp_path, _column_file(name, _offsets(column))), offsets)
+                continue
+            array = values[(name, column)]
+            days = _to_days(array)
+            if (name, column) in coded:
+                info['codes'][column] = coded[(name, column)]
+            elif days is not None:
+                array = days
+                info['days'].append(column)
+            np.save(os.path.join(tmp_path, _column_file(name, column)), array)
+        if key is not None:
+            keys, starts = np.unique(_to_array(df[key]), return_index=True)
+            offsets = np.append(starts, len(df)).astype(np.int64)
+            np.save(os.path.join(tmp_path, _column_file(name, '__keys__')),
+                    keys)
+            np.save(os.path.join(tmp_path, _column_file(name, '__offsets__')),
+                    offsets)
+        manifest['tables'][name] = info
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'),
+                np.ascontiguousarray(array))
+        manifest['arrays'][name] = dict(
+            shape=list(array.shape), dtype=str(array.dtype))
+    if base is not None:
+        for name, info in base.manifest['tables'].items():
+            if name in tables:
+                continue
+            if info['codes']:
+                raise ValueError(f'Table "{name}" is dictionary coded, so '
+                                 f'can\'t be carried over.')
+            for column in _table_columns(info):
+                _link(base.path, tmp_path, _column_file(name, column))
+            manifest['tables'][name] = info
+        for name, info in base.manifest['arrays'].items():
+            if name not in arrays:
+                _link(base.path, tmp_path, f'{name}.npy')
+                manifest['arrays'][name] = info
+
+    with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+        f.write(json.dumps(manifest, indent=2))
+    _publish(path, tmp_path, manifest['id'])
+
+
+def _publish(path: str, tmp_path: str, id: str) -> None:
+    parent, name = os.path.split(os.path.abspath(path))
+    parent = os.path.realpath(parent)
+    version_path = os.path.join(parent, f'{name}.{id}')
+    # one writer at a time publishes and clears out old versions, so none
+    # removes a version another is publishing
+    with open(os.path.join(parent, f'{name}.versions.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        os.rename(tmp_path, version_path)
+        previous = os.path.realpath(path) if os.path.islink(path) else None
+        if os.path.isdir(path) and not os.path.islink(path):
+            # a bundle written before versions were - moved aside once
+            shutil.rmtree(path)
+        link = f'{version_path}.link'
+        os.symlink(os.path.basename(version_path), link)
+        os.replace(link, path)
+        # older versions go, but not the previous one: readers may still be
+        # mapping its files
+        keep = {version_path, previous}
+        versions = re.compile(re.escape(name) + r'\.[0-9a-f]{32}$')
+        for entry in os.listdir(parent):
+            entry_path = os.path.join(parent, entry)
+            if versions.match(entry) and entry_path not in keep:
+                shutil.rmtree(entry_path, ignore_errors=True)
+
+
+class Bundle:
+
+    def __init__(self, path: str):
+        # the version it links to now, whatever is published later
+        self.path = os.path.realpath(path)
+        with open(os.path.join(self.path, MANIFEST)) as f:
+            self.manifest = json.loads(f.read())
+        if self.manifest['version'] != VERSION:
+            raise ValueError(f'Bundle version {self.manifest["version"]} at '
+                             f'{path} is not supported - please rebuild.')
+        self._columns = {}
+        self._groups = {}
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        # only counts bundles in the current format, so older ones get rebuilt
+        try:
+            with open(os.path.join(path, MANIFEST)) as f:
+                return json.loads(f.read())['version'] == VERSION
+        except FileNotFoundError:
+            return False
+
+    @property
+    def id(self) -> str:
+        return self.manifest['id']
+
+    @property
+    def meta(self) -> Dict:
+        return self.manifest['meta']
+
+    def tables(self) -> List[str]:
+        return list(self.manifest['tables'].keys())
+
+    def columns(self, table: str) -> List[str]:
+        return self.manifest['tables'][table]['columns']
+
+    def rows(self, table: str) -> int:
+        return self.manifest['tables'][table]['rows']
+
+    def column(self, table: str, column: str) -> np.ndarray:
+        # as stored: codes for dictionary coded columns, int32 days for dates,
+        # utf-8 bytes for text (mapped along with their offsets)
+        key = (table, column)
+        if key not in self._columns:
+            self._columns[key] = np.load(
+                os.path.join(self.path, _column_file(table, column)),
+                mmap_mode='r')
+            if column in self.manifest['tables'][table]['texts']:
+                self.column(table, _offsets(column))
+        return self._columns[key]
+
+    def dictionary(self, name: str) -> np.ndarray:
+        # the distinct strings, sorted - a code is an index into them
+        key = ('__dictionary__', name)
+        if key not in self._columns:
+            self._columns[key] = np.load(
+                os.path.join(self.path, _dictionary_file(name)),
+                mmap_mode='r')
+        return self._columns[key]
+
+    def values(self,
+               table: str,
+               column: str,
+               rows: Rows = None) -> np.ndarray:
+        # the column (or its rows), decoded to strings or datetime64 values
+        values = self.column(table, column)
+        info = self.manifest['tables'][table]
+        if column in info['texts']:
+            return _from_text(
+                values, self.column(table, _offsets(column)), rows)
+        if rows is not None:
+            values = values[rows]
+        if column in info['codes']:
+            return self.dictionary(info['codes'][column])[values]
+        if column in info['days']:
+            return values.astype('datetime64[D]')
+        return values
+
+    def arrays(self) -> List[str]:
+        return list(self.manifest['arrays'].keys())
+
+    def array(self, name: str) -> np.ndarray:
+        key = (name, None)
+        if key not in self._columns:
+            self._columns[key] = np.load(
+                os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return self._columns[key]
+
+    def nbytes(self) -> int:
+        # of the columns and arrays mapped so far - at most what they can
+        # keep resident
+        return sum(values.nbytes for values in self._columns.values())
+
+    def groups(self, table: str) -> Dict[str, slice]:
+        # key -> row range for tables written with a key column
+        if table not in self._groups:
+            if self.manifest['tables'][table]['key'] is None:
+                raise ValueError(f'Table "{table}" has no key column.')
+            keys = self.column(table, '__keys__')
+            offsets = self.column(table, '__offsets__')
+            self._groups[table] = {
+                str(k): slice(int(offsets[i]), int(offsets[i + 1]))
+                for i, k in enumerate(keys)}
+        return self._groups[table]
+
+    def frame(self,
+              table: str,
+              rows: Rows = None,
+              columns: Optional[List[str]] = None) -> pd.DataFrame:
+        if columns is None:
+            columns = self.columns(table)
+        data = {column: self.values(table, column, rows) for column in columns}
+        df = pd.DataFrame(data, columns=columns, copy=False)
+        return df
@@ -0,0 +1,231 @@
+from collections import OrderedDict
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, \
+    Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from pna.logic import Logic
+
+
+def sizeof(value: Any) -> int:
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True, deep=True))
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+def _copy(value: Any) -> Any:
+    # callers are free to modify what Logic hands them, so never share the
+    # cached object itself
+    if isinstance(value, (pd.DataFrame, pd.Series, np.ndarray)):
+        return value.copy()
+    return value
+
+
+class LRUCache:
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, size, expires)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, size, expires = entry
+                if expires is not None and expires < time.monotonic():
+                    self._remove(key)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, value: Any, size: Optional[int] = None):
+        if size is None:
+            size = sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else and still not fit
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+            while len(self._entries) > self.max_entries \
+                    or (self.max_bytes is not None
+                        and self._bytes > self.max_bytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def discard(self, predicate: Callable[[Hashable], bool]) -> int:
+        # removes the entries whose keys match, returning how many
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._remove(key)
+        return len(keys)
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            expirations=self.expirations,
+            entries=len(self._entries),
+            bytes=self._bytes)
+
+
+class CachedLogic(Logic):
+    # Wraps any Logic, caching query results by method and arguments.
+
+    def __init__(self, logic: Logic, cache: Optional[LRUCache] = None):
+        super().__init__(logic.dbi)
+        self.logic = logic
+        self.cache = cache if cache is not None else LRUCache()
+
+    def __getattr__(self, name: str):
+        # anything not cached (e.g. corpus specific attributes) passes through
+        if name == 'logic':
+            raise AttributeError(name)
+        return getattr(self.logic, name)
+
+    def _cached(self, method: str, *args) -> Any:
+        key = (self.logic.corpus_version(), method, *args)
+        hit, value = self.cache.get(key)
+        if not hit:
+            value = getattr(self.logic, method)(*args)
+            self.cache.put(key, value)
+        return _copy(value)
+
+    def corpus_version(self) -> str:
+        return self.logic.corpus_version()
+
+    def entity_counts(self) -> pd.DataFrame:
+        return self._cached('entity_counts')
+
+    def vector_neighbourhood(self, anchor: str) -> pd.DataFrame:
+        return self._cached('vector_neighbourhood', anchor)
+
+    def vector_neighbourhoods(self, anchors: List[str]) -> pd.DataFrame:
+        return self._cached('vector_neighbourhoods', tuple(anchors))
+
+    def liwc_profile(self, entity: str) -> pd.DataFrame:
+        return self._cached('liwc_profile', entity)
+
+    def liwc_profiles(self,
+                      entities: List[str],
+                      start: Optional[str] = None,
+                      end: Optional[str] = None,
+                      combine: bool = False) -> pd.DataFrame:
+        return self._cached(
+            'liwc_profiles', tuple(entities), start, end, combine)
+
+    def date_range(self) -> Tuple[str, str]:
+        return self._cached('date_range')
+
+    def sentences(self,
+                  entity: str,
+                  start: Optional[str] = None,
+                  end: Optional[str] = None) -> pd.DataFrame:
+        return self._cached('sentences', entity, start, end)
+
+    def search_sentences(self,
+                         entity: str,
+                         keywords: List[str],
+                         match_all: bool = False,
+                         start: Optional[str] = None,
+                         end: Optional[str] = None) -> pd.DataFrame:
+        return self._cached(
+            'search_sentences', entity, tuple(keywords), match_all, start, end)
+
+    def iter_sentences(self,
+                       entity: str,
+                       keywords: Sequence[str] = (),
+                       match_all: bool = False,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None,
+                       chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        # not cached: exports stream straight from the corpus
+        return self.logic.iter_sentences(
+            entity, keywords, match_all, start, end, chunk_size)
+
+    def entity_counts_over_time(self,
+                                entity: str,
+                                start: Optional[str] = None,
+                                end: Optional[str] = None) -> pd.DataFrame:
+        return self._cached('entity_counts_over_time', entity, start, end)
+
+    def corpus_volume_over_time(self,
+                                start: Optional[str] = None,
+                                end: Optional[str] = None) -> pd.DataFrame:
+        return self._cached('corpus_volume_over_time', start, end)
+
+    def in_vocab(self, word: str) -> bool:
+        return self._cached('in_vocab', word)
+
+    def liwc_over_time(self,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+        return self._cached('liwc_over_time', start, end)
+
+    def ingest(self, tweets: pd.DataFrame) -> int:
+        version = self.logic.corpus_version()
+        added = self.logic.ingest(tweets)
+        if added:
+            self._discard(version)
+        return added
+
+    def refresh(self) -> bool:
+        version = self.logic.corpus_version()
+        refreshed = self.logic.refresh()
+        if refreshed:
+            self._discard(version)
+        return refreshed
+
+    def _discard(self, version: str) -> None:
+        # only this corpus' entries: the cache may be shared with others
+        self.cache.discard(lambda key: key[0] == version)
+
+    def nbytes(self) -> int:
+        return self.logic.nbytes()
+
+    def release(self) -> None:
+        self._discard(self.logic.corpus_version())
+        self.logic.release()
@@ -0,0 +1,181 @@
+import importlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from pna.dbi import Dbi
+from pna.logic import Logic
+
+
+# The corpora a deployment serves, each with its own Logic, listed in a
+# manifest:
+#
+#   {"corpora": [
+#       {"id": "ph_embassy_en",
+#        "label": "Phillipines Embassy (en)",
+#        "logic": "pna.logic.PhillipinesEmbassyLogic",
+#        "args": {"bundle_dir": "data/ph_bundle"}},
+#       ...]}
+#
+# A corpus' Logic is made (its data loaded) the first time it is asked for,
+# and the least recently used ones are let go again once the loaded corpora
+# take more than max_bytes - the one just asked for is always kept. Queries
+# still running on a corpus that's let go finish on it.
+#
+# max_bytes is of mapped bytes (as by Logic.nbytes): those of the columns
+# touched so far, which the OS only keeps resident as far as it can spare
+# them. A corpus let go is released (Logic.release), dropping its cached
+# results, and whatever else is kept for it (figures, say) is dropped by the
+# on_evict listeners.
+
+DEFAULT_MANIFEST = 'data/corpora.json'
+
+
+def load_manifest(path: str = DEFAULT_MANIFEST) -> List[Dict]:
+    with open(path) as f:
+        return json.loads(f.read())['corpora']
+
+
+def _import(path: str):
+    module, name = path.rsplit('.', 1)
+    return getattr(importlib.import_module(module), name)
+
+
+class Corpora:
+
+    def __init__(self,
+                 dbi: Dbi,
+                 corpora: List[Dict],
+                 max_bytes: Optional[int] = None,
+                 wrap: Optional[Callable[[Logic], Logic]] = None):
+        # - corpora: as listed in a manifest, the first being the default
+        # - max_bytes: of mapped corpus data, see above
+        # - wrap: applied to each Logic made, e.g. to add a CachedLogic
+        if not corpora:
+            raise ValueError('No corpora given.')
+        self.dbi = dbi
+        self.corpora = OrderedDict((c['id'], c) for c in corpora)
+        self.max_bytes = max_bytes
+        self.wrap = wrap
+        self._loaded: 'OrderedDict[str, Logic]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {corpus_id: threading.Lock()
+                            for corpus_id in self.corpora}
+        self._evict_listeners: List[Callable[[str], None]] = []
+        self.loads = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_manifest(cls,
+                      dbi: Dbi,
+                      path: str = DEFAULT_MANIFEST,
+                      **kwargs) -> 'Corpora':
+        return cls(dbi, load_manifest(path), **kwargs)
+
+    @classmethod
+    def of(cls, logic: Logic, label: str = 'Corpus') -> 'Corpora':
+        # just the one, already loaded, corpus
+        corpora = cls(logic.dbi, [{'id': 'default', 'label': label}])
+        corpora._loaded['default'] = logic
+        return corpora
+
+    @property
+    def default(self) -> str:
+        return next(iter(self.corpora))
+
+    def options(self) -> List[Dict[str, str]]:
+        # for a dcc.RadioItems or Dropdown
+        return [{'label': c.get('label', c['id']), 'value': c['id']}
+                for c in self.corpora.values()]
+
+    def loaded(self) -> List[str]:
+        # least recently used first
+        with self._lock:
+            return list(self._loaded)
+
+    def get(self, corpus_id: Optional[str] = None) -> Logic:
+        # the corpus' Logic, loading it if need be (None for the default);
+        # KeyError if there's no such corpus
+        if corpus_id is None:
+            corpus_id = self.default
+        if corpus_id not in self.corpora:
+            raise KeyError(f'No corpus "{corpus_id}".')
+        logic = self._touch(corpus_id)
+        if logic is not None:
+            return logic
+        # one load per corpus at a time, without holding up the others
+        with self._load_locks[corpus_id]:
+            logic = self._touch(corpus_id)
+            if logic is None:
+                logic = self._load(self.corpora[corpus_id])
+                with self._lock:
+                    self._loaded[corpus_id] = logic
+                    self.loads += 1
+                self._evict(keep=corpus_id)
+        return logic
+
+    def _touch(self, corpus_id: str) -> Optional[Logic]:
+        with self._lock:
+            logic = self._loaded.get(corpus_id)
+            if logic is not None:
+                self._loaded.move_to_end(corpus_id)
+            return logic
+
+    def _load(self, corpus: Dict) -> Logic:
+        logic = _import(corpus['logic'])(self.dbi, **corpus.get('args', {}))
+        return self.wrap(logic) if self.wrap is not None else logic
+
+    def nbytes(self) -> int:
+        with self._lock:
+            loaded = list(self._loaded.values())
+        return sum(logic.nbytes() for logic in loaded)
+
+    def on_evict(self, listener: Callable[[str], None]) -> None:
+        # listener(corpus_id) is called whenever a corpus is let go
+        self._evict_listeners.append(listener)
+
+    def _evict(self, keep: str) -> None:
+        if self.max_bytes is None:
+            return
+        evicted = {}
+        with self._lock:
+            sizes = {i: logic.nbytes() for i, logic in self._loaded.items()}
+            total = sum(sizes.values())
+            for corpus_id in list(self._loaded):
+                if total <= self.max_bytes:
+                    break
+                if corpus_id == keep:
+                    continue
+                evicted[corpus_id] = self._loaded.pop(corpus_id)
+                total -= sizes[corpus_id]
+                self.evictions += 1
+        self._release(evicted)
+
+    def evict(self, corpus_id: str) -> None:
+        with self._lock:
+            logic = self._loaded.pop(corpus_id, None)
+            if logic is not None:
+                self.evictions += 1
+        if logic is not None:
+            self._release({corpus_id: logic})
+
+    def _release(self, evicted: Dict[str, Logic]) -> None:
+        for corpus_id, logic in evicted.items():
+            logic.release()
+            for listener in self._evict_listeners:
+                listener(corpus_id)
+
+    def refresh(self) -> bool:
+        # refreshes the loaded corpora, returning whether any changed
+        with self._lock:
+            loaded = list(self._loaded.values())
+        return any([logic.refresh() for logic in loaded])
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            corpora=len(self.corpora),
+            loaded=len(self.loaded()),
+            nbytes=self.nbytes(),
+            loads=self.loads,
+            evictions=self.evictions)
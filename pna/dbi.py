@@ -1,20 +1,355 @@
+from contextlib import contextmanager
+import csv
+import io
 import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
 import psycopg2
-from psycopg2 import errors
+from psycopg2 import extensions, extras
 
 
 def get_connection():
-    return psycopg2.connect(
-        host=os.environ['PGSQL_HOST'],
-        port=os.environ['PGSQL_PORT'],
-        user=os.environ['PGSQL_USERNAME'],
-        password=os.environ['PGSQL_PASSWORD'],
-        dbname=os.environ['PGSQL_DB'])
+    try:
+        return psycopg2.connect(
+            host=os.environ['PGSQL_HOST'],
+            port=os.environ['PGSQL_PORT'],
+            user=os.environ['PGSQL_USERNAME'],
+            password=os.environ['PGSQL_PASSWORD'],
+            dbname=os.environ['PGSQL_DB'])
+    except KeyError as e:
+        # no database configured: fails like one that can't be reached
+        raise psycopg2.OperationalError(f'{e.args[0]} is not set.') from e
+
+
+def _gevent_wait_callback(conn, timeout=None):
+    # as in psycogreen: yield to other greenlets while waiting on the socket
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f'Bad result from poll: {state}')
+
+
+def make_green() -> None:
+    # Run queries cooperatively under gevent. Call once at startup, alongside
+    # gevent's monkey patching (which also makes the pool's locks
+    # greenlet-aware).
+    extensions.set_wait_callback(_gevent_wait_callback)
+
+
+def is_green() -> bool:
+    return extensions.get_wait_callback() is not None
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+
+    def __init__(self,
+                 connect: Callable = get_connection,
+                 min_size: int = 1,
+                 max_size: int = 10,
+                 max_idle: float = 600.,
+                 check_after: float = 30.,
+                 timeout: float = 30.):
+        # - min_size: connections opened on the first checkout (in each
+        #   process: none are opened in a prefork master) and kept open
+        # - max_idle: idle connections above min_size are closed after this
+        # - check_after: idle connections are health checked before reuse
+        #   after this long
+        # - timeout: how long to wait for a free connection
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.timeout = timeout
+        self._inherited = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._filled = False
+        self._idle = []  # (conn, last used), most recently used last
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+        self._in_use = 0
+        self.created = 0
+        self.closed = 0
+        self.failed_checks = 0
+
+    def _check_pid(self):
+        # Connections can't be shared with a forked child. Closing the
+        # parent's connections here would close them for the parent too, so
+        # just stop using them.
+        if os.getpid() != self._pid:
+            self._inherited.extend(self._idle)
+            self._reset()
+
+    def _fill(self):
+        with self._lock:
+            if self._filled:
+                return
+            self._filled = True
+        while True:
+            with self._lock:
+                if len(self._idle) + self._in_use >= self.min_size:
+                    return
+            try:
+                conn = self._connect()
+            except psycopg2.Error:
+                return  # the checkout needing one will raise
+            self.created += 1
+            with self._lock:
+                self._idle.append((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        # commits on success and rolls back on error, like `with conn:`
+        conn = self.checkout()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self.checkin(conn)
+
+    def checkout(self, timeout: Optional[float] = None):
+        self._check_pid()
+        self._fill()
+        # a pool gone quiet only gets to close its idle connections here
+        self._recycle()
+        timeout = self.timeout if timeout is None else timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise PoolTimeout(f'No connection free after {timeout}s.')
+        try:
+            conn = None
+            while conn is None:
+                with self._lock:
+                    entry = self._idle.pop() if self._idle else None
+                if entry is None:
+                    conn = self._connect()
+                    self.created += 1
+                elif self._healthy(*entry):
+                    conn = entry[0]
+                else:
+                    self.failed_checks += 1
+                    self._close(entry[0])
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+        return conn
+
+    def checkin(self, conn) -> None:
+        try:
+            if not conn.closed and conn.info.transaction_status \
+                    != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except psycopg2.Error:
+            pass  # broken - closed below
+        with self._lock:
+            self._in_use -= 1
+            if not conn.closed:
+                self._idle.append((conn, time.monotonic()))
+        if conn.closed:
+            self.closed += 1
+        self._recycle()
+        self._slots.release()
+
+    def _healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1;')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _recycle(self):
+        now = time.monotonic()
+        stale = []
+        with self._lock:
+            # oldest first, keeping at least min_size connections around
+            while len(self._idle) > self.min_size \
+                    and now - self._idle[0][1] > self.max_idle:
+                stale.append(self._idle.pop(0)[0])
+        for conn in stale:
+            self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        self.closed += 1
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _ in idle:
+            self._close(conn)
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            idle=len(self._idle),
+            in_use=self._in_use,
+            created=self.created,
+            closed=self.closed,
+            failed_checks=self.failed_checks)
+
+
+_pool = None
+
+
+def get_pool() -> ConnectionPool:
+    # the default pool, configured from the environment on first use
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool(
+            min_size=int(os.environ.get('PGSQL_POOL_MIN', 1)),
+            max_size=int(os.environ.get('PGSQL_POOL_MAX', 10)),
+            max_idle=float(os.environ.get('PGSQL_POOL_MAX_IDLE', 600)))
+    return _pool
+
+
+class Changes:
+    # Versions of tables, so that data read from them can be cached until
+    # they change. Writes through the repositories bump the versions here as
+    # they commit, and NOTIFY the other processes - which LISTEN on a
+    # connection of their own, and bump theirs when they next poll (at most
+    # every poll_every seconds).
+    CHANNEL = 'pna_changes'
+
+    def __init__(self,
+                 connect: Callable = get_connection,
+                 poll_every: float = 1.):
+        self._connect = connect
+        self.poll_every = poll_every
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        # bumped when notifications may have been missed: changes everything
+        self._epoch = 0
+        self._conn = None
+        self._pid = None
+        self._polled = None
+        self._inherited = []
+
+    def notify(self, cursor, *tables: str) -> None:
+        # sent when cursor's transaction commits
+        for table in tables:
+            cursor.execute('SELECT pg_notify(%s, %s);', (self.CHANNEL, table))
+
+    def changed(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def versions(self, *tables: str) -> Tuple[int, ...]:
+        self.poll()
+        with self._lock:
+            return (self._epoch, *(self._versions.get(t, 0) for t in tables))
+
+    def poll(self) -> None:
+        now = time.monotonic()
+        if self._polled is not None and now - self._polled < self.poll_every:
+            return
+        if not self._poll_lock.acquire(blocking=False):
+            return  # someone else is on it
+        try:
+            self._polled = now
+            if self._conn is None or self._conn.closed \
+                    or self._pid != os.getpid():
+                self._listen()
+            self._conn.poll()
+            tables = {n.payload for n in self._conn.notifies}
+            self._conn.notifies.clear()
+            self.changed(*tables)
+        except psycopg2.Error:
+            self._conn = None  # listen again next time
+            with self._lock:
+                self._epoch += 1
+        finally:
+            self._poll_lock.release()
+
+    def _listen(self) -> None:
+        if self._conn is not None and self._pid != os.getpid():
+            # a forked child can't use (or close) its parent's connection
+            self._inherited.append(self._conn)
+        self._conn = None
+        with self._lock:
+            self._epoch += 1
+        conn = self._connect()
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {self.CHANNEL};')
+        self._conn, self._pid = conn, os.getpid()
+
+
+_changes = None
+
+
+def get_changes() -> Changes:
+    global _changes
+    if _changes is None:
+        _changes = Changes()
+    return _changes
 
 
 class Repository:
+    # Writes go through _writing, and all() results are cached (per the
+    # tables' versions, see Changes) - so repeated reads only go to the
+    # database once something has changed.
+    TABLES: Tuple[str, ...] = ()
+
+    def __init__(self,
+                 pool: Optional[ConnectionPool] = None,
+                 changes: Optional[Changes] = None):
+        self.pool = pool if pool is not None else get_pool()
+        self.changes = changes if changes is not None else get_changes()
+        self._cache = None
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _writing(self, *tables: str):
+        # a cursor to change the tables with, in one transaction
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                yield cursor
+                self.changes.notify(cursor, *tables)
+        self.changes.changed(*tables)
+
+    def _cached(self, load: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        # load() when the tables have changed since last time
+        version = self.changes.versions(*self.TABLES)
+        cache = self._cache
+        if cache is None or cache[0] != version:
+            cache = self._cache = (version, load())
+            self.misses += 1
+        else:
+            self.hits += 1
+        return cache[1].copy()
+
+    def stats(self) -> Dict[str, int]:
+        # of the all() cache
+        return dict(hits=self.hits, misses=self.misses)
 
     def all(self, *args, **kwargs):
         raise NotImplementedError
@@ -25,38 +360,174 @@ class Repository:
     def delete(self, *args, **kwargs):
         raise NotImplementedError
 
+    def _iter_query(self,
+                    sql: str,
+                    args=None,
+                    chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        # the query's rows chunk_size at a time, read through a server side
+        # cursor - so only a chunk is ever held, here or in the driver
+        with self.pool.connection() as conn:
+            with conn.cursor(name='iter_query') as cursor:
+                cursor.itersize = chunk_size
+                cursor.execute(sql, args)
+                rows = cursor.fetchmany(chunk_size)
+                columns = [c.name for c in cursor.description]
+                yield pd.DataFrame(rows, columns=columns)
+                while len(rows) == chunk_size:
+                    rows = cursor.fetchmany(chunk_size)
+                    if rows:
+                        yield pd.DataFrame(rows, columns=columns)
+
+    def _insert_many(self,
+                     table: str,
+                     df: pd.DataFrame,
+                     on_conflict: str = '') -> int:
+        # one multi-row INSERT per page of rows, in one transaction
+        columns = ', '.join(df.columns)
+        sql = f'INSERT INTO {table} ({columns}) VALUES %s {on_conflict} ' \
+              'RETURNING 1'
+        rows = list(df.itertuples(index=False, name=None))
+        with self._writing(table) as cursor:
+            inserted = extras.execute_values(
+                cursor, sql, rows, page_size=1000, fetch=True)
+        return len(inserted)
+
+    def _copy_many(self, table: str, df: pd.DataFrame) -> int:
+        # COPY ... FROM STDIN, much faster than INSERTs for big batches - but
+        # not possible with a green connection (see make_green), which gets
+        # _insert_many instead
+        if df.isna().values.any():
+            raise ValueError(f'Missing values in rows for {table}.')
+        if is_green():
+            return self._insert_many(table, df)
+        # every value quoted, so an empty string isn't taken for NULL
+        buffer = io.StringIO()
+        df.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_ALL)
+        buffer.seek(0)
+        sql = f'COPY {table} ({", ".join(df.columns)}) FROM STDIN ' \
+              'WITH (FORMAT csv)'
+        with self._writing(table) as cursor:
+            cursor.copy_expert(sql, buffer)
+            copied = cursor.rowcount
+        return copied
+
 
 class NarrativeRepository(Repository):
+    TABLES = ('narrative',)
 
     def all(self) -> pd.DataFrame:
-        with get_connection() as conn:
+        return self._cached(self._all)
+
+    def _all(self) -> pd.DataFrame:
+        with self.pool.connection() as conn:
             sql = 'SELECT * FROM narrative;'
             df = pd.read_sql_query(sql, con=conn)
             return df
 
+    def iter_all(self, chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        return self._iter_query(
+            'SELECT * FROM narrative ORDER BY code;', chunk_size=chunk_size)
+
+    def create_many(self, narratives: pd.DataFrame) -> int:
+        # narratives: code and description columns - codes already in there
+        # are left as they are, as with create. Returns how many were added.
+        return self._insert_many(
+            'narrative', narratives[['code', 'description']],
+            on_conflict='ON CONFLICT (code) DO NOTHING')
+
     def create(self, code: str, description: str) -> None:
-        with get_connection() as conn:
-            with conn.cursor() as cursor:
-                sql = 'INSERT INTO narrative (code, description) ' \
-                      'VALUES (%s, %s)'
-                args = (code, description)
-                try:
-                    cursor.execute(sql, args)
-                except errors.UniqueViolation:
-                    pass  # it's in there, that's all we need
+        with self._writing('narrative') as cursor:
+            # if it's in there, that's all we need
+            sql = 'INSERT INTO narrative (code, description) ' \
+                  'VALUES (%s, %s) ' \
+                  'ON CONFLICT (code) DO NOTHING'
+            args = (code, description)
+            cursor.execute(sql, args)
 
     def delete(self, code: str) -> None:
-        with get_connection() as conn:
-            with conn.cursor() as cursor:
-                sql = 'DELETE FROM narrative WHERE code = %s;'
-                args = (code,)
-                cursor.execute(sql, args)
+        with self._writing('narrative') as cursor:
+            sql = 'DELETE FROM narrative WHERE code = %s;'
+            args = (code,)
+            cursor.execute(sql, args)
+
+
+# filter operators (see pna.table) in SQL
+SQL_OPERATORS = {
+    'eq': '=', 'ne': '<>', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>=',
+}
+
+
+def _where(filters, columns: Dict[str, str]):
+    # a WHERE clause and its args for (column, operator, value) filters,
+    # leaving out columns not in `columns` (name -> SQL expression)
+    clauses, args = [], []
+    for column, op, value in filters or []:
+        if column not in columns:
+            continue
+        expression = columns[column]
+        if op == 'contains':
+            value = str(value).replace('\\', '\\\\') \
+                .replace('%', '\\%').replace('_', '\\_')
+            clauses.append(f'{expression}::text ILIKE %s')
+            args.append(f'%{value}%')
+        elif op == 'datestartswith':
+            clauses.append(f'{expression}::text LIKE %s')
+            args.append(f'{value}%')
+        elif op in SQL_OPERATORS:
+            clauses.append(f'{expression} {SQL_OPERATORS[op]} %s')
+            args.append(value)
+    where = f'WHERE {" AND ".join(clauses)} ' if clauses else ''
+    return where, args
+
+
+def _order_by(sort, columns: Dict[str, str], default: str) -> str:
+    order = [f'{columns[c]} {"ASC" if asc else "DESC"}'
+             for c, asc in sort or [] if c in columns]
+    return f'ORDER BY {", ".join(order + [default])} '
+
+
+def _after(order: List[Tuple[str, bool]], key: Tuple):
+    # a WHERE condition and its args for the rows after the one with `key`,
+    # its values of the (SQL expression, ascending) order - which must end
+    # in a unique column, for it to be a total order
+    clauses, args = [], []
+    for i, (expression, asc) in enumerate(order):
+        equal = [f'{e} = %s' for e, _ in order[:i]]
+        clauses.append(' AND '.join(
+            equal + [f'{expression} {">" if asc else "<"} %s']))
+        args.extend(key[:i + 1])
+    return f'({" OR ".join(f"({c})" for c in clauses)}) ', args
 
 
 class NarrativeLabelRepository(Repository):
+    # labels come with their narrative's description
+    TABLES = ('narrative_label', 'narrative')
+    # column -> SQL, for paging queries
+    COLUMNS = {
+        'narrative_code': 'nl.narrative_code',
+        'annotator': 'nl.annotator',
+        'text': 'nl.text',
+        'description': 'n.description',
+    }
+    # the order pages are in after any sort: all of it, then the id, so that
+    # the last row of a page is where the next starts
+    PAGE_ORDER = [('nl.narrative_code', True), ('nl.annotator', True),
+                  ('nl.text', True), ('nl.id', True)]
+    # how many sorts and filters page() keeps the counts and page ends of
+    MAX_PAGED = 64
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (sort, filters) -> [total, {offset: key of the row before it}],
+        # for the tables' versions
+        self._paged = {}
+        self._paged_version = None
 
     def all(self) -> pd.DataFrame:
-        with get_connection() as conn:
+        return self._cached(self._all)
+
+    def _all(self) -> pd.DataFrame:
+        with self.pool.connection() as conn:
             sql = 'SELECT ' \
                   '    nl.narrative_code, nl.annotator, nl.text, n.description ' \
                   'FROM narrative_label AS nl ' \
@@ -64,28 +535,143 @@ class NarrativeLabelRepository(Repository):
             df = pd.read_sql_query(sql, con=conn)
             return df
 
+    def page(self,
+             offset: int,
+             limit: int,
+             sort: Optional[List[Tuple[str, bool]]] = None,
+             filters: Optional[List[Tuple[str, str, Any]]] = None) \
+            -> Tuple[pd.DataFrame, int]:
+        # One page of labels, sorted by (column, ascending) and filtered by
+        # (column, operator, value) as from pna.table, and how many labels
+        # match in all. Where a page starts is remembered (until the tables
+        # change), so the next page is an index range scan from there
+        # rather than an OFFSET counting through all the ones before it -
+        # and the count is only made once.
+        where, args = _where(filters, self.COLUMNS)
+        order = [(self.COLUMNS[c], asc)
+                 for c, asc in sort or [] if c in self.COLUMNS]
+        order += self.PAGE_ORDER
+        paged = self._page_state(sort, filters)
+        start = max((o for o in paged[1] if o <= offset), default=0)
+        if start:
+            after, after_args = _after(order, paged[1][start])
+            where = f'{where}AND {after}' if where else f'WHERE {after}'
+            args = [*args, *after_args]
+        order_by = ', '.join(
+            f'{e} {"ASC" if asc else "DESC"}' for e, asc in order)
+        join = 'FROM narrative_label AS nl ' \
+               'INNER JOIN narrative AS n ON n.code = nl.narrative_code '
+        with self.pool.connection() as conn:
+            if paged[0] is None:
+                count_where, count_args = _where(filters, self.COLUMNS)
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT COUNT(*) {join}{count_where};', count_args)
+                    paged[0] = cursor.fetchone()[0]
+            sql = 'SELECT ' \
+                  '    nl.id, nl.narrative_code, nl.annotator, nl.text, ' \
+                  '    n.description ' \
+                  f'{join}{where}ORDER BY {order_by} LIMIT %s OFFSET %s;'
+            df = pd.read_sql_query(
+                sql, con=conn, params=[*args, limit, offset - start])
+        if len(df):
+            paged[1][offset + len(df)] = tuple(
+                df[e.split('.', 1)[1]].tolist()[-1] for e, _ in order)
+        return df.drop(columns=['id']), paged[0]
+
+    def _page_state(self, sort, filters) -> List:
+        version = self.changes.versions(*self.TABLES)
+        if version != self._paged_version \
+                or len(self._paged) >= self.MAX_PAGED:
+            self._paged, self._paged_version = {}, version
+        key = (tuple(sort or ()), tuple(filters or ()))
+        return self._paged.setdefault(key, [None, {}])
+
+    def iter_all(self,
+                 chunk_size: int = 10000,
+                 sort: Optional[List[Tuple[str, bool]]] = None,
+                 filters: Optional[List[Tuple[str, str, Any]]] = None) \
+            -> Iterator[pd.DataFrame]:
+        # as all(), chunk_size rows at a time - sorted and filtered as with
+        # page()
+        where, args = _where(filters, self.COLUMNS)
+        order_by = _order_by(
+            sort, self.COLUMNS,
+            default='nl.narrative_code, nl.annotator, nl.text')
+        sql = 'SELECT ' \
+              '    nl.narrative_code, nl.annotator, nl.text, ' \
+              '    n.description ' \
+              'FROM narrative_label AS nl ' \
+              'INNER JOIN narrative AS n ON n.code = nl.narrative_code ' \
+              f'{where}{order_by};'
+        return self._iter_query(sql, args, chunk_size=chunk_size)
+
+    def search(self,
+               narrative_code: Optional[str] = None,
+               annotator: Optional[str] = None,
+               text: Optional[str] = None,
+               after: Optional[int] = None,
+               limit: int = 100) -> pd.DataFrame:
+        # Labels with the code and annotator, and text containing `text`
+        # (case insensitive), in id order - limit at a time: for the next
+        # ones, pass the last id as `after`. Unlike page()'s OFFSET, each
+        # page is an index range scan, however far in.
+        filters = [('narrative_code', 'eq', narrative_code),
+                   ('annotator', 'eq', annotator),
+                   ('text', 'contains', text)]
+        where, args = _where(
+            [f for f in filters if f[2] is not None], self.COLUMNS)
+        if after is not None:
+            where = f'{where}AND nl.id > %s ' if where \
+                else 'WHERE nl.id > %s '
+            args.append(int(after))
+        sql = 'SELECT ' \
+              '    nl.id, nl.narrative_code, nl.annotator, nl.text, ' \
+              '    n.description ' \
+              'FROM narrative_label AS nl ' \
+              'INNER JOIN narrative AS n ON n.code = nl.narrative_code ' \
+              f'{where}ORDER BY nl.id LIMIT %s;'
+        with self.pool.connection() as conn:
+            df = pd.read_sql_query(sql, con=conn, params=[*args, limit])
+            return df
+
+    def create_many(self, labels: pd.DataFrame) -> int:
+        # labels: narrative_code, annotator and text columns, all added in one
+        # go (or none, e.g. if a narrative code doesn't exist). Returns how
+        # many were added.
+        return self._copy_many(
+            'narrative_label', labels[['narrative_code', 'annotator', 'text']])
+
     def create(self, narrative_code: str, annotator: str, text: str) -> None:
-        with get_connection() as conn:
-            with conn.cursor() as cursor:
-                sql = 'INSERT INTO narrative_label ' \
-                      '(narrative_code, annotator, text) ' \
-                      'VALUES (%s, %s, %s)'
-                args = (narrative_code, annotator, text)
-                cursor.execute(sql, args)
+        with self._writing('narrative_label') as cursor:
+            sql = 'INSERT INTO narrative_label ' \
+                  '(narrative_code, annotator, text) ' \
+                  'VALUES (%s, %s, %s)'
+            args = (narrative_code, annotator, text)
+            cursor.execute(sql, args)
+
+    def delete_ids(self, ids: List[int]) -> int:
+        # by id, as from search() - returns how many were deleted
+        with self._writing('narrative_label') as cursor:
+            sql = 'DELETE FROM narrative_label WHERE id = ANY(%s);'
+            cursor.execute(sql, ([int(i) for i in ids],))
+            deleted = cursor.rowcount
+        return deleted
 
     def delete(self, narrative_code: str, annotator: str, text: str) -> None:
-        with get_connection() as conn:
-            with conn.cursor() as cursor:
-                sql = 'DELETE FROM narrative_label ' \
-                      'WHERE narrative_code = %s ' \
-                      'AND annotator = %s ' \
-                      'AND text = %s;'
-                args = (narrative_code, annotator, text)
-                cursor.execute(sql, args)
+        with self._writing('narrative_label') as cursor:
+            sql = 'DELETE FROM narrative_label ' \
+                  'WHERE narrative_code = %s ' \
+                  'AND annotator = %s ' \
+                  'AND text = %s;'
+            args = (narrative_code, annotator, text)
+            cursor.execute(sql, args)
 
 
 class Dbi:
 
-    def __init__(self):
-        self.narratives = NarrativeRepository()
-        self.narrative_labels = NarrativeLabelRepository()
+    def __init__(self,
+                 pool: Optional[ConnectionPool] = None,
+                 changes: Optional[Changes] = None):
+        self.narratives = NarrativeRepository(pool, changes)
+        self.narrative_labels = NarrativeLabelRepository(pool, changes)
@@ -0,0 +1,113 @@
+from concurrent import futures
+import os
+from typing import Any, Callable, Dict
+
+from gevent import monkey
+
+
+# Runs CPU heavy callback work (Logic queries, building figures) on a bounded
+# pool of OS threads, so the gevent loop stays free to handle I/O. Under
+# gevent's monkey patching the standard ThreadPoolExecutor would only run
+# greenlets, so gevent's own (real) thread pool is used instead, and waiting
+# on its results yields to other greenlets.
+#
+# Threads rather than processes: Logic holds the corpus and isn't cheap to
+# ship to other processes - PreforkServer gives us the extra cores.
+
+
+class QueueFull(Exception):
+    pass
+
+
+class TaskTimeout(Exception):
+    pass
+
+
+def _is_green() -> bool:
+    return monkey.is_module_patched('threading')
+
+
+class Executor:
+
+    def __init__(self,
+                 max_workers: int = 4,
+                 max_queue: int = 64,
+                 timeout: float = 30.):
+        # - max_queue: tasks (running or waiting) allowed before rejecting
+        # - timeout: how long a caller waits for a task. A timed out task
+        #   can't be stopped, but its caller gets a TaskTimeout.
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        # counters are updated from the pool's threads too, so this has to be
+        # a real lock even when threading is monkey patched
+        self._lock = monkey.get_original('_thread', 'allocate_lock')()
+        self._pool = None
+        self._pid = None
+        self.pending = 0
+        self.running = 0
+        self.max_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.timed_out = 0
+        self.rejected = 0
+
+    def _get_pool(self):
+        # threads don't survive a fork, so each worker process makes its own
+        if self._pool is None or self._pid != os.getpid():
+            if _is_green():
+                from gevent.threadpool import ThreadPoolExecutor
+            else:
+                ThreadPoolExecutor = futures.ThreadPoolExecutor
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+            self._pid = os.getpid()
+        return self._pool
+
+    def run(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f'{self.pending} tasks already queued.')
+            self.pending += 1
+            self.max_pending = max(self.max_pending, self.pending)
+        try:
+            future = self._get_pool().submit(self._call, fn, *args, **kwargs)
+            try:
+                return future.result(timeout=self.timeout)
+            except futures.TimeoutError:
+                future.cancel()  # only helps if it hasn't started
+                with self._lock:
+                    self.timed_out += 1
+                raise TaskTimeout(
+                    f'{getattr(fn, "__name__", fn)} took over '
+                    f'{self.timeout}s.')
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self.running += 1
+        try:
+            result = fn(*args, **kwargs)
+            with self._lock:
+                self.completed += 1
+            return result
+        except BaseException:
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                self.running -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            pending=self.pending,
+            running=self.running,
+            queued=max(self.pending - self.running, 0),
+            max_pending=self.max_pending,
+            completed=self.completed,
+            failed=self.failed,
+            timed_out=self.timed_out,
+            rejected=self.rejected)
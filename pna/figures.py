@@ -0,0 +1,116 @@
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from plotly.utils import PlotlyJSONEncoder
+
+
+# Corpus level figures (and tables) don't change until the corpus does, so
+# they are built once per corpus version and served from here. Values are
+# kept as plain JSON-able dicts - what Dash sends to the browser anyway - and
+# optionally written to disk as JSON so they survive restarts.
+#
+# Only a corpus' latest version is kept: a figure built for a new version
+# (after an ingest, say) replaces that of the old one, in memory and on disk.
+# Different figures are built concurrently, each just once.
+
+
+def to_json_dict(figure: Any) -> Dict:
+    return json.loads(json.dumps(figure, cls=PlotlyJSONEncoder))
+
+
+class FigureCache:
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        # (corpus, name) -> (version, figure)
+        self._figures: Dict[Tuple[str, str], Tuple[str, Dict]] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.builds = 0
+
+    def _file(self, corpus: str, version: str, name: str) -> str:
+        return os.path.join(self.path, corpus, version, f'{name}.json')
+
+    def _cached(self, key: Tuple[str, str], version: str) -> Optional[Dict]:
+        with self._lock:
+            cached = self._figures.get(key)
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return cached[1]
+        return None
+
+    def get(self,
+            corpus: str,
+            version: str,
+            name: str,
+            build: Callable[[], Any]) -> Dict:
+        key = (corpus, name)
+        figure = self._cached(key, version)
+        if figure is not None:
+            return figure
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            # might have been built while waiting for the lock
+            figure = self._cached(key, version)
+            if figure is not None:
+                return figure
+            figure = self._load(corpus, version, name)
+            if figure is None:
+                figure = to_json_dict(build())
+                self._save(corpus, version, name, figure)
+                self.builds += 1
+            else:
+                self.loads += 1
+            with self._lock:
+                self._figures[key] = (version, figure)
+        return figure
+
+    def forget(self, corpus: str) -> None:
+        # lets go of the corpus' figures in memory (those on disk are kept)
+        with self._lock:
+            for key in [k for k in self._figures if k[0] == corpus]:
+                del self._figures[key]
+
+    def stats(self) -> Dict[str, int]:
+        return dict(
+            hits=self.hits,
+            loads=self.loads,
+            builds=self.builds,
+            figures=len(self._figures))
+
+    def _load(self, corpus: str, version: str, name: str) -> Optional[Dict]:
+        if self.path is None:
+            return None
+        try:
+            with open(self._file(corpus, version, name)) as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def _save(self, corpus: str, version: str, name: str, figure: Dict):
+        if self.path is None:
+            return
+        file = self._file(corpus, version, name)
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+        tmp_file = f'{file}.tmp'
+        with open(tmp_file, 'w') as f:
+            f.write(json.dumps(figure))
+        os.replace(tmp_file, file)
+        # and the figure of the corpus' older versions
+        for old_version in os.listdir(os.path.join(self.path, corpus)):
+            if old_version != version:
+                self._remove(corpus, old_version, name)
+
+    def _remove(self, corpus: str, version: str, name: str) -> None:
+        file = self._file(corpus, version, name)
+        if os.path.exists(file):
+            os.remove(file)
+        try:
+            os.rmdir(os.path.dirname(file))
+        except OSError:
+            pass  # other figures of the version are left
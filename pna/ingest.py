@@ -0,0 +1,228 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from pna import search
+from pna.npmi import npmi
+
+
+# Adds a batch of new tweets to the corpus tables without recomputing them
+# from the raw data. Everything the dashboard shows derives from a few counts
+# - tokens and category (LIWC) tokens overall, per entity and per day, and
+# entity mentions per day - which are all stored in the tables. So the
+# batch's counts are added to the stored ones, and the derived columns (NPMI,
+# frequencies) recomputed from the totals.
+#
+# Tweets come annotated by the offline pipeline (tokenizing, entity tagging
+# and LIWC categories aren't done here), one row per tweet:
+#   - id, date, likes, retweets, text
+#   - n_tokens: how many tokens the tweet has
+#   - entities: the entities it mentions, once per mention
+#   - cats: category -> how many of its tokens are in that category
+# Tweets already in the corpus are skipped, so a batch can be re-sent.
+
+TWEET_COLUMNS = [
+    'id', 'date', 'likes', 'retweets', 'text', 'n_tokens', 'entities', 'cats']
+# the tables add_tweets reads and updates - the others (PCA, neighbours,
+# vectors, ...) don't change
+TWEET_TABLES = [
+    'tweets', 'entity_tweets', 'terms', 'entity_counts', 'volume',
+    'entity_attention', 'liwc_time', 'liwc', 'entity_tokens_time',
+    'entity_cats_time']
+
+
+def _new_tweets(tweets: pd.DataFrame, ids: np.ndarray) -> pd.DataFrame:
+    tweets = pd.DataFrame(tweets, columns=TWEET_COLUMNS)
+    tweets = tweets[~tweets.id.astype(np.int64).isin(ids)] \
+        .drop_duplicates(subset='id') \
+        .reset_index(drop=True)
+    tweets['id'] = tweets.id.astype(np.int64)
+    tweets['Date'] = pd.to_datetime(
+        tweets.date.astype(str).str.split('T').str[0])
+    tweets['text'] = tweets.text.fillna('')
+    tweets['entities'] = tweets.entities.apply(
+        lambda e: list(e) if isinstance(e, (list, tuple, np.ndarray)) else [])
+    tweets['cats'] = tweets.cats.apply(
+        lambda c: c if isinstance(c, dict) else {})
+    return tweets
+
+
+def _add(df: pd.DataFrame,
+         delta: pd.DataFrame,
+         keys, columns) -> pd.DataFrame:
+    # df + delta, summing `columns` by `keys`, keeping df's row order (new
+    # keys at the end)
+    delta = delta.groupby(keys, as_index=False)[columns].sum()
+    merged = df.merge(delta, on=keys, how='outer', suffixes=('', '__delta'),
+                      sort=False)
+    for column in columns:
+        merged[column] = merged[column].fillna(0) \
+            + merged[f'{column}__delta'].fillna(0)
+        merged[column] = merged[column].astype(np.int64)
+    return merged.drop(columns=[f'{c}__delta' for c in columns])
+
+
+def _grid(df: pd.DataFrame, dates: pd.Index, key: str) -> pd.DataFrame:
+    # every (date, key) pair - the over time tables include the zero counts
+    index = pd.MultiIndex.from_product(
+        [dates, df[key].unique()], names=['Date', key])
+    return df.set_index(['Date', key]).reindex(index).reset_index()
+
+
+def add_tweets(tables: Dict[str, pd.DataFrame],
+               tweets: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    # the tables (as PhillipinesEmbassyLogic.build_bundle makes them, at
+    # least those in TWEET_TABLES) with `tweets` added; others are passed
+    # through
+    tables = dict(tables)
+    df_tweets = tables['tweets']
+    new = _new_tweets(tweets, df_tweets.id.values)
+    if not len(new):
+        return tables
+    mentions = new[['id', 'Date', 'n_tokens', 'entities']] \
+        .explode('entities') \
+        .dropna(subset=['entities']) \
+        .rename(columns={'entities': 'Entity'})
+    # tokens are counted once per tweet an entity is in, however many times
+    tweet_entities = mentions.drop_duplicates(subset=['id', 'Entity'])
+    cats = pd.DataFrame(
+        [(i, cat, count)
+         for i, tweet_cats in zip(new.id, new.cats)
+         for cat, count in tweet_cats.items()],
+        columns=['id', 'Category', 'Count'])
+    cats['Count'] = cats.Count.astype(np.int64)
+
+    # tweets: newest first, so the existing rows move
+    all_tweets = pd.concat([
+        df_tweets.assign(__old=np.arange(len(df_tweets))),
+        pd.DataFrame({
+            'date': new.Date.values.astype('datetime64[D]'),
+            'id': new.id.values,
+            'likes': new.likes.astype(np.int64).values,
+            'retweets': new.retweets.astype(np.int64).values,
+            'text': new.text.values,
+            '__old': -1,
+        })], ignore_index=True)
+    all_tweets['date'] = all_tweets.date.values.astype('datetime64[D]')
+    all_tweets = all_tweets \
+        .sort_values(by=['date', 'id'], ascending=False) \
+        .reset_index(drop=True)
+    old_rows = all_tweets['__old'].values
+    row_of_old = np.empty(len(df_tweets), dtype=np.int64)
+    row_of_old[old_rows[old_rows >= 0]] = np.flatnonzero(old_rows >= 0)
+    row_of_id = pd.Series(all_tweets.index, index=all_tweets.id)
+    tables['tweets'] = all_tweets.drop(columns=['__old'])
+
+    df_entity_tweets = tables['entity_tweets']
+    tables['entity_tweets'] = pd.concat([
+        pd.DataFrame({
+            'Entity': df_entity_tweets.Entity.values,
+            'row': row_of_old[df_entity_tweets.row.values]}),
+        pd.DataFrame({
+            'Entity': tweet_entities.Entity.values,
+            'row': row_of_id[tweet_entities.id.values].values}),
+    ]).sort_values(by=['Entity', 'row'])
+
+    df_terms = tables['terms']
+    new_terms = search.build_postings(new.text)
+    tables['terms'] = pd.concat([
+        pd.DataFrame({
+            'term': df_terms.term.values,
+            'row': row_of_old[df_terms.row.values]}),
+        pd.DataFrame({
+            'term': new_terms.term.values,
+            'row': row_of_id[new.id.values[new_terms.row.values]].values}),
+    ]).sort_values(by=['term', 'row'])
+
+    # counts
+    tables['entity_counts'] = _add(
+        tables['entity_counts'],
+        mentions.assign(Count=1)[['Entity', 'Count']],
+        ['Entity'], ['Count']) \
+        .sort_values(by='Count', ascending=False, kind='stable')
+    tables['volume'] = _add(
+        tables['volume'],
+        new.assign(Count=1)[['Date', 'Count']],
+        ['Date'], ['Count']) \
+        .sort_values(by='Date', kind='stable')
+
+    df_attention = _add(
+        tables['entity_attention'],
+        mentions.assign(Count=1)[['Entity', 'Date', 'Count']],
+        ['Entity', 'Date'], ['Count'])
+    dates = pd.date_range(df_attention.Date.min(), df_attention.Date.max())
+    df_attention = _grid(df_attention, dates, 'Entity')
+    df_attention['Count'] = df_attention.Count.fillna(0).astype(np.int64)
+    tables['entity_attention'] = df_attention[['Date', 'Entity', 'Count']] \
+        .sort_values(by='Date', kind='stable')
+
+    df_liwc_time = tables['liwc_time']
+    day_tokens = new.groupby('Date', as_index=False).n_tokens.sum() \
+        .rename(columns={'n_tokens': 'Number of Tokens'})
+    day_cats = cats.merge(new[['id', 'Date']], on='id')
+    df_liwc_time = _add(
+        df_liwc_time,
+        day_cats[['Date', 'Category', 'Count']],
+        ['Date', 'Category'], ['Count'])
+    df_liwc_time = _grid(df_liwc_time, dates, 'Category')
+    df_liwc_time['Count'] = df_liwc_time.Count.fillna(0).astype(np.int64)
+    # the number of tokens is per day, the same for every category
+    n = df_liwc_time.groupby('Date')['Number of Tokens'].max().fillna(0) \
+        .add(day_tokens.set_index('Date')['Number of Tokens'], fill_value=0)
+    df_liwc_time['Number of Tokens'] = \
+        n[df_liwc_time.Date].values.astype(np.int64)
+    df_liwc_time['Frequency'] = (
+        df_liwc_time.Count / df_liwc_time['Number of Tokens']).fillna(0.)
+    tables['liwc_time'] = df_liwc_time[
+        ['Date', 'Category', 'Count', 'Number of Tokens', 'Frequency']] \
+        .sort_values(by='Date', kind='stable')
+
+    # NPMI: every (entity, category) pair, from the count totals
+    df_liwc = tables['liwc']
+    n_tokens = int(df_liwc.n_tokens.max() if len(df_liwc) else 0) \
+        + int(new.n_tokens.sum())
+    n_tokens_cat = df_liwc.groupby('Category').n_tokens_cat.max() \
+        .add(cats.groupby('Category').Count.sum(), fill_value=0)
+    n_tokens_entity = df_liwc.groupby('Entity').n_tokens_entity.max() \
+        .add(tweet_entities.groupby('Entity').n_tokens.sum(), fill_value=0)
+    entity_cats = cats.merge(tweet_entities[['id', 'Entity']], on='id')
+    n_tokens_entity_cat = df_liwc \
+        .set_index(['Entity', 'Category']).n_tokens_entity_cat \
+        .add(entity_cats.groupby(['Entity', 'Category']).Count.sum(),
+             fill_value=0)
+    # in the existing order, with anything new at the end
+    index = pd.MultiIndex.from_product(
+        [list(dict.fromkeys([*df_liwc.Entity, *n_tokens_entity.index])),
+         list(dict.fromkeys([*df_liwc.Category, *n_tokens_cat.index]))],
+        names=['Entity', 'Category'])
+    df_liwc = pd.DataFrame(index=index).reset_index()
+    df_liwc['n_tokens'] = n_tokens
+    df_liwc['n_tokens_entity'] = \
+        n_tokens_entity[df_liwc.Entity].values.astype(np.int64)
+    df_liwc['n_tokens_cat'] = \
+        n_tokens_cat[df_liwc.Category].values.astype(np.int64)
+    df_liwc['n_tokens_entity_cat'] = n_tokens_entity_cat \
+        .reindex(index, fill_value=0).values.astype(np.int64)
+    tables['liwc'] = npmi(df_liwc)[tables['liwc'].columns]
+
+    # the same counts by day, so NPMI can be worked out for date windows
+    day = pd.Series(
+        new.Date.values.astype('datetime64[D]'),
+        index=new.id.values)
+    tables['entity_tokens_time'] = pd.concat([
+        tables['entity_tokens_time'],
+        pd.DataFrame({
+            'Date': day[tweet_entities.id.values].values,
+            'Entity': tweet_entities.Entity.values,
+            'Tokens': tweet_entities.n_tokens.values.astype(np.int64)})
+    ]).groupby(['Date', 'Entity'], as_index=False).Tokens.sum()
+    tables['entity_cats_time'] = pd.concat([
+        tables['entity_cats_time'],
+        pd.DataFrame({
+            'Date': day[entity_cats.id.values].values,
+            'Entity': entity_cats.Entity.values,
+            'Category': entity_cats.Category.values,
+            'Count': entity_cats.Count.values})
+    ]).groupby(['Date', 'Entity', 'Category'], as_index=False).Count.sum()
+    return tables
@@ -1,8 +1,22 @@
+import fcntl
 import json
+import logging
+import os
+import threading
+import time
+from typing import Iterator, List, Optional, Sequence, Tuple
 
+import numpy as np
 import pandas as pd
 
+from pna.bundle import MANIFEST, Bundle, date_window, write_bundle
 from pna.dbi import Dbi
+from pna.ingest import add_tweets, TWEET_TABLES
+from pna.neighbours import NeighbourIndex, normalise
+from pna.npmi import NpmiEngine
+from pna import search
+
+logger = logging.getLogger(__name__)
 
 
 class Logic:
@@ -10,67 +24,212 @@ class Logic:
     def __init__(self, dbi: Dbi):
         self.dbi = dbi
 
+    def corpus_version(self) -> str:
+        # changes whenever the underlying corpus data does
+        raise NotImplementedError
+
     def entity_counts(self) -> pd.DataFrame:
         raise NotImplementedError
 
     def vector_neighbourhood(self, anchor: str) -> pd.DataFrame:
         raise NotImplementedError
 
+    def vector_neighbourhoods(self, anchors: List[str]) -> pd.DataFrame:
+        # the union of the anchors' neighbourhoods, projected together, each
+        # token labelled with the anchor it is most similar to
+        raise NotImplementedError
+
     def liwc_profile(self, entity: str) -> pd.DataFrame:
         raise NotImplementedError
 
-    def sentences(self, entity: str) -> pd.DataFrame:
+    def liwc_profiles(self,
+                      entities: List[str],
+                      start: Optional[str] = None,
+                      end: Optional[str] = None,
+                      combine: bool = False) -> pd.DataFrame:
+        # NPMI profiles of each entity - or, with combine, of the entities
+        # taken together - optionally over only the days from start to end
+        # (with the entity counts and NPMI NaN where not known for those)
+        raise NotImplementedError
+
+    # Methods taking start and end only return rows dated from start to end
+    # (inclusive days, as 'YYYY-MM-DD'; None for no limit).
+
+    def date_range(self) -> Tuple[str, str]:
+        # the first and last day of the corpus
+        raise NotImplementedError
+
+    def sentences(self,
+                  entity: str,
+                  start: Optional[str] = None,
+                  end: Optional[str] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def search_sentences(self,
+                         entity: str,
+                         keywords: List[str],
+                         match_all: bool = False,
+                         start: Optional[str] = None,
+                         end: Optional[str] = None) -> pd.DataFrame:
+        # sentences containing any (or all) of the keywords
         raise NotImplementedError
 
-    def entity_counts_over_time(self, entity: str) -> pd.DataFrame:
+    def iter_sentences(self,
+                       entity: str,
+                       keywords: Sequence[str] = (),
+                       match_all: bool = False,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None,
+                       chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        # as search_sentences, chunk_size rows at a time (at least one, maybe
+        # empty, chunk) - for exports, which needn't hold them all at once
         raise NotImplementedError
 
-    def corpus_volume_over_time(self) -> pd.DataFrame:
+    def entity_counts_over_time(self,
+                                entity: str,
+                                start: Optional[str] = None,
+                                end: Optional[str] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def corpus_volume_over_time(self,
+                                start: Optional[str] = None,
+                                end: Optional[str] = None) -> pd.DataFrame:
         raise NotImplementedError
 
     def in_vocab(self, word: str) -> bool:
         raise NotImplementedError
 
-    def liwc_over_time(self) -> pd.DataFrame:
+    def liwc_over_time(self,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def ingest(self, tweets: pd.DataFrame) -> int:
+        # adds new (annotated) tweets to the corpus, returning how many
         raise NotImplementedError
 
+    def refresh(self) -> bool:
+        # picks up corpus changes made by another process, returning whether
+        # there were any
+        return False
+
+    def nbytes(self) -> int:
+        # roughly how much memory the loaded corpus takes (0 if unknown) -
+        # for memory mapped data, the bytes mapped so far, which is at most
+        # (not necessarily) what is resident
+        return 0
+
+    def release(self) -> None:
+        # the corpus is let go: drops anything kept for it elsewhere, such
+        # as cached results
+        pass
+
 
 class PhillipinesEmbassyLogic(Logic):
+    # bump whenever build_bundle changes what it writes
+    SCHEMA = 7
+    TWEET_URL = 'https://twitter.com/chinaembmanila/status/'
+    GROUPS = {
+        'liwc': 'Entity',
+        'entity_attention': 'Entity',
+        'pca': 'token',
+        'entity_tweets': 'Entity',
+        'terms': 'term',
+        'neighbours': 'Anchor',
+    }
+    # entities and categories are stored as codes into one dictionary each
+    DICTIONARIES = {
+        'entity': [
+            'entity_counts.Entity', 'liwc.Entity', 'entity_attention.Entity',
+            'entity_tweets.Entity', 'entity_tokens_time.Entity',
+            'entity_cats_time.Entity'],
+        'category': [
+            'liwc.Category', 'liwc_time.Category',
+            'entity_cats_time.Category'],
+    }
 
-    def __init__(self, dbi: Dbi):
+    def __init__(self,
+                 dbi: Dbi,
+                 bundle_dir: str = 'data/ph_bundle',
+                 refresh_every: float = 1.,
+                 data_dir: str = 'data'):
+        # - refresh_every: how often (seconds) refresh() looks for a bundle
+        #   replaced on disk
+        # - data_dir: where the bundle is built from, if it needs to be
         super().__init__(dbi)
-        self.df_entity_counts = pd.read_csv('data/ph_entity_counts.csv')
-        self.df_liwc = pd.read_csv('data/ph_npmis.csv')
-        with open('data/ph_entity_to_sents.json') as f:
-            self.entity_to_sents = json.loads(f.read())
-        self.df_entity_attention = pd.read_csv(
-            'data/ph_entity_attention_over_time.csv')
-        self.df_volume = pd.read_csv('data/ph_tweet_volume.csv')
-        self.df_pca = pd.read_csv('data/ph_pca_df.csv')
-        with open('data/ph_neighbours.json') as f:
-            self.entity_to_neighbours = json.loads(f.read())
-        with open('data/ph_vocab.dic') as f:
-            self.vocab = json.loads(f.read())
-        self.df_liwc_time = pd.read_csv('data/ph_liwc_time.csv')
-        self._fix_names()
-
-    def _fix_names(self):
-        self.df_entity_counts.rename(
+        if not self._bundle_ok(bundle_dir):
+            # under ingest's lock file, so that processes starting together
+            # build it once, and not over each other
+            with open(f'{bundle_dir}.lock', 'w') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                if not self._bundle_ok(bundle_dir):
+                    self.build_bundle(bundle_dir, data_dir)
+        self.bundle_dir = bundle_dir
+        self.refresh_every = refresh_every
+        self._next_refresh = 0.
+        self._ingest_lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def _bundle_ok(cls, bundle_dir: str) -> bool:
+        return Bundle.exists(bundle_dir) \
+            and Bundle(bundle_dir).meta.get('schema') == cls.SCHEMA
+
+    def _load(self) -> None:
+        bundle = Bundle(self.bundle_dir)
+        # Map every column and build the key -> row range indices up front:
+        # not on first click, and so a bundle replaced on disk (by ingest)
+        # can't take files away from a query still using the old one.
+        for table in bundle.tables():
+            for column in bundle.columns(table):
+                bundle.column(table, column)
+            if bundle.manifest['tables'][table]['key'] is not None:
+                bundle.groups(table)
+        if 'vectors' in bundle.arrays():
+            neighbours = NeighbourIndex(
+                bundle.values('embedding', 'token'), bundle.array('vectors'))
+        else:
+            neighbours = None
+        npmi = NpmiEngine(
+            bundle.frame('liwc'),
+            bundle.frame('liwc_time'),
+            bundle.frame('entity_tokens_time'),
+            bundle.frame('entity_cats_time'),
+            dated_from=bundle.meta.get('dated_from'))
+        self.bundle, self.neighbours, self.npmi = bundle, neighbours, npmi
+
+    @classmethod
+    def build_bundle(cls, bundle_dir: str, data_dir: str = 'data') -> None:
+        # compile the raw csv and json files into a columnar bundle, with the
+        # final column names already applied
+        def path(name):
+            return os.path.join(data_dir, name)
+
+        df_entity_counts = pd.read_csv(path('ph_entity_counts.csv'))
+        df_entity_counts.rename(
             columns={'entity': 'Entity', 'count': 'Count'},
             inplace=True)
-        self.df_liwc.rename(
+        df_liwc = pd.read_csv(path('ph_npmis.csv'))
+        df_liwc.rename(
             columns={'entity': 'Entity', 'cat': 'Category', 'npmi': 'NPMI'},
             inplace=True)
-        self.df_entity_attention.rename(
+        df_entity_attention = pd.read_csv(
+            path('ph_entity_attention_over_time.csv'))
+        df_entity_attention.rename(
             columns={'entity': 'Entity', 'date': 'Date', 'count': 'Count'},
             inplace=True)
-        self.df_volume.rename(
+        # grouping by entity is stable, so each entity's rows stay in date order
+        df_entity_attention.sort_values(by='Date', kind='stable', inplace=True)
+        df_volume = pd.read_csv(path('ph_tweet_volume.csv'))
+        df_volume.rename(
             columns={'date': 'Date', 'tweet': 'Count'},
             inplace=True)
-        self.df_pca.rename(
+        df_pca = pd.read_csv(path('ph_pca_df.csv'))
+        df_pca.rename(
             columns={'pc1': 'PC1', 'pc2': 'PC2'},
             inplace=True)
-        self.df_liwc_time.rename(
+        df_liwc_time = pd.read_csv(path('ph_liwc_time.csv'))
+        df_liwc_time.rename(
             columns={
                 'date': 'Date',
                 'cat': 'Category',
@@ -79,47 +238,318 @@ class PhillipinesEmbassyLogic(Logic):
                 'n': 'Number of Tokens'
             },
             inplace=True)
+        df_liwc_time.sort_values(by='Date', kind='stable', inplace=True)
+        # dates are stored as datetime64 and kept sorted (within each entity
+        # for entity_attention), so date windows are binary searches
+        for df in [df_entity_attention, df_volume, df_liwc_time]:
+            df['Date'] = pd.to_datetime(df.Date)
+
+        # Each tweet is stored once, newest first, and each entity maps to
+        # the (sorted) rows of the tweets mentioning it.
+        with open(path('ph_entity_to_sents.json')) as f:
+            entity_to_sents = json.loads(f.read())
+        df_mentions = pd.DataFrame(
+            [dict(Entity=entity, **sent)
+             for entity, sents in entity_to_sents.items()
+             for sent in sents],
+            columns=['Entity', 'date', 'id', 'likes', 'retweets', 'text'])
+        df_mentions.text.fillna('', inplace=True)
+        if not df_mentions.text.any():
+            # e.g. the shipped data, which has only the tweets' ids
+            logger.warning(
+                f'{path("ph_entity_to_sents.json")} has no tweet text: '
+                'keyword searches will find nothing.')
+        df_tweets = df_mentions \
+            .drop(columns=['Entity']) \
+            .drop_duplicates(subset='id') \
+            .sort_values(by=['date', 'id'], ascending=False) \
+            .reset_index(drop=True)
+        df_tweets['id'] = df_tweets['id'].astype(np.int64)
+        df_tweets['date'] = pd.to_datetime(
+            df_tweets.date.str.split('T').str[0]).values.astype('datetime64[D]')
+        row_of_id = pd.Series(df_tweets.index, index=df_tweets.id)
+        df_entity_tweets = pd.DataFrame({
+            'Entity': df_mentions.Entity.values,
+            'row': row_of_id[df_mentions.id.values].values,
+        }).drop_duplicates().sort_values(by=['Entity', 'row'])
+        df_terms = search.build_postings(df_tweets.text)
+        with open(path('ph_neighbours.json')) as f:
+            entity_to_neighbours = json.loads(f.read())
+        df_neighbours = pd.DataFrame(
+            [(anchor, token)
+             for anchor, tokens in entity_to_neighbours.items()
+             for token in tokens],
+            columns=['Anchor', 'token'])
+        with open(path('ph_vocab.dic')) as f:
+            vocab = json.loads(f.read())
+        df_vocab = pd.DataFrame(
+            list(vocab.items()), columns=['token', 'index'])
+        # entity token counts by day - the raw data only has them in total,
+        # so these start empty and are filled by ingest, covering the days
+        # after the raw data's
+        last_day = max(df.max() for df in [
+            df_tweets.date, df_volume.Date, df_liwc_time.Date,
+            df_entity_attention.Date])
+        dated_from = str(np.datetime64(last_day, 'D') + 1)
+        df_entity_tokens_time = pd.DataFrame({
+            'Date': np.empty(0, dtype='datetime64[D]'),
+            'Entity': pd.Series([], dtype=object),
+            'Tokens': np.empty(0, dtype=np.int64)})
+        df_entity_cats_time = pd.DataFrame({
+            'Date': np.empty(0, dtype='datetime64[D]'),
+            'Entity': pd.Series([], dtype=object),
+            'Category': pd.Series([], dtype=object),
+            'Count': np.empty(0, dtype=np.int64)})
+        # the word vectors, unit length, for searching neighbours live
+        tables, arrays = {}, {}
+        if os.path.exists(path('ph.wv')):
+            from gensim.models import KeyedVectors
+            kv = KeyedVectors.load(path('ph.wv'))
+            tables['embedding'] = pd.DataFrame(
+                {'token': pd.Series(kv.index_to_key, dtype=object)})
+            arrays['vectors'] = normalise(kv.vectors)
+
+        write_bundle(
+            bundle_dir,
+            tables={
+                'entity_counts': df_entity_counts,
+                'liwc': df_liwc,
+                'entity_attention': df_entity_attention,
+                'volume': df_volume,
+                'pca': df_pca,
+                'liwc_time': df_liwc_time,
+                'tweets': df_tweets,
+                'entity_tweets': df_entity_tweets,
+                'terms': df_terms,
+                'neighbours': df_neighbours,
+                'vocab': df_vocab,
+                'entity_tokens_time': df_entity_tokens_time,
+                'entity_cats_time': df_entity_cats_time,
+                **tables,
+            },
+            groups=cls.GROUPS,
+            arrays=arrays,
+            meta={'schema': cls.SCHEMA, 'dated_from': dated_from},
+            dictionaries=cls.DICTIONARIES)
+
+    def ingest(self, tweets: pd.DataFrame) -> int:
+        # Writes a new bundle with the tweets added (see pna.ingest) and
+        # swaps it in. Other processes serving the same bundle pick it up on
+        # refresh(). The lock file keeps concurrent ingests from losing
+        # each other's tweets.
+        #
+        # Only the tables derived from the tweets are read and rewritten,
+        # the rest (vectors, PCA, neighbours, vocabulary) hard-linked from
+        # the current bundle. Those tables are still rewritten whole, so a
+        # batch costs time and memory in proportion to the tweets in the
+        # corpus (and their terms and mentions), not just to the batch.
+        with self._ingest_lock, open(f'{self.bundle_dir}.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load()  # in case another process ingested meanwhile
+            bundle = self.bundle
+            tables = {t: bundle.frame(t) for t in TWEET_TABLES}
+            updated = add_tweets(tables, tweets)
+            added = len(updated['tweets']) - len(tables['tweets'])
+            if added:
+                write_bundle(
+                    self.bundle_dir,
+                    tables=updated,
+                    groups=self.GROUPS,
+                    meta=bundle.meta,
+                    dictionaries=self.DICTIONARIES,
+                    base=bundle)
+                self._load()
+        return added
+
+    def refresh(self) -> bool:
+        if time.monotonic() < self._next_refresh:
+            return False
+        self._next_refresh = time.monotonic() + self.refresh_every
+        try:
+            with open(os.path.join(self.bundle_dir, MANIFEST)) as f:
+                version = json.loads(f.read())['id']
+            if version == self.bundle.id:
+                return False
+            self._load()
+        except FileNotFoundError:
+            return False  # being replaced right now, try again later
+        return True
+
+    def corpus_version(self) -> str:
+        return self.bundle.id
+
+    def nbytes(self) -> int:
+        return self.bundle.nbytes() + self.npmi.nbytes()
+
+    def _rows(self, table: str, key: str) -> slice:
+        return self.bundle.groups(table).get(key, slice(0, 0))
 
     def entity_counts(self) -> pd.DataFrame:
-        return self.df_entity_counts
+        return self.bundle.frame('entity_counts')
 
     def vector_neighbourhood(self, anchor: str) -> pd.DataFrame:
-        neighbours = self.entity_to_neighbours[anchor]
-        df = self.df_pca
-        df = df[df.token.isin(neighbours + [anchor])]
-        return df
+        if self.neighbours is not None:
+            neighbours = self.neighbours.neighbours(anchor, 100)
+        else:
+            # no word vectors, only the neighbours precomputed for entities
+            rows = self.bundle.groups('neighbours')[anchor]
+            neighbours = self.bundle.values('neighbours', 'token', rows)
+        tokens = self.bundle.groups('pca')
+        keep = [tokens[t].start for t in [*neighbours, anchor] if t in tokens]
+        return self.bundle.frame('pca', rows=np.unique(keep))
+
+    def vector_neighbourhoods(self, anchors: List[str]) -> pd.DataFrame:
+        if self.neighbours is None:
+            # no word vectors - fall back to the precomputed coordinates
+            df = pd.concat(
+                [self.vector_neighbourhood(a).assign(Anchor=a)
+                 for a in anchors] or [self.bundle.frame('pca', rows=[])])
+            return df.drop_duplicates(subset='token').reset_index(drop=True)
+        anchors = list(dict.fromkeys(anchors))
+        if not anchors:
+            return pd.DataFrame(columns=['token', 'PC1', 'PC2', 'Anchor'])
+        tokens = list(dict.fromkeys(
+            anchors + [t for neighbours in self.neighbours.neighbours_many(
+                anchors, 100) for t in neighbours]))
+        index = self.neighbours
+        vectors = np.stack([index.vector(t) for t in tokens])
+        nearest = np.argmax(
+            vectors @ np.stack([index.vector(a) for a in anchors]).T, axis=1)
+        coordinates = index.projection(tuple(sorted(tokens)))
+        order = np.argsort(np.argsort(tokens))
+        return pd.DataFrame({
+            'token': tokens,
+            'PC1': coordinates[order, 0],
+            'PC2': coordinates[order, 1],
+            'Anchor': np.asarray(anchors)[nearest],
+        })
 
     def liwc_profile(self, entity: str) -> pd.DataFrame:
-        df = self.df_liwc
-        df = df[df.Entity == entity]
-        return df
+        return self.liwc_profiles([entity])
 
-    def sentences(self, entity: str) -> pd.DataFrame:
-        sents = self.entity_to_sents[entity]
-        df = pd.DataFrame(sents)
-        df.date = df.date.apply(lambda x: x.split('T')[0])
-        df['Url'] = df['id'].apply(
-            lambda x: f'https://twitter.com/chinaembmanila/status/{x}')
-        name_map = {
-            'date': 'Date',
-            'likes': 'Likes',
-            'retweets': 'Retweets',
-        }
-        df.rename(columns=name_map, inplace=True)
-        df.drop(columns=['id'], inplace=True)
-        df.drop_duplicates(subset='Url', inplace=True)
-        return df
+    def liwc_profiles(self,
+                      entities: List[str],
+                      start: Optional[str] = None,
+                      end: Optional[str] = None,
+                      combine: bool = False) -> pd.DataFrame:
+        return self.npmi.profiles(
+            entities, start=start, end=end, combine=combine)
+
+    def _tweet_rows(self,
+                    entity: str,
+                    start: Optional[str] = None,
+                    end: Optional[str] = None) -> np.ndarray:
+        rows = self._rows('entity_tweets', entity)
+        rows = self.bundle.column('entity_tweets', 'row')[rows]
+        if start is None and end is None:
+            return rows
+        # tweets are newest first, so a window of them is a range of rows
+        # (of days, as stored)
+        dates = self.bundle.column('tweets', 'date')[::-1]
+        window = date_window(dates, start, end)
+        return search.restrict(
+            rows, slice(len(dates) - window.stop, len(dates) - window.start))
+
+    def sentences(self,
+                  entity: str,
+                  start: Optional[str] = None,
+                  end: Optional[str] = None) -> pd.DataFrame:
+        return self._sentence_frame(self._tweet_rows(entity, start, end))
+
+    def search_sentences(self,
+                         entity: str,
+                         keywords: List[str],
+                         match_all: bool = False,
+                         start: Optional[str] = None,
+                         end: Optional[str] = None) -> pd.DataFrame:
+        return self._sentence_frame(
+            self._search_rows(entity, keywords, match_all, start, end))
+
+    def iter_sentences(self,
+                       entity: str,
+                       keywords: Sequence[str] = (),
+                       match_all: bool = False,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None,
+                       chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        # the rows are from the bundle loaded now, even if ingestion replaces
+        # it while the chunks are still being read
+        bundle = self.bundle
+        rows = self._search_rows(entity, keywords, match_all, start, end)
+        for i in range(0, max(len(rows), 1), chunk_size):
+            yield self._sentence_frame(rows[i:i + chunk_size], bundle)
+
+    def _search_rows(self,
+                     entity: str,
+                     keywords: Sequence[str],
+                     match_all: bool,
+                     start: Optional[str],
+                     end: Optional[str]) -> np.ndarray:
+        rows = self._tweet_rows(entity, start, end)
+        if not keywords:
+            return rows
+        terms = self.bundle.groups('terms')
+        term_rows = self.bundle.column('terms', 'row')
 
-    def entity_counts_over_time(self, entity: str) -> pd.DataFrame:
-        df = self.df_entity_attention
-        df = df[df.Entity == entity].sort_values(by='Date', ascending=True)
+        def postings(term):
+            return term_rows[terms.get(term, slice(0, 0))]
+
+        return search.match(postings, rows, keywords, match_all=match_all)
+
+    def _sentence_frame(self,
+                        rows: np.ndarray,
+                        bundle: Optional[Bundle] = None) -> pd.DataFrame:
+        if bundle is None:
+            bundle = self.bundle
+        ids = bundle.column('tweets', 'id')[rows]
+        return pd.DataFrame({
+            'Date': np.datetime_as_string(
+                bundle.values('tweets', 'date', rows), unit='D'),
+            'Likes': bundle.column('tweets', 'likes')[rows],
+            'Retweets': bundle.column('tweets', 'retweets')[rows],
+            'Sentence': bundle.values('tweets', 'text', rows),
+            'Url': np.char.add(self.TWEET_URL, ids.astype(str)),
+        })
+
+    def _dated_frame(self,
+                     table: str,
+                     rows: slice,
+                     start: Optional[str],
+                     end: Optional[str]) -> pd.DataFrame:
+        # the rows (in date order) within the window, dates as strings
+        dates = self.bundle.column(table, 'Date')[rows]
+        window = date_window(dates, start, end)
+        df = self.bundle.frame(table, rows=slice(
+            rows.start + window.start, rows.start + window.stop))
+        df['Date'] = np.datetime_as_string(df.Date.values, unit='D')
         return df
 
-    def corpus_volume_over_time(self) -> pd.DataFrame:
-        return self.df_volume
+    def date_range(self) -> Tuple[str, str]:
+        dates = self.bundle.values('volume', 'Date', [0, -1])
+        first, last = np.datetime_as_string(dates, unit='D')
+        return str(first), str(last)
+
+    def entity_counts_over_time(self,
+                                entity: str,
+                                start: Optional[str] = None,
+                                end: Optional[str] = None) -> pd.DataFrame:
+        # rows are stored in date order, so this is just a slice
+        rows = self._rows('entity_attention', entity)
+        return self._dated_frame('entity_attention', rows, start, end)
+
+    def corpus_volume_over_time(self,
+                                start: Optional[str] = None,
+                                end: Optional[str] = None) -> pd.DataFrame:
+        rows = slice(0, self.bundle.rows('volume'))
+        return self._dated_frame('volume', rows, start, end)
 
     def in_vocab(self, word: str) -> bool:
-        return word in self.entity_to_neighbours
+        if self.neighbours is not None:
+            return word in self.neighbours
+        return word in self.bundle.groups('neighbours')
 
-    def liwc_over_time(self) -> pd.DataFrame:
-        return self.df_liwc_time
+    def liwc_over_time(self,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None) -> pd.DataFrame:
+        rows = slice(0, self.bundle.rows('liwc_time'))
+        return self._dated_frame('liwc_time', rows, start, end)
@@ -0,0 +1,266 @@
+from bisect import bisect_left
+import inspect
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dash.exceptions import PreventUpdate
+
+from pna.logic import Logic
+
+
+# Metrics kept in memory and served in the Prometheus text format (see
+# /metrics): latency and response size histograms per Dash callback, time
+# per Logic and database method, and the counters the app's parts keep in
+# their stats() - cache hits, pool and executor use, loaded corpora.
+#
+# Each (prefork) worker keeps its own, so a scrape sees the worker that
+# happened to answer it - counters are per worker, and rate() over them is
+# still meaningful.
+
+SECONDS = (.005, .01, .025, .05, .1, .25, .5, 1., 2.5, 5., 10., 30.)
+BYTES = (1e2, 1e3, 1e4, 1e5, 1e6, 1e7)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+logger = logging.getLogger(__name__)
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _format(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        name += '{' + ','.join(
+            f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+    return f'{name} {value}'
+
+
+class Metrics:
+
+    def __init__(self, slow_callback: Optional[float] = None):
+        # - slow_callback: callbacks taking longer (seconds) are logged
+        self.slow_callback = slow_callback
+        self._histograms: Dict[str, Tuple[Tuple[float, ...], Dict]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: List[Tuple[str, Callable[[], Dict], Labels]] = []
+        self._lock = threading.Lock()
+
+    def observe(self,
+                name: str,
+                value: float,
+                buckets: Tuple[float, ...] = SECONDS,
+                **labels) -> None:
+        with self._lock:
+            _, series = self._histograms.setdefault(name, (buckets, {}))
+            # per bucket counts (the last for +Inf), sum, count
+            counts, total, n = series.get(
+                _labels(labels), ([0] * (len(buckets) + 1), 0., 0))
+            counts[bisect_left(buckets, value)] += 1
+            series[_labels(labels)] = (counts, total + value, n + 1)
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            key = _labels(labels)
+            series[key] = series.get(key, 0) + amount
+
+    def gauges(self,
+               prefix: str,
+               stats: Callable[[], Dict[str, float]],
+               **labels) -> None:
+        # each value stats() gives, as gauge {prefix}_{key}, read on render
+        self._gauges.append((prefix, stats, _labels(labels)))
+
+    def timed(self,
+              name: str,
+              labels: Dict[str, Any],
+              func: Callable,
+              *args,
+              **kwargs) -> Any:
+        # func(*args, **kwargs), timed - a generator it returns up to when
+        # it is exhausted or closed, counting only the time spent reading it
+        started = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            self.observe(name, time.perf_counter() - started, **labels)
+            raise
+        seconds = time.perf_counter() - started
+        if inspect.isgenerator(result):
+            return self._timed_iter(name, labels, result, seconds)
+        self.observe(name, seconds, **labels)
+        return result
+
+    def _timed_iter(self,
+                    name: str,
+                    labels: Dict[str, Any],
+                    values: Iterator,
+                    seconds: float) -> Iterator:
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    value = next(values)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - started
+                yield value
+        finally:
+            values.close()
+            self.observe(name, seconds, **labels)
+
+    def callback(self, name: str, func: Callable[..., str]) -> Callable:
+        # a Dash callback (as Dash wraps it: returning the JSON response)
+        # with its latency, response size and outcome recorded
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            outcome, size = 'error', None
+            try:
+                response = func(*args, **kwargs)
+                outcome, size = 'ok', len(response.encode())
+                return response
+            except PreventUpdate:
+                outcome = 'prevented'
+                raise
+            finally:
+                seconds = time.perf_counter() - started
+                self.observe('pna_callback_seconds', seconds, callback=name)
+                self.inc('pna_callback_calls_total',
+                         callback=name, outcome=outcome)
+                if size is not None:
+                    self.observe('pna_callback_response_bytes', size,
+                                 buckets=BYTES, callback=name)
+                if self.slow_callback is not None \
+                        and seconds >= self.slow_callback:
+                    logger.warning(
+                        'Slow callback %s: %.3fs (%s, %s bytes)',
+                        name, seconds, outcome, size)
+        return call
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            histograms = {name: (buckets, dict(series)) for name, (
+                buckets, series) in self._histograms.items()}
+            counters = {name: dict(series)
+                        for name, series in self._counters.items()}
+        for name, (buckets, series) in sorted(histograms.items()):
+            lines.append(f'# TYPE {name} histogram')
+            les = [f'{b:g}' for b in buckets] + ['+Inf']
+            for labels, (counts, total, n) in sorted(series.items()):
+                cumulative = 0
+                for le, count in zip(les, counts):
+                    cumulative += count
+                    lines.append(_format(
+                        f'{name}_bucket', labels + (('le', le),), cumulative))
+                lines.append(_format(f'{name}_sum', labels, float(total)))
+                lines.append(_format(f'{name}_count', labels, n))
+        for name, series in sorted(counters.items()):
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in sorted(series.items()):
+                lines.append(_format(name, labels, value))
+        gauges: Dict[str, List[str]] = {}
+        for prefix, stats, labels in self._gauges:
+            for key, value in stats().items():
+                name = f'{prefix}_{key}'
+                gauges.setdefault(name, []).append(
+                    _format(name, labels, value))
+        for name, samples in sorted(gauges.items()):
+            lines.append(f'# TYPE {name} gauge')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+def callback_name(output: str) -> str:
+    # 'a.b' for one output, 'a.b,c.d' for '..a.b...c.d..'
+    if output.startswith('..'):
+        return ','.join(output[2:-2].split('...'))
+    return output
+
+
+def instrument_callbacks(dash_app, metrics: Metrics) -> None:
+    for output, callback in dash_app.callback_map.items():
+        callback['callback'] = metrics.callback(
+            callback_name(output), callback['callback'])
+
+
+class _Metered:
+    # times calls to the target's public methods
+
+    def __init__(self, target: Any, metrics: Metrics, name: str, prefix: str):
+        self._target = target
+        self._metrics = metrics
+        self._name = name
+        self._prefix = prefix
+
+    def __getattr__(self, attr: str):
+        value = getattr(self._target, attr)
+        if attr.startswith('_') or attr == 'stats' or not callable(value):
+            return value
+        method = f'{self._prefix}{attr}'
+
+        def call(*args, **kwargs):
+            return self._metrics.timed(
+                self._name, dict(method=method), value, *args, **kwargs)
+        return call
+
+
+def instrument_dbi(dbi, metrics: Metrics):
+    # the Dbi, with the time its repositories' methods take recorded
+    for name in ['narratives', 'narrative_labels']:
+        repository = getattr(dbi, name)
+        if not isinstance(repository, _Metered):
+            setattr(dbi, name, _Metered(
+                repository, metrics, 'pna_db_seconds', f'{name}.'))
+    return dbi
+
+
+class MeteredLogic(Logic):
+    # Wraps any Logic, recording the time its methods take.
+    METHODS = [
+        'entity_counts', 'vector_neighbourhood', 'vector_neighbourhoods',
+        'liwc_profile', 'liwc_profiles', 'date_range', 'sentences',
+        'search_sentences', 'iter_sentences', 'entity_counts_over_time',
+        'corpus_volume_over_time', 'in_vocab', 'liwc_over_time', 'ingest',
+        'refresh']
+
+    def __init__(self, logic: Logic, metrics: Metrics):
+        super().__init__(logic.dbi)
+        self.logic = logic
+        self.metrics = metrics
+
+    def __getattr__(self, name: str):
+        if name == 'logic':
+            raise AttributeError(name)
+        return getattr(self.logic, name)
+
+    def corpus_version(self) -> str:
+        return self.logic.corpus_version()
+
+    def nbytes(self) -> int:
+        return self.logic.nbytes()
+
+    def release(self) -> None:
+        self.logic.release()
+
+
+def _metered(method: str):
+    def call(self, *args, **kwargs):
+        return self.metrics.timed(
+            'pna_logic_seconds', dict(method=method),
+            getattr(self.logic, method), *args, **kwargs)
+    call.__name__ = method
+    return call
+
+
+for _method in MeteredLogic.METHODS:
+    setattr(MeteredLogic, _method, _metered(_method))
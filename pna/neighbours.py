@@ -0,0 +1,142 @@
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+# Nearest neighbours of a word in the corpus' word embedding, worked out when
+# asked for rather than read from a precomputed list - so every word in the
+# vocabulary can be an anchor, not just the entities.
+#
+# The search is exact: cosine similarity is a matrix-vector product over
+# (unit length) vectors, done a block of rows at a time so that the
+# temporaries stay small, keeping only each block's top k candidates. For
+# vocabularies of this size that's well under a millisecond, and gives the
+# same neighbours as gensim's most_similar. Several words are searched at
+# once with a matrix-matrix product, in a single pass over the vectors.
+#
+# Neighbourhoods are plotted in 2D, projected from the vectors of just the
+# tokens being plotted (PCA, or a random projection) - cached per token set,
+# as the same anchors tend to be asked for again.
+
+
+def normalise(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    # indices of the k highest scores, highest first - along the last axis,
+    # for each row of a 2D array
+    k = min(k, scores.shape[-1])
+    if k <= 0:
+        return np.empty(scores.shape[:-1] + (0,), dtype=np.int64)
+    top = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(
+        -np.take_along_axis(scores, top, axis=-1), axis=-1, kind='stable')
+    return np.take_along_axis(top, order, axis=-1)
+
+
+def project(vectors: np.ndarray,
+            n_components: int = 2,
+            method: str = 'pca',
+            seed: int = 0) -> np.ndarray:
+    # - pca: onto the top principal components of `vectors`, signs fixed so
+    #   the result doesn't flip between runs
+    # - random: a (seeded) gaussian random projection, cheaper for big sets
+    vectors = np.asarray(vectors, dtype=np.float64)
+    if method == 'pca':
+        centred = vectors - vectors.mean(axis=0)
+        _, _, components = np.linalg.svd(centred, full_matrices=False)
+        components = components[:n_components]
+        signs = np.sign(components[
+            np.arange(len(components)), np.abs(components).argmax(axis=1)])
+        return centred @ (components * signs[:, np.newaxis]).T
+    if method == 'random':
+        rng = np.random.default_rng(seed)
+        matrix = rng.normal(size=(vectors.shape[1], n_components))
+        return vectors @ (matrix / np.sqrt(n_components))
+    raise ValueError(f'Unknown projection method: {method}.')
+
+
+class NeighbourIndex:
+
+    def __init__(self,
+                 tokens: Sequence[str],
+                 vectors: np.ndarray,
+                 block_size: int = 65536,
+                 cache_size: int = 1024):
+        # - vectors: one row per token, expected to be unit length already
+        #   (see normalise) - memory mapped arrays are used as they are
+        self.tokens = np.asarray(tokens)
+        self.vectors = vectors
+        self.block_size = block_size
+        self._index = {token: i for i, token in enumerate(self.tokens)}
+        self.neighbours = lru_cache(maxsize=cache_size)(self._neighbours)
+        self.projection = lru_cache(maxsize=cache_size)(self._projection)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._index
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def vector(self, token: str) -> np.ndarray:
+        return np.asarray(self.vectors[self._index[token]])
+
+    def _neighbours(self, token: str, k: int = 100) -> Tuple[str, ...]:
+        # the k tokens most similar to `token` (itself excluded), most
+        # similar first; KeyError if it isn't in the vocabulary
+        rows, _ = self.search(self.vector(token), k + 1)
+        rows = rows[rows != self._index[token]][:k]
+        return tuple(self.tokens[rows])
+
+    def neighbours_many(self,
+                        tokens: Sequence[str],
+                        k: int = 100) -> List[Tuple[str, ...]]:
+        # neighbours of each of `tokens`, as from neighbours(), in one search
+        if not len(tokens):
+            return []
+        indices = np.array([self._index[token] for token in tokens])
+        rows, _ = self.search_many(
+            np.asarray(self.vectors[indices]), k + 1)
+        return [tuple(self.tokens[r[r != i][:k]])
+                for r, i in zip(rows, indices)]
+
+    def _projection(self,
+                    tokens: Tuple[str, ...],
+                    method: str = 'pca') -> np.ndarray:
+        # 2D coordinates of `tokens`, projected from their vectors alone
+        indices = [self._index[token] for token in tokens]
+        return project(np.asarray(self.vectors[indices]), method=method)
+
+    def search(self,
+               query: np.ndarray,
+               k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # rows and similarities of the k vectors most similar to `query`
+        rows, scores = self.search_many(query[np.newaxis], k)
+        return rows[0], scores[0]
+
+    def search_many(self,
+                    queries: np.ndarray,
+                    k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # as search(), for each row of `queries`
+        queries = normalise(queries)
+        rows: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        for start in range(0, len(self.vectors), self.block_size):
+            block = queries @ np.asarray(
+                self.vectors[start:start + self.block_size]).T
+            top = top_k(block, k)
+            rows.append(top + start)
+            scores.append(np.take_along_axis(block, top, axis=1))
+        if not rows:
+            empty = (len(queries), 0)
+            return np.empty(empty, dtype=np.int64), \
+                np.empty(empty, dtype=np.float32)
+        rows, scores = np.hstack(rows), np.hstack(scores)
+        top = top_k(scores, k)
+        return np.take_along_axis(rows, top, axis=1), \
+            np.take_along_axis(scores, top, axis=1)
@@ -0,0 +1,187 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+from pna.bundle import date_window
+
+
+# NPMI between entities and word categories (LIWC), worked out on demand from
+# token counts - for an entity, a set of entities taken together, and
+# optionally only over a window of days:
+#   - n_tokens: tokens in the corpus
+#   - n_tokens_cat: of those, in the category
+#   - n_tokens_entity: tokens of tweets mentioning the entity
+#   - n_tokens_entity_cat: of those, in the category
+# The counts are kept as small integer arrays: totals as entity x category
+# matrices, and dated counts as (day, entity, category) triples in day order,
+# so a window is a slice and its totals one bincount.
+#
+# Dated entity counts only exist for tweets added by ingestion - the original
+# corpus only has them in total. So a window reaching back before the days
+# they cover (dated_from) has its entity counts, and everything worked out
+# from them, NaN - rather than counting just the ingested tweets, which would
+# read as a real (and wrong) answer. Its corpus and category totals are exact
+# either way.
+
+COLUMNS = [
+    'n_tokens', 'n_tokens_entity', 'n_tokens_cat', 'n_tokens_entity_cat',
+    'Entity', 'Category', 'p_y', 'p_y_x', 'p_xy', 'h_xy', 'pmi', 'NPMI']
+# those unknown for a window not covered by dated entity counts
+ENTITY_COLUMNS = [
+    'n_tokens_entity', 'n_tokens_entity_cat', 'p_y_x', 'p_xy', 'h_xy', 'pmi',
+    'NPMI']
+
+
+def npmi(df: pd.DataFrame) -> pd.DataFrame:
+    # (re)computes the NPMI columns from the count columns, as ph_npmis.csv
+    # has them - with h_xy, pmi and NPMI 0 where the entity and category
+    # never co-occur
+    seen = df.n_tokens_entity_cat > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df['p_y'] = (df.n_tokens_cat / df.n_tokens).fillna(0.)
+        df['p_y_x'] = (df.n_tokens_entity_cat / df.n_tokens_entity).fillna(0.)
+        df['p_xy'] = (df.n_tokens_entity_cat / df.n_tokens).fillna(0.)
+        df['h_xy'] = (-np.log2(df.p_xy)).where(seen, 0.)
+        df['pmi'] = np.log(df.p_y_x / df.p_y).where(seen, 0.)
+        df['NPMI'] = (df.pmi / df.h_xy).where(seen, 0.)
+    return df
+
+
+def _days(dates) -> np.ndarray:
+    return np.asarray(dates).astype('datetime64[D]')
+
+
+class NpmiEngine:
+
+    def __init__(self,
+                 df_totals: pd.DataFrame,
+                 df_daily: pd.DataFrame,
+                 df_entity_tokens: pd.DataFrame,
+                 df_entity_cats: pd.DataFrame,
+                 dated_from: Optional[str] = None):
+        # - df_totals: n_tokens, n_tokens_entity, n_tokens_cat,
+        #   n_tokens_entity_cat per Entity and Category (the liwc table)
+        # - df_daily: per Date and Category, Count and Number of Tokens (the
+        #   liwc_time table)
+        # - df_entity_tokens: per Date and Entity, Tokens
+        # - df_entity_cats: per Date, Entity and Category, Count
+        # - dated_from: the first day the last two cover (None: all days)
+        self.dated_from = None if dated_from is None \
+            else np.datetime64(dated_from, 'D')
+        self.entities = pd.Index(pd.unique(df_totals.Entity))
+        self.categories = pd.Index(pd.unique(df_totals.Category))
+        n_entities, n_cats = len(self.entities), len(self.categories)
+        entity = self.entities.get_indexer(df_totals.Entity)
+        cat = self.categories.get_indexer(df_totals.Category)
+
+        # totals
+        self.tokens = int(df_totals.n_tokens.max()) if len(df_totals) else 0
+        self.cat_tokens = np.zeros(n_cats, dtype=np.int64)
+        self.cat_tokens[cat] = df_totals.n_tokens_cat.values
+        self.entity_tokens = np.zeros(n_entities, dtype=np.int64)
+        self.entity_tokens[entity] = df_totals.n_tokens_entity.values
+        self.entity_cat_tokens = np.zeros((n_entities, n_cats), dtype=np.int64)
+        self.entity_cat_tokens[entity, cat] = \
+            df_totals.n_tokens_entity_cat.values
+
+        # by day
+        df_daily = df_daily[self.categories.get_indexer(df_daily.Category) >= 0]
+        self.day = _days(df_daily.Date.values)
+        order = np.argsort(self.day, kind='stable')
+        self.day = self.day[order]
+        self.day_cat = self.categories.get_indexer(df_daily.Category)[order]
+        self.day_cat_tokens = df_daily.Count.values[order].astype(np.int64)
+        # the number of tokens repeats for each category of a day
+        self.days, first = np.unique(self.day, return_index=True)
+        self.days_tokens = df_daily['Number of Tokens'] \
+            .values[order][first].astype(np.int64)
+
+        self.entity_day = _days(df_entity_tokens.Date.values)
+        order = np.argsort(self.entity_day, kind='stable')
+        self.entity_day = self.entity_day[order]
+        self.entity_day_entity = \
+            self.entities.get_indexer(df_entity_tokens.Entity)[order]
+        self.entity_day_tokens = \
+            df_entity_tokens.Tokens.values[order].astype(np.int64)
+
+        self.cat_day = _days(df_entity_cats.Date.values)
+        order = np.argsort(self.cat_day, kind='stable')
+        self.cat_day = self.cat_day[order]
+        # flattened (entity, category) index
+        self.cat_day_pair = (
+            self.entities.get_indexer(df_entity_cats.Entity) * n_cats
+            + self.categories.get_indexer(df_entity_cats.Category))[order]
+        self.cat_day_tokens = \
+            df_entity_cats.Count.values[order].astype(np.int64)
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in vars(self).values()
+                   if isinstance(a, np.ndarray))
+
+    def __contains__(self, entity: str) -> bool:
+        return entity in self.entities
+
+    def covers(self, start=None, end=None) -> bool:
+        # whether the window's entity counts are known
+        if (start is None and end is None) or self.dated_from is None:
+            return True
+        return start is not None \
+            and np.datetime64(start, 'D') >= self.dated_from
+
+    def _counts(self, start, end):
+        # tokens, cat tokens, entity tokens and entity x cat tokens - over
+        # everything, or the days from start to end
+        if start is None and end is None:
+            return self.tokens, self.cat_tokens, self.entity_tokens, \
+                self.entity_cat_tokens
+        n_entities, n_cats = len(self.entities), len(self.categories)
+        tokens = int(
+            self.days_tokens[date_window(self.days, start, end)].sum())
+        rows = date_window(self.day, start, end)
+        cat_tokens = np.bincount(
+            self.day_cat[rows], self.day_cat_tokens[rows], minlength=n_cats)
+        rows = date_window(self.entity_day, start, end)
+        entity_tokens = np.bincount(
+            self.entity_day_entity[rows], self.entity_day_tokens[rows],
+            minlength=n_entities)
+        rows = date_window(self.cat_day, start, end)
+        entity_cat_tokens = np.bincount(
+            self.cat_day_pair[rows], self.cat_day_tokens[rows],
+            minlength=n_entities * n_cats).reshape(n_entities, n_cats)
+        return tokens, cat_tokens.astype(np.int64), \
+            entity_tokens.astype(np.int64), entity_cat_tokens.astype(np.int64)
+
+    def profiles(self,
+                 entities: List[str],
+                 start: Optional[str] = None,
+                 end: Optional[str] = None,
+                 combine: bool = False) -> pd.DataFrame:
+        # One row per entity and category (entities not known are left
+        # out). With combine, the entities are taken as one (named by
+        # joining theirs) - by adding their counts, so tweets mentioning
+        # several of them count more than once.
+        index = self.entities.get_indexer(entities)
+        index = index[index >= 0]
+        names = self.entities[index]
+        tokens, cat_tokens, entity_tokens, entity_cat_tokens = \
+            self._counts(start, end)
+        entity_tokens = entity_tokens[index]
+        entity_cat_tokens = entity_cat_tokens[index]
+        if combine and len(index):
+            names = [', '.join(names)]
+            entity_tokens = entity_tokens.sum(keepdims=True)
+            entity_cat_tokens = entity_cat_tokens.sum(axis=0, keepdims=True)
+        n_cats = len(self.categories)
+        df = pd.DataFrame({
+            'n_tokens': np.full(len(names) * n_cats, tokens, dtype=np.int64),
+            'n_tokens_entity': np.repeat(entity_tokens, n_cats),
+            'n_tokens_cat': np.tile(cat_tokens, len(names)),
+            'n_tokens_entity_cat': entity_cat_tokens.ravel(),
+            'Entity': np.repeat(np.asarray(names, dtype=object), n_cats),
+            'Category': np.tile(self.categories.values, len(names)),
+        })
+        df = npmi(df)[COLUMNS]
+        if not self.covers(start, end):
+            df[ENTITY_COLUMNS] = np.nan
+        return df
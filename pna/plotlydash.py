@@ -1,15 +1,35 @@
 import json
 from typing import Dict, List, Optional
+from urllib.parse import urlencode
 
-from dash import callback_context, Dash
+from dash import callback_context, Dash, no_update
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 import dash_core_components as dcc
 import dash_table
 import dash_html_components as html
 import pandas as pd
-import plotly.express as px
 
+from pna import table
+from pna.corpora import Corpora
+from pna.executor import Executor
+from pna.figures import FigureCache
 from pna.logic import Logic
+from pna.metrics import instrument_callbacks
+from pna.search import parse_keywords
+from pna.store import ResultStore
+
+
+def bar(**kwargs):
+    # plotly.express takes a while to import (it builds its docstrings), so
+    # only once a figure is first made
+    import plotly.express as px
+    return px.bar(**kwargs)
+
+
+def scatter(**kwargs):
+    import plotly.express as px
+    return px.scatter(**kwargs)
 
 
 def in_a_row(*args, id='', margin: str = '2%', style: Dict = None,
@@ -56,16 +76,51 @@ def hidden_div(id: str, children: list = [], className: Optional[str] = None):
                     className=className)
 
 
+# narrative label table column -> repository column
+LABEL_COLUMNS = {
+    'Code': 'narrative_code',
+    'Annotator': 'annotator',
+    'Text': 'text',
+    'Description': 'description',
+}
+
+
 def data_table(df: pd.DataFrame,
                columns: Optional[List[str]] = None,
                id: str = '',
                edit_rows: bool = False,
                select_rows: Optional[str] = False,
                delete_rows: bool = False,
-               page_size=50):
+               page_size=50,
+               backend: bool = False):
+    # backend: paged, sorted and filtered server side (see pna.table) - the
+    # table starts empty, a callback on its page_current, sort_by and
+    # filter_query fills in data and page_count, and CSV downloads go through
+    # an export route rather than the browser
     if columns is None:
         columns = df.columns
     columns = [{'name': x, 'id': x} for x in columns]
+    if backend:
+        return dash_table.DataTable(
+            id=id,
+            columns=columns,
+            data=[],
+            page_action='custom',
+            page_current=0,
+            page_count=1,
+            sort_action='custom',
+            sort_mode='multi',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
+            style_cell={
+                'whiteSpace': 'normal',
+                'height': 'auto',
+            },
+            editable=edit_rows,
+            row_selectable=select_rows,
+            row_deletable=delete_rows,
+            page_size=page_size)
     return dash_table.DataTable(
         id=id,
         columns=columns,
@@ -83,6 +138,18 @@ def data_table(df: pd.DataFrame,
         export_format='csv')
 
 
+def export_url(path: str,
+               sort_by: Optional[List[Dict]] = None,
+               filter_query: Optional[str] = None) -> str:
+    # download link for a backend table's rows, as sorted and filtered
+    query = {}
+    if sort_by:
+        query['sort'] = json.dumps(sort_by)
+    if filter_query:
+        query['filter'] = filter_query
+    return f'{path}?{urlencode(query)}' if query else path
+
+
 def init_dashboard(server):
     dash_app = Dash(
         server=server,
@@ -97,7 +164,8 @@ def init_dashboard(server):
         # options
         html.H2('Corpus',
                 style={'float': 'left', 'clear': 'all'}),
-        document_set_selector(),
+        document_set_selector(dash_app.server.corpora),
+        date_range_selector(),
         initialize_button(),
 
         # corpus information
@@ -180,7 +248,7 @@ def init_dashboard(server):
         #             in_a_line(
         #                 html.H3(children='Tag Narratives',
         #                         style={'float': 'left', 'clear': 'both'}),
-        #                 html.Div(id='tagged_narrative_explorer_div'),
+        #                 tagged_narrative_explorer(),
         #                 tag_narrative())
         #         ),
         #     ],
@@ -193,7 +261,12 @@ def init_dashboard(server):
     ])
 
     # callbacks
-    init_callbacks(dash_app, dash_app.server.logic)
+    init_callbacks(dash_app,
+                   dash_app.server.corpora,
+                   dash_app.server.store,
+                   dash_app.server.figures,
+                   dash_app.server.executor)
+    instrument_callbacks(dash_app, dash_app.server.metrics)
 
     return dash_app.server
 
@@ -202,13 +275,25 @@ def init_dashboard(server):
 # form elements
 
 
-def document_set_selector():
-    # so far just giving the options of Taiwan (zh) and Twitter (en)
-    return radio(
-        label='Document Set:',
+def document_set_selector(corpora: Corpora):
+    # the corpora of the manifest, by id
+    label = html.Span(children=['Document Set:'])
+    control = dcc.RadioItems(
         id='document_set',
-        options=['Phillipines Embassy (en)'],
-        selection='Phillipines Embassy (en)')
+        options=corpora.options(),
+        value=corpora.default)
+    return in_a_row(label, control, style={'float': 'left', 'clear': 'both'})
+
+
+def date_range_selector():
+    # no dates chosen means the whole corpus; the dates allowed are set per
+    # corpus (by a callback)
+    label = html.Span(children=['Dates:'])
+    control = dcc.DatePickerRange(
+        id='date_range',
+        display_format='YYYY-MM-DD',
+        clearable=True)
+    return in_a_row(label, control, style={'float': 'left', 'clear': 'both'})
 
 
 def initialize_button():
@@ -231,7 +316,8 @@ def word_selection_controls():
         children=[
             in_a_line(
                 in_a_row(
-                    html.Span('Choose an entity from the above list:'),
+                    html.Span('Choose an entity from the above list (or '
+                              'several, comma separated, to compare):'),
                     dcc.Input(id='word_for_vectors', type='text'),
                     html.Button(id='update_word_selection',
                                 children=['Update'])),
@@ -309,6 +395,12 @@ def sentence_selector():
     return in_a_row(
         html.Span('View sentences containing words (separate with ,):'),
         dcc.Input(id='keywords_for_sentences', type='text'),
+        dcc.RadioItems(
+            id='keyword_match',
+            options=[{'label': 'any', 'value': 'any'},
+                     {'label': 'all', 'value': 'all'}],
+            value='any',
+            labelStyle={'display': 'inline-block'}),
         button(id='find_sentences', label='Find Sentences'),
         id='sentence_selector_form',
         style=dict(width='100%'))
@@ -329,8 +421,13 @@ def sentences():
                                          'Likes': [],
                                          'Retweets': []}),
                         columns=['Date', 'Url', 'Likes', 'Retweets'],
-                        page_size=10)
-                     )])
+                        page_size=10,
+                        backend=True)),
+            html.A('Download Data',
+                   id='download_sentences',
+                   download='sentences.csv',
+                   href='',
+                   target='_blank')])
 
 
 def sentence_context(context: Optional[Dict] = None):
@@ -369,6 +466,23 @@ def tag_narrative():
                 button(id='tag_narrative', label='Tag Narrative'))])
 
 
+def tagged_narrative_explorer():
+    return html.Div(
+        id='tagged_narrative_explorer_div',
+        children=[
+            data_table(
+                id='tagged_narrative_table',
+                df=pd.DataFrame(),
+                columns=list(LABEL_COLUMNS),
+                page_size=10,
+                backend=True),
+            html.A('Download Data',
+                   id='download_narrative_labels',
+                   download='narrative_labels.csv',
+                   href='/export/narrative_labels.csv',
+                   target='_blank')])
+
+
 def download_csv():
     return html.A(
         'Download Data',
@@ -382,7 +496,11 @@ def download_csv():
 # callbacks
 
 
-def init_callbacks(dash_app, logic: Logic):
+def init_callbacks(dash_app,
+                   corpora: Corpora,
+                   store: ResultStore,
+                   figures: FigureCache,
+                   executor: Executor):
     # 1. Hitting initialize button:
     #   - loads top entities
     # 2. Updating the word selection:
@@ -400,91 +518,199 @@ def init_callbacks(dash_app, logic: Logic):
     #   - remove tag from db
     #
     # Don't see any dependencies here... just straight of the bat.
+    #
+    # Query results are kept in the store and the hidden data divs only carry
+    # the key. Corpus level figures are built once and then come from the
+    # figure cache. Logic queries and figure building run on the executor, off
+    # the gevent loop.
+    #
+    # Corpus queries go to the Logic of the corpus chosen in document_set:
+    # choosing one reloads the corpus views, and entity and sentence queries
+    # use whichever is chosen when they're made.
+    dbi = corpora.dbi
+
+    def corpus(document_set: Optional[str]) -> Logic:
+        document_set = document_set or corpora.default
+        try:
+            if document_set in corpora.loaded():
+                return corpora.get(document_set)
+            # loading takes a while, so also off the gevent loop
+            return executor.run(corpora.get, document_set)
+        except KeyError:
+            raise PreventUpdate
+
+    def load(key: str):
+        data = store.get(key) if key else None
+        if data is None:
+            raise PreventUpdate
+        return data
+
+    def paged(table_id: str, page_current: int) -> int:
+        # the page to show of a backend table: a new search, sort or filter
+        # goes back to the first one
+        triggered = [t['prop_id'] for t in callback_context.triggered]
+        if f'{table_id}.page_current' in triggered:
+            return page_current or 0
+        return 0
+
+    @dash_app.callback(
+        [Output('date_range', 'min_date_allowed'),
+         Output('date_range', 'max_date_allowed'),
+         Output('date_range', 'initial_visible_month'),
+         Output('date_range', 'start_date'),
+         Output('date_range', 'end_date')],
+        [Input('document_set', 'value')])
+    def update_date_range(document_set: str):
+        # a newly chosen corpus starts out whole
+        first, last = corpus(document_set).date_range()
+        return first, last, last, None, None
 
     @dash_app.callback(
         Output('top_entities', 'children'),
-        [Input('initialize', 'n_clicks')])
-    def init_top_entities(n_clicks: int):
-        ents = logic.entity_counts()
-        return data_table(df=ents, page_size=15)
+        [Input('initialize', 'n_clicks'),
+         Input('document_set', 'value')])
+    def init_top_entities(n_clicks: int, document_set: str):
+        logic = corpus(document_set)
+
+        def build():
+            return data_table(df=logic.entity_counts(), page_size=15)
+        return figures.get(
+            document_set or corpora.default, logic.corpus_version(),
+            'top_entities', lambda: executor.run(build))
+
+    def corpus_figure(document_set: Optional[str],
+                      logic: Logic,
+                      name: str,
+                      build,
+                      start: str,
+                      end: str):
+        # only the whole corpus' figures are worth keeping
+        if start is None and end is None:
+            return figures.get(
+                document_set or corpora.default, logic.corpus_version(), name,
+                lambda: executor.run(build, None, None))
+        return executor.run(build, start, end)
 
     @dash_app.callback(
         Output('corpus_attention', 'figure'),
-        [Input('initialize', 'n_clicks')])
-    def init_corpus_attention(n_clicks: int):
-        df = logic.corpus_volume_over_time()
-        return px.bar(
-            data_frame=df,
-            x='Date',
-            y='Count',
-            title='Tweet Volume over Time')
+        [Input('initialize', 'n_clicks'),
+         Input('document_set', 'value'),
+         Input('date_range', 'start_date'),
+         Input('date_range', 'end_date')])
+    def init_corpus_attention(n_clicks: int,
+                              document_set: str,
+                              start: str,
+                              end: str):
+        logic = corpus(document_set)
+
+        def build(start, end):
+            return bar(
+                data_frame=logic.corpus_volume_over_time(start, end),
+                x='Date',
+                y='Count',
+                title='Tweet Volume over Time')
+        return corpus_figure(
+            document_set, logic, 'corpus_attention', build, start, end)
 
     @dash_app.callback(
         Output('liwc_over_time', 'figure'),
-        [Input('initialize', 'n_clicks')])
-    def init_liwc_time(n_clicks: int):
-        df = logic.liwc_over_time()
-        return px.bar(
-            data_frame=df,
-            x='Date',
-            y='Frequency',
-            color='Category',
-            title='Types of words over time')
+        [Input('initialize', 'n_clicks'),
+         Input('document_set', 'value'),
+         Input('date_range', 'start_date'),
+         Input('date_range', 'end_date')])
+    def init_liwc_time(n_clicks: int, document_set: str, start: str, end: str):
+        logic = corpus(document_set)
+
+        def build(start, end):
+            return bar(
+                data_frame=logic.liwc_over_time(start, end),
+                x='Date',
+                y='Frequency',
+                color='Category',
+                title='Types of words over time')
+        return corpus_figure(
+            document_set, logic, 'liwc_over_time', build, start, end)
 
     @dash_app.callback(
         Output('word_selection_error_message', 'children'),
         [Input('update_word_selection', 'n_clicks'),
+         Input('document_set', 'value'),
          State('word_for_vectors', 'value')],
         prevent_initial_call=True)
-    def update_word_selection_error_message(n_clicks: int, word: str):
-        valid = logic.in_vocab(word)
-        if not valid:
-            return f'"{word}" not prepared for analysis - please choose ' \
-                   f'another word from the entity list.'
+    def update_word_selection_error_message(n_clicks: int,
+                                            document_set: str,
+                                            words: str):
+        # (checked again in a newly chosen corpus)
+        words = parse_keywords(words or '')
+        if not words:
+            if callback_context.triggered[0]['prop_id'] \
+                    == 'document_set.value':
+                raise PreventUpdate
+            return 'Please choose a word.'
+        logic = corpus(document_set)
+        missing = [word for word in words if not logic.in_vocab(word)]
+        if missing:
+            missing = ', '.join(f'"{word}"' for word in missing)
+            return f'{missing} not in the corpus vocabulary - please ' \
+                   f'choose another word.'
         else:
             return ''
 
     @dash_app.callback(
         Output('word_vec_data', 'children'),
         [Input('word_selection_error_message', 'children'),
+         Input('date_range', 'start_date'),
+         Input('date_range', 'end_date'),
          State('word_for_vectors', 'value'),
-         State('word_vec_data', 'children')],
+         State('word_vec_data', 'children'),
+         State('document_set', 'value')],
         prevent_initial_call=True)
     def get_vec_liwc_and_entity_attention_data(
             message: str,
-            word: str,
-            previous_data: str):
+            start: str,
+            end: str,
+            words: str,
+            previous_key: str,
+            document_set: str):
+        if message is None:
+            raise PreventUpdate  # nothing chosen yet
         if message != '':
             return ''
-        neighbours = logic.vector_neighbourhood(word)
-        liwc = logic.liwc_profile(word)
-        attention = logic.entity_counts_over_time(word)
-        data = {
-            'neighbours': neighbours.to_json(orient='split'),
-            'liwc_freqs': liwc.to_json(orient='split'),
-            'entity_attention': attention.to_json(orient='split')
-        }
-        return json.dumps(data)
+        words = parse_keywords(words)
+        logic = corpus(document_set)
+
+        def query():
+            # the neighbourhoods are searched and projected together
+            return {
+                'neighbours': logic.vector_neighbourhoods(words),
+                'liwc_freqs': logic.liwc_profiles(words, start, end),
+                'entity_attention': pd.concat(
+                    [logic.entity_counts_over_time(word, start, end)
+                     for word in words])
+            }
+        return store.put(executor.run(query))
 
     @dash_app.callback(
         Output('entity_attention', 'figure'),
         [Input('word_vec_data', 'children'),
          State('word_for_vectors', 'value')],
         prevent_initial_call=True)
-    def update_entity_attention(json_data: str, entity: str):
-        json_data = json.loads(json_data)['entity_attention']
-        df = pd.read_json(json_data, orient='split')
-        return px.bar(
+    def update_entity_attention(key: str, entity: str):
+        df = load(key)['entity_attention']
+        words = parse_keywords(entity)
+        return executor.run(
+            bar,
             data_frame=df,
             x='Date',
             y='Count',
-            title=f'Attention to {entity}')
+            color='Entity' if len(words) > 1 else None,
+            title=f'Attention to {", ".join(words)}')
 
     @dash_app.callback(
         Output('entity_attention_wrapper', 'style'),
         [Input('word_vec_data', 'children')],
         prevent_initial_call=True)
-    def show_entity_attention(json_data: str):
+    def show_entity_attention(key: str):
         return dict(display=True)
 
     @dash_app.callback(
@@ -492,56 +718,65 @@ def init_callbacks(dash_app, logic: Logic):
         [Input('word_vec_data', 'children'),
          State('word_for_vectors', 'value')],
         prevent_initial_call=True)
-    def update_word_vec_plot(json_word_vec_data: str, entity: str):
-        json_data = json.loads(json_word_vec_data)['neighbours']
-        df = pd.read_json(json_data, orient='split')
-        return px.scatter(
+    def update_word_vec_plot(key: str, entity: str):
+        df = load(key)['neighbours']
+        words = parse_keywords(entity)
+        figure = executor.run(
+            scatter,
             data_frame=df,
             x='PC1',
             y='PC2',
             text='token',
+            color='Anchor' if len(words) > 1 else None,
             opacity=0.,
             height=1000,
             width=1600,
-            title=f'Words similar to {entity}')
+            title=f'Words similar to {", ".join(words)}')
+        # the markers are hidden, so colour the words themselves
+        figure.for_each_trace(
+            lambda trace: trace.update(textfont_color=trace.marker.color))
+        return figure
 
     @dash_app.callback(
         Output('entity_liwc_plot', 'figure'),
         [Input('word_vec_data', 'children'),
          State('word_for_vectors', 'value')],
         prevent_initial_call=True)
-    def update_entity_liwc_plot(json_word_vec_data: str, word: str):
-        json_data = json.loads(json_word_vec_data)['liwc_freqs']
-        df = pd.read_json(json_data, orient='split')
-        return px.bar(
+    def update_entity_liwc_plot(key: str, word: str):
+        df = load(key)['liwc_freqs']
+        words = parse_keywords(word)
+        return executor.run(
+            bar,
             data_frame=df,
             x='NPMI',
             y='Category',
+            color='Entity' if len(words) > 1 else None,
+            barmode='group',
             height=550,
-            title=f'Types of words around {word}')
+            title=f'Types of words around {", ".join(words)}')
 
     @dash_app.callback(
         Output('entity_liwc_plot_div', 'style'),
         [Input('word_vec_data', 'children')],
         prevent_initial_call=True)
-    def show_entity_liwc_plot(json_data: str):
-        display = json_data is not None
+    def show_entity_liwc_plot(key: str):
+        display = key is not None
         return dict(display=display)
 
     @dash_app.callback(
         Output('word_vec_plot_div', 'style'),
         [Input('word_vec_data', 'children')],
         prevent_initial_call=True)
-    def show_word_vec_plot(json_data: str):
-        display = json_data is not None
+    def show_word_vec_plot(key: str):
+        display = key is not None
         return dict(float='left', clear='both', display=display)
 
     @dash_app.callback(
         Output('sentence_selector_form', 'style'),
         [Input('word_vec_data', 'children')],
         prevent_initial_call=True)
-    def show_sentence_selector_form(json_data: str):
-        display = json_data is not None
+    def show_sentence_selector_form(key: str):
+        display = key is not None
         return dict(float='left', clear='both', display=display)
 
     @dash_app.callback(
@@ -553,35 +788,65 @@ def init_callbacks(dash_app, logic: Logic):
         return dict(float='left', clear='both', display=True)
 
     @dash_app.callback(
-        Output('sentences_div', 'children'),
-        [Input('sentence_data', 'children')],
+        [Output('sentences_table', 'data'),
+         Output('sentences_table', 'page_count'),
+         Output('sentences_table', 'page_current'),
+         Output('download_sentences', 'href')],
+        [Input('sentence_data', 'children'),
+         Input('sentences_table', 'page_current'),
+         Input('sentences_table', 'sort_by'),
+         Input('sentences_table', 'filter_query'),
+         State('sentences_table', 'page_size')],
         prevent_initial_call=True)
-    def load_sentences(json_data: str):
-        df = pd.read_json(json_data, orient='split')
-        return data_table(
-            id='sentences_table',
-            df=df,
-            columns=['Date', 'Url', 'Likes', 'Retweets'],
-            page_size=10)
+    def page_sentences(key: str,
+                       page_current: int,
+                       sort_by: List[Dict],
+                       filter_query: str,
+                       page_size: int):
+        # only the page in view goes to the browser
+        df = load(key)
+        page_current = paged('sentences_table', page_current)
+        records, page_count = executor.run(
+            table.page, df, page_current, page_size, sort_by, filter_query)
+        href = export_url(
+            f'/export/sentences/{key}.csv', sort_by, filter_query)
+        return records, page_count, \
+            no_update if page_current else 0, href
 
     @dash_app.callback(
         Output('sentence_data', 'children'),
         [Input('find_sentences', 'n_clicks'),
          State('keywords_for_sentences', 'value'),
-         State('word_for_vectors', 'value')],
+         State('keyword_match', 'value'),
+         State('word_for_vectors', 'value'),
+         State('date_range', 'start_date'),
+         State('date_range', 'end_date'),
+         State('document_set', 'value')],
         prevent_initial_call=True)
-    def get_sentence_data(n_clicks: int, keywords: str, entity: str):
-        df = logic.sentences(entity)
-        if keywords:
-            if ',' in keywords:
-                keywords = [k.lower() for k in keywords.split(',')]
-            else:
-                keywords = [keywords.lower()]
-            df['lower'] = df.Sentence.apply(lambda x: x.lower())
-            df['keep'] = df.Sentence.apply(
-                lambda x: any(k in x for k in keywords))
-            df = df[df.keep == True]
-        return df.to_json(orient='split')
+    def get_sentence_data(n_clicks: int,
+                          keywords: str,
+                          match: str,
+                          entity: str,
+                          start: str,
+                          end: str,
+                          document_set: str):
+        entities = parse_keywords(entity or '')
+        keywords = parse_keywords(keywords or '')
+        logic = corpus(document_set)
+
+        def query():
+            dfs = [
+                logic.search_sentences(
+                    e, keywords, match_all=match == 'all',
+                    start=start, end=end)
+                for e in entities]
+            if len(dfs) == 1:
+                return dfs[0]
+            # sentences mentioning any of the entities, newest first
+            return pd.concat(dfs or [pd.DataFrame(columns=['Date', 'Url'])]) \
+                .drop_duplicates(subset='Url') \
+                .sort_values(by='Date', ascending=False, kind='stable')
+        return store.put(executor.run(query))
 
     #
     # narrative form
@@ -601,15 +866,14 @@ def init_callbacks(dash_app, logic: Logic):
         button = callback_context.triggered[0]['prop_id'].split('.')[0]
 
         if button == 'confirm_delete_narrative':
-            logic.dbi.narratives.delete(code)
+            dbi.narratives.delete(code)
         if button == 'create_narrative':
-            logic.dbi.narratives.create(code, description)
-        narratives = logic.dbi.narratives.all()
+            dbi.narratives.create(code, description)
 
+        # the narratives themselves are read from the (cached) repository
         state = dict(
             complete=button in ['confirm_delete_narrative', 'create_narrative'],
             last_action=button,
-            narratives=narratives.to_json(orient='split'),
             messages=[])
 
         return json.dumps(state)
@@ -643,12 +907,7 @@ def init_callbacks(dash_app, logic: Logic):
         [Input('narrative_form_state', 'children')],
         prevent_initial_call=False)  # do populate on load
     def reload_narrative_list(json_data: str):
-        # determine which button was clicked
-        if isinstance(json_data, list):
-            df = logic.dbi.narratives.all()
-        else:
-            json_data = json.loads(json_data)
-            df = pd.read_json(json_data['narratives'], orient='split')
+        df = dbi.narratives.all()
         df.rename(
             columns={'code': 'Code', 'description': 'Description'},
             inplace=True)
@@ -676,16 +935,8 @@ def init_callbacks(dash_app, logic: Logic):
         [Input('narrative_form_state', 'children')],
         prevent_initial_call=False)
     def load_narrative_code_drop_down(json_data: str):
-        if isinstance(json_data, list):
-            df = logic.dbi.narratives.all()
-        else:
-            json_data = json.loads(json_data)
-            df = pd.read_json(json_data['narratives'], orient='split')
-        options = [{'label': x, 'value': x} for x in df.code]
-        df.rename(
-            columns={'code': 'Code', 'description': 'Description'},
-            inplace=True)
-        return options
+        df = dbi.narratives.all()
+        return [{'label': x, 'value': x} for x in df.code]
 
     # create narrative when submitting form
     @dash_app.callback(
@@ -699,29 +950,42 @@ def init_callbacks(dash_app, logic: Logic):
                              annotator: str,
                              code: str,
                              text: str):
-        logic.dbi.narrative_labels.create(
+        dbi.narrative_labels.create(
             narrative_code=code,
             annotator=annotator,
             text=text)
-        data = logic.dbi.narrative_labels.all()
-        data = data.to_json(orient='split')
-        return data
+        # just a change to reload the table from
+        return n_clicks
 
-    # tagged narrative table
+    # tagged narrative table, a page at a time from the database
     @dash_app.callback(
-        Output('tagged_narrative_explorer_div', 'children'),
-        [Input('tagged_data', 'children')],
+        [Output('tagged_narrative_table', 'data'),
+         Output('tagged_narrative_table', 'page_count'),
+         Output('tagged_narrative_table', 'page_current'),
+         Output('download_narrative_labels', 'href')],
+        [Input('tagged_data', 'children'),
+         Input('tagged_narrative_table', 'page_current'),
+         Input('tagged_narrative_table', 'sort_by'),
+         Input('tagged_narrative_table', 'filter_query'),
+         State('tagged_narrative_table', 'page_size')],
         prevent_initial_call=False)
-    def update_tagged_narrative_table(json_data: str):
-        if json_data is None or isinstance(json_data, list):
-            df = logic.dbi.narrative_labels.all()
-        else:
-            df = pd.read_json(json_data, orient='split')
-        df.rename(
-            columns={
-                'narrative_code': 'Code',
-                'annotator': 'Annotator',
-                'text': 'Text',
-                'description': 'Description'},
-            inplace=True)
-        return data_table(df=df, page_size=10)
+    def page_tagged_narratives(tagged,
+                               page_current: int,
+                               sort_by: List[Dict],
+                               filter_query: str,
+                               page_size: int):
+        page_current = paged('tagged_narrative_table', page_current)
+        sort = [(LABEL_COLUMNS.get(c, c), asc)
+                for c, asc in table.parse_sort(sort_by)]
+        filters = [(LABEL_COLUMNS.get(c, c), op, value)
+                   for c, op, value in table.parse_filter(filter_query)]
+        df, total = dbi.narrative_labels.page(
+            offset=page_current * page_size,
+            limit=page_size,
+            sort=sort,
+            filters=filters)
+        df = df.rename(columns={v: k for k, v in LABEL_COLUMNS.items()})
+        href = export_url(
+            '/export/narrative_labels.csv', sort_by, filter_query)
+        return df.to_dict('records'), table.page_count(total, page_size), \
+            no_update if page_current else 0, href
@@ -1,8 +1,145 @@
+import json
+from typing import Iterator
+
 import flask
 from flask import current_app as app
+import pandas as pd
+
+from pna import table
+from pna.executor import QueueFull, TaskTimeout
+from pna.plotlydash import LABEL_COLUMNS
+from pna.search import parse_keywords
 
+# registered on each app made by init_app
+routes = flask.Blueprint('routes', __name__)
 
-@app.route('/', methods=['GET'])
-@app.route('/home', methods=['GET'])
+
+@routes.route('/', methods=['GET'])
+@routes.route('/home', methods=['GET'])
 def index():
     return flask.redirect('/propaganda_analysis/')
+
+
+@routes.route('/metrics', methods=['GET'])
+def metrics():
+    # Prometheus text format
+    return flask.Response(
+        app.metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
+@routes.route('/ready', methods=['GET'])
+def ready():
+    # readiness probe: 503 until the default corpus is loaded
+    if not app.startup.ready:
+        return 'loading', 503
+    return 'ready'
+
+
+# Exports, streamed a chunk of rows at a time as CSV or (with pyarrow
+# installed) Parquet, so that whole datasets can be downloaded without
+# holding them in memory. Corpus exports take start and end dates, and the
+# corpus.
+
+FORMATS = {
+    'csv': ('text/csv', table.csv_chunks),
+    'parquet': ('application/vnd.apache.parquet', table.parquet_chunks),
+}
+
+
+def _export(frames: Iterator[pd.DataFrame], name: str, fmt: str):
+    if fmt == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            flask.abort(501, 'Parquet export needs pyarrow.')
+    mimetype, encode = FORMATS[fmt]
+    return flask.Response(
+        flask.stream_with_context(encode(frames)),
+        mimetype=mimetype,
+        headers={
+            'Content-Disposition': f'attachment; filename={name}.{fmt}'})
+
+
+def _sort_and_filters():
+    sort_by = json.loads(flask.request.args.get('sort') or '[]')
+    return table.parse_sort(sort_by), \
+        table.parse_filter(flask.request.args.get('filter'))
+
+
+def _logic():
+    # of the corpus given as ?corpus=, by default the default one - loaded
+    # on the executor if need be, like the dashboard's, so as not to hold up
+    # the gevent loop
+    corpus_id = flask.request.args.get('corpus') or app.corpora.default
+    try:
+        if corpus_id in app.corpora.loaded():
+            return app.corpora.get(corpus_id)
+        return app.executor.run(app.corpora.get, corpus_id)
+    except KeyError:
+        flask.abort(404)
+    except (QueueFull, TaskTimeout):
+        flask.abort(503)
+
+
+def _date_window():
+    args = flask.request.args
+    return args.get('start') or None, args.get('end') or None
+
+
+@routes.route('/export/sentences/<key>.<any(csv, parquet):fmt>',
+               methods=['GET'])
+def export_sentences(key: str, fmt: str):
+    # the rows of a sentence search (as kept in the result store), sorted and
+    # filtered as in the table
+    df = app.store.get(key)
+    if df is None:
+        flask.abort(404)
+    sort, filters = _sort_and_filters()
+    df = table.query(df, sort, filters)
+    return _export(table.chunks(df), 'sentences', fmt)
+
+
+@routes.route('/export/narrative_labels.<any(csv, parquet):fmt>',
+               methods=['GET'])
+def export_narrative_labels(fmt: str):
+    # the labels, read from the database a chunk at a time, with the table's
+    # column names, sorting and filtering
+    sort, filters = _sort_and_filters()
+    sort = [(LABEL_COLUMNS.get(c, c), asc) for c, asc in sort]
+    filters = [(LABEL_COLUMNS.get(c, c), op, value)
+               for c, op, value in filters]
+    names = {v: k for k, v in LABEL_COLUMNS.items()}
+    frames = (df.rename(columns=names)
+              for df in app.dbi.narrative_labels.iter_all(
+                  sort=sort, filters=filters))
+    return _export(frames, 'narrative_labels', fmt)
+
+
+@routes.route('/export/entity/<entity>/sentences.<any(csv, parquet):fmt>',
+               methods=['GET'])
+def export_entity_sentences(entity: str, fmt: str):
+    # all the entity's sentences, or those with any (match=any) or all
+    # (match=all) of the comma separated keywords
+    start, end = _date_window()
+    keywords = parse_keywords(flask.request.args.get('keywords') or '')
+    frames = _logic().iter_sentences(
+        entity, keywords,
+        match_all=flask.request.args.get('match') == 'all',
+        start=start, end=end)
+    return _export(frames, f'{entity}_sentences', fmt)
+
+
+@routes.route('/export/entity/<entity>/attention.<any(csv, parquet):fmt>',
+               methods=['GET'])
+def export_entity_attention(entity: str, fmt: str):
+    start, end = _date_window()
+    df = _logic().entity_counts_over_time(entity, start, end)
+    return _export(table.chunks(df), f'{entity}_attention', fmt)
+
+
+@routes.route('/export/entity/<entity>/liwc.<any(csv, parquet):fmt>',
+               methods=['GET'])
+def export_entity_liwc(entity: str, fmt: str):
+    start, end = _date_window()
+    df = _logic().liwc_profiles([entity], start, end)
+    return _export(table.chunks(df), f'{entity}_liwc', fmt)
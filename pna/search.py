@@ -0,0 +1,68 @@
+import re
+from typing import Callable, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+
+
+# Keyword search over sentences with an inverted index: each term maps to the
+# (sorted) rows of the sentences containing it, so a query is a few set
+# operations on small integer arrays instead of a scan over every sentence.
+
+TOKEN = re.compile(r'\w+')
+
+Rows = Union[slice, np.ndarray]
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN.findall(text.lower())
+
+
+def parse_keywords(keywords: str) -> List[str]:
+    # comma separated, as typed into the dashboard
+    return [k.strip() for k in keywords.split(',') if k.strip()]
+
+
+def build_postings(texts: Iterable[str]) -> pd.DataFrame:
+    # one row per (term, sentence row), rows ascending within each term
+    terms, rows = [], []
+    for row, text in enumerate(texts):
+        for term in sorted(set(tokenize(text))):
+            terms.append(term)
+            rows.append(row)
+    return pd.DataFrame({
+        'term': pd.Series(terms, dtype=object),
+        'row': np.array(rows, dtype=np.int64)})
+
+
+def restrict(postings: np.ndarray, rows: Rows) -> np.ndarray:
+    # the postings that fall within `rows` - a range, or sorted row numbers
+    if isinstance(rows, slice):
+        start, stop = np.searchsorted(postings, [rows.start, rows.stop])
+        return np.asarray(postings[start:stop])
+    return np.intersect1d(postings, rows, assume_unique=True)
+
+
+def match(postings: Callable[[str], np.ndarray],
+          rows: Rows,
+          keywords: List[str],
+          match_all: bool = False) -> np.ndarray:
+    # Rows (within `rows`) matching any - or with match_all, every - keyword.
+    # A keyword of several words matches sentences containing all of them.
+    # `postings` gives the sorted rows for a term (empty if unknown).
+    results = []
+    for keyword in keywords:
+        terms = tokenize(keyword)
+        if not terms:
+            continue
+        hits = restrict(postings(terms[0]), rows)
+        for term in terms[1:]:
+            hits = np.intersect1d(hits, postings(term), assume_unique=True)
+        results.append(hits)
+    if not results:
+        return np.empty(0, dtype=np.int64)
+    combine = np.intersect1d if match_all else np.union1d
+    hits = results[0]
+    for other in results[1:]:
+        hits = combine(hits, other)
+    return hits
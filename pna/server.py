@@ -0,0 +1,218 @@
+import errno
+import gc
+import os
+import signal
+import socket
+import time
+from typing import Callable, Dict, Optional, Tuple, Union
+
+import gevent
+from gevent.pywsgi import WSGIServer
+
+
+# Pre-forking production server. The master loads everything (the app, Logic
+# and its corpus data) and binds the port, then forks workers that each run
+# a gevent WSGIServer on the shared socket - so CPU bound callback work is
+# spread over cores and the corpus data is shared copy-on-write.
+#
+# Signals to the master:
+#   - SIGHUP: graceful restart - starts a new set of workers and, once they
+#     are ready, gracefully stops the old ones
+#   - SIGTERM / SIGINT: graceful shutdown
+# Workers that die are replaced.
+#
+# With a warm_up, each worker starts serving at once and runs it (e.g.
+# loading the corpus) in the background, only then reporting itself ready -
+# so the port answers (/ready with 503) while the data loads, and a restart
+# still waits for the new workers to have loaded.
+
+
+def bind(address: Tuple[str, int], backlog: int = 2048) -> socket.socket:
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.bind(address)
+    listener.listen(backlog)
+    listener.setblocking(False)
+    return listener
+
+
+class PreforkServer:
+
+    def __init__(self,
+                 app: Callable,
+                 listener: Union[Tuple[str, int], socket.socket],
+                 workers: int = 1,
+                 graceful_timeout: float = 30.,
+                 ready_file: Optional[str] = None,
+                 warm_up: Optional[Callable[[], None]] = None,
+                 log=print):
+        self.app = app
+        self.listener = listener
+        self.workers = workers
+        self.graceful_timeout = graceful_timeout
+        self.ready_file = ready_file
+        self.warm_up = warm_up
+        self.log = log
+        self._generation = 0
+        self._pids: Dict[int, int] = {}  # pid -> generation
+        self._ready = set()
+        self._announced = False
+        self._stopping = False
+        self._restarting = False
+
+    def serve_forever(self):
+        if not isinstance(self.listener, socket.socket):
+            self.listener = bind(self.listener)
+        self._ready_r, self._ready_w = os.pipe()
+        os.set_blocking(self._ready_r, False)
+        signal.signal(signal.SIGHUP, self._on_restart)
+        signal.signal(signal.SIGTERM, self._on_stop)
+        signal.signal(signal.SIGINT, self._on_stop)
+        # everything loaded so far is shared with the workers - keep the
+        # garbage collector from touching (and so copying) those pages
+        gc.collect()
+        gc.freeze()
+
+        self._spawn_generation()
+        while not self._stopping:
+            if self._restarting:
+                self._restarting = False
+                self._restart()
+            self._reap()
+            self._read_ready()
+            time.sleep(0.1)
+        self._stop_workers(list(self._pids))
+        self._remove_ready_file()
+        self.log('Server stopped.')
+
+    #
+    # master
+
+    def _on_restart(self, signum, frame):
+        self._restarting = True
+
+    def _on_stop(self, signum, frame):
+        self._stopping = True
+
+    def _spawn_generation(self):
+        self._generation += 1
+        for _ in range(self.workers):
+            self._spawn()
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._run_worker()
+            finally:
+                os._exit(0)
+        self._pids[pid] = self._generation
+
+    def _current(self):
+        return [pid for pid, generation in self._pids.items()
+                if generation == self._generation]
+
+    def _restart(self):
+        self.log('Restarting workers.')
+        old = list(self._pids)
+        self._spawn_generation()
+        deadline = time.monotonic() + self.graceful_timeout
+        while not all(pid in self._ready for pid in self._current()) \
+                and time.monotonic() < deadline and not self._stopping:
+            self._reap()
+            self._read_ready()
+            time.sleep(0.1)
+        self._stop_workers(old)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self._pids.pop(pid, None)
+            self._ready.discard(pid)
+            if generation == self._generation and not self._stopping:
+                self.log(f'Worker {pid} exited ({status}), replacing it.')
+                self._spawn()
+
+    def _read_ready(self):
+        try:
+            data = os.read(self._ready_r, 4096)
+        except BlockingIOError:
+            return
+        for pid in data.split():
+            self._ready.add(int(pid))
+        if not self._announced \
+                and all(pid in self._ready for pid in self._current()):
+            self._announced = True
+            self.log(f'Ready: {self.workers} workers serving.')
+            if self.ready_file is not None:
+                with open(self.ready_file, 'w') as f:
+                    f.write(str(os.getpid()))
+
+    def _remove_ready_file(self):
+        if self.ready_file is not None and os.path.exists(self.ready_file):
+            os.remove(self.ready_file)
+
+    def _stop_workers(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while any(pid in self._pids for pid in pids) \
+                and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in pids:
+            if pid in self._pids:
+                self.log(f'Worker {pid} did not stop in time, killing it.')
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        self._reap()
+
+    #
+    # worker
+
+    def _run_worker(self):
+        for signum in [signal.SIGHUP, signal.SIGTERM, signal.SIGINT]:
+            signal.signal(signum, signal.SIG_DFL)
+        os.close(self._ready_r)
+        server = WSGIServer(self.listener, self.app)
+
+        def stop():
+            server.stop(timeout=self.graceful_timeout)
+
+        gevent.signal_handler(signal.SIGTERM, stop)
+        gevent.signal_handler(signal.SIGINT, stop)
+        server.start()
+        if self.warm_up is None:
+            self._report_ready()
+        else:
+            gevent.spawn(self._warm_up, server)
+        server.serve_forever()
+
+    def _warm_up(self, server):
+        # in a native thread, so the worker keeps serving meanwhile
+        try:
+            gevent.get_hub().threadpool.spawn(self.warm_up).get()
+        except Exception as e:
+            # rather than never being ready: the master replaces it
+            self.log(f'Worker {os.getpid()} failed to warm up, '
+                     f'stopping: {e!r}')
+            server.stop(timeout=self.graceful_timeout)
+            return
+        self._report_ready()
+
+    def _report_ready(self):
+        try:
+            os.write(self._ready_w, f'{os.getpid()}\n'.encode())
+        except OSError as e:
+            if e.errno != errno.EPIPE:
+                raise
@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+import time
+from typing import Callable, Dict, Optional
+
+
+# How long starting up took, phase by phase (imports, building the app,
+# loading the corpus, ...), and whether it is done - for the readiness probe
+# (/ready), the log and /metrics. Startup taking longer than its budget is
+# logged, so slow cold starts get noticed.
+#
+# The total is that of the phases, so a worker forked (and warmed up) long
+# after the master started is timed by what it took itself.
+
+
+class Startup:
+
+    def __init__(self,
+                 started: Optional[float] = None,
+                 budget: Optional[float] = None,
+                 ready: bool = False,
+                 log: Callable[[str], None] = print):
+        # - started: time.monotonic() when the process started, if earlier
+        # - budget: seconds startup should take at most
+        self.started = started if started is not None else time.monotonic()
+        self.budget = budget
+        self.ready = ready
+        self.log = log
+        self.phases: Dict[str, float] = {}
+        self.seconds: Optional[float] = None
+
+    def done(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = seconds
+        self.log(f'Startup: {phase} took {seconds:.2f}s.')
+
+    def since_start(self, phase: str) -> None:
+        # a phase from when the process started, e.g. the imports
+        self.done(phase, time.monotonic() - self.started)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.monotonic()
+        yield
+        self.done(name, time.monotonic() - started)
+
+    def finish(self) -> None:
+        # ready to serve
+        self.seconds = sum(self.phases.values())
+        self.ready = True
+        self.log(f'Startup: ready after {self.seconds:.2f}s.')
+        if self.budget is not None and self.seconds > self.budget:
+            self.log(f'Startup took {self.seconds:.2f}s, over its budget of '
+                     f'{self.budget:.2f}s.')
+
+    def stats(self) -> Dict[str, float]:
+        stats = {f'{phase}_seconds': s for phase, s in self.phases.items()}
+        stats['ready'] = int(self.ready)
+        if self.seconds is not None:
+            stats['seconds'] = self.seconds
+        return stats
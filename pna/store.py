@@ -0,0 +1,107 @@
+import os
+import pickle
+import secrets
+import time
+from typing import Any, Optional
+
+from pna.cache import LRUCache
+
+
+# Callback results are kept server side under a short key, and only the key
+# goes to the browser (e.g. in a hidden div) instead of the serialized data.
+
+
+def new_key() -> str:
+    return secrets.token_urlsafe(9)
+
+
+class ResultStore:
+
+    def put(self, value: Any) -> str:
+        raise NotImplementedError
+
+    def get(self, key: str) -> Optional[Any]:
+        # None if the key is unknown or has expired
+        raise NotImplementedError
+
+
+class MemoryStore(ResultStore):
+    # Only visible to the process that made it - use a DiskStore when running
+    # multiple worker processes.
+
+    def __init__(self,
+                 max_entries: int = 1024,
+                 max_bytes: Optional[int] = None,
+                 ttl: Optional[float] = 3600.):
+        self.cache = LRUCache(
+            max_entries=max_entries, max_bytes=max_bytes, ttl=ttl)
+
+    def put(self, value: Any) -> str:
+        key = new_key()
+        self.cache.put(key, value)
+        return key
+
+    def get(self, key: str) -> Optional[Any]:
+        _, value = self.cache.get(key)
+        return value
+
+
+class DiskStore(ResultStore):
+
+    def __init__(self,
+                 path: str,
+                 ttl: Optional[float] = 3600.,
+                 sweep_every: int = 100):
+        self.path = path
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self._puts = 0
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f'{key}.pkl')
+
+    def put(self, value: Any) -> str:
+        key = new_key()
+        tmp_file = f'{self._file(key)}.tmp'
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, self._file(key))
+        self._puts += 1
+        if self._puts % self.sweep_every == 0:
+            self.sweep()
+        return key
+
+    def get(self, key: str) -> Optional[Any]:
+        # keys come from the browser, so don't let them name other files
+        if not key or os.path.basename(key) != key:
+            return None
+        file = self._file(key)
+        try:
+            if self._expired(file):
+                os.remove(file)
+                return None
+            with open(file, 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _expired(self, file: str) -> bool:
+        if self.ttl is None:
+            return False
+        return os.path.getmtime(file) + self.ttl < time.time()
+
+    def sweep(self) -> int:
+        # remove expired entries, returning how many were removed
+        removed = 0
+        for name in os.listdir(self.path):
+            file = os.path.join(self.path, name)
+            if name.endswith('.tmp'):
+                continue  # being written
+            try:
+                if self._expired(file):
+                    os.remove(file)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # removed by another worker
+        return removed
@@ -0,0 +1,147 @@
+import json
+import math
+import os
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from pna.npmi import npmi
+
+
+# A made up corpus in the shape of the raw files in data/ (the ph_*.csv and
+# .json files PhillipinesEmbassyLogic.build_bundle reads), of any size - for
+# benchmarking at sizes the real corpus doesn't come in. Entities are
+# 'entity0', 'entity1', ... and words 'word0', 'word1', ..., both picked with
+# Zipf-like frequencies, so a few are very common and most rare. Tweets have
+# text, so keyword search has something to find.
+
+START = '2020-01-01'
+CATEGORIES = ['anx', 'certain', 'money', 'negemo', 'posemo', 'they', 'we']
+
+
+def sizes(scale: float = 1.) -> Dict[str, int]:
+    # Scale 1 is about the size of the shipped corpus. Tweets grow with the
+    # scale, entities and vocabulary with its square root (a bigger corpus
+    # mostly has more of the same names and words), and the days stay the
+    # same (it is denser, not longer).
+    root = math.sqrt(scale)
+    return dict(
+        tweets=max(1, int(2000 * scale)),
+        entities=max(2, int(120 * root)),
+        words=max(10, int(1500 * root)),
+        days=500)
+
+
+def _zipf(n: int) -> np.ndarray:
+    p = 1. / np.arange(1, n + 1)
+    return p / p.sum()
+
+
+def write_corpus(data_dir: str,
+                 tweets: int = 2000,
+                 entities: int = 120,
+                 words: int = 1500,
+                 days: int = 500,
+                 words_per_tweet: int = 12,
+                 neighbours: int = 100,
+                 seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    os.makedirs(data_dir, exist_ok=True)
+
+    def path(name):
+        return os.path.join(data_dir, name)
+
+    entity_names = np.array([f'entity{i}' for i in range(entities)])
+    word_names = np.array([f'word{i}' for i in range(words)])
+    dates = pd.date_range(START, periods=days).strftime('%Y-%m-%d').values
+    category_of_word = rng.integers(-len(CATEGORIES), len(CATEGORIES), words)
+
+    # tweets, newest last
+    day = np.sort(rng.integers(0, days, tweets))
+    ids = 10 ** 18 + np.arange(tweets, dtype=np.int64)
+    likes = rng.poisson(2, tweets)
+    retweets = rng.poisson(1, tweets)
+    text_words = rng.choice(words, size=(tweets, words_per_tweet),
+                            p=_zipf(words))
+    text = [' '.join(row) for row in word_names[text_words]]
+    n_tokens = np.full(tweets, words_per_tweet, dtype=np.int64)
+    # tokens of each category, per tweet
+    cats = category_of_word[text_words]
+    tweet_cat_tokens = np.stack(
+        [(cats == c).sum(axis=1) for c in range(len(CATEGORIES))], axis=1)
+
+    # 1 to 3 entity mentions per tweet
+    mentions = rng.integers(1, 4, tweets)
+    tweet = np.repeat(np.arange(tweets), mentions)
+    entity = rng.choice(entities, size=len(tweet), p=_zipf(entities))
+
+    counts = np.bincount(entity, minlength=entities)
+    pd.DataFrame({'entity': entity_names, 'count': counts}) \
+        .sort_values(by='count', ascending=False, kind='stable') \
+        .to_csv(path('ph_entity_counts.csv'), index=False)
+
+    attention = np.zeros((days, entities), dtype=np.int64)
+    np.add.at(attention, (day[tweet], entity), 1)
+    pd.DataFrame({
+        'date': np.repeat(dates, entities),
+        'entity': np.tile(entity_names, days),
+        'count': attention.ravel(),
+    }).to_csv(path('ph_entity_attention_over_time.csv'), index=False)
+
+    volume = np.bincount(day, minlength=days)
+    pd.DataFrame({'date': dates[volume > 0], 'tweet': volume[volume > 0]}) \
+        .to_csv(path('ph_tweet_volume.csv'), index=False)
+
+    day_tokens = np.bincount(day, n_tokens, minlength=days).astype(np.int64)
+    day_cat_tokens = np.zeros((days, len(CATEGORIES)), dtype=np.int64)
+    np.add.at(day_cat_tokens, day, tweet_cat_tokens)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        freq = np.nan_to_num(day_cat_tokens / day_tokens[:, None])
+    pd.DataFrame({
+        'date': np.repeat(dates, len(CATEGORIES)),
+        'cat': np.tile(CATEGORIES, days),
+        'count': day_cat_tokens.ravel(),
+        'n': np.repeat(day_tokens, len(CATEGORIES)),
+        'freq': freq.ravel(),
+    }).to_csv(path('ph_liwc_time.csv'), index=False)
+
+    # NPMI counts: an entity's tokens are those of the tweets mentioning it,
+    # once per tweet
+    pairs = np.unique(np.stack([entity, tweet], axis=1), axis=0)
+    entity_tokens = np.bincount(
+        pairs[:, 0], n_tokens[pairs[:, 1]], minlength=entities)
+    entity_cat_tokens = np.zeros((entities, len(CATEGORIES)), dtype=np.int64)
+    np.add.at(entity_cat_tokens, pairs[:, 0], tweet_cat_tokens[pairs[:, 1]])
+    df = pd.DataFrame({
+        'n_tokens': int(n_tokens.sum()),
+        'n_tokens_entity': np.repeat(entity_tokens, len(CATEGORIES)),
+        'n_tokens_cat': np.tile(tweet_cat_tokens.sum(axis=0), entities),
+        'n_tokens_entity_cat': entity_cat_tokens.ravel(),
+        'Entity': np.repeat(entity_names, len(CATEGORIES)),
+        'Category': np.tile(CATEGORIES, entities),
+    })
+    npmi(df).rename(columns={
+        'Entity': 'entity', 'Category': 'cat', 'NPMI': 'npmi',
+    }).to_csv(path('ph_npmis.csv'), index=False)
+
+    entity_to_sents = {name: [] for name in entity_names}
+    for e, t in pairs[np.lexsort((-pairs[:, 1], pairs[:, 0]))]:
+        entity_to_sents[entity_names[e]].append(dict(
+            date=dates[day[t]], id=int(ids[t]), likes=int(likes[t]),
+            retweets=int(retweets[t]), text=text[t]))
+    with open(path('ph_entity_to_sents.json'), 'w') as f:
+        f.write(json.dumps(entity_to_sents))
+
+    # the entities are words too, with neighbours and PCA coordinates
+    tokens = np.concatenate([entity_names, word_names])
+    with open(path('ph_neighbours.json'), 'w') as f:
+        f.write(json.dumps({
+            name: list(tokens[rng.choice(
+                len(tokens), min(neighbours, len(tokens)), replace=False)])
+            for name in entity_names}))
+    with open(path('ph_vocab.dic'), 'w') as f:
+        f.write(json.dumps({t: i for i, t in enumerate(tokens)}))
+    pc = rng.normal(size=(len(tokens), 2))
+    pd.DataFrame({'token': tokens, 'pc1': pc[:, 0], 'pc2': pc[:, 1]}) \
+        .to_csv(path('ph_pca_df.csv'), index=False)
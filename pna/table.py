@@ -0,0 +1,166 @@
+import math
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+
+# Server side paging, sorting and filtering for DataTables made with
+# data_table(..., backend=True) (page_action, sort_action and filter_action
+# 'custom'): the browser sends the page it wants, with its sort_by and
+# filter_query, and only that page's records are sent back.
+
+# filter_query operators, by their (normalised) name
+OPERATORS = {
+    '=': 'eq', 'eq': 'eq', 's=': 'eq', 'i=': 'eq',
+    '!=': 'ne', 'ne': 'ne', 's!=': 'ne', 'i!=': 'ne',
+    '<': 'lt', 'lt': 'lt', 's<': 'lt', 'i<': 'lt',
+    '<=': 'le', 'le': 'le', 's<=': 'le', 'i<=': 'le',
+    '>': 'gt', 'gt': 'gt', 's>': 'gt', 'i>': 'gt',
+    '>=': 'ge', 'ge': 'ge', 's>=': 'ge', 'i>=': 'ge',
+    'contains': 'contains', 'scontains': 'contains', 'icontains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+CLAUSE = re.compile(r'^\{(?P<column>[^}]+)\}\s+(?P<op>\S+)\s+(?P<value>.+)$')
+
+Filter = Tuple[str, str, Any]  # column, operator, value
+Sort = Tuple[str, bool]  # column, ascending
+
+
+def _value(value: str) -> Any:
+    value = value.strip()
+    if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1]
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def parse_filter(filter_query: Optional[str]) -> List[Filter]:
+    # DataTable filter_query, e.g. '{Likes} > 3 && {Url} contains 139', as
+    # (column, operator, value) - clauses that don't parse are left out
+    filters = []
+    for clause in (filter_query or '').split(' && '):
+        match = CLAUSE.match(clause.strip())
+        if match is None or match.group('op') not in OPERATORS:
+            continue
+        filters.append((
+            match.group('column'),
+            OPERATORS[match.group('op')],
+            _value(match.group('value'))))
+    return filters
+
+
+def parse_sort(sort_by: Optional[List[Dict]]) -> List[Sort]:
+    return [(s['column_id'], s['direction'] == 'asc') for s in sort_by or []]
+
+
+def _mask(series: pd.Series, op: str, value: Any) -> pd.Series:
+    if op in ('contains', 'datestartswith'):
+        text = series.astype(str)
+        if op == 'contains':
+            return text.str.contains(str(value), case=False, regex=False)
+        return text.str.startswith(str(value))
+    # compare like with like: text as text, numbers as numbers
+    if isinstance(value, str) and series.dtype != object:
+        series = series.astype(str)
+    elif not isinstance(value, str) and series.dtype == object:
+        value = str(value)
+    return {
+        'eq': series.__eq__,
+        'ne': series.__ne__,
+        'lt': series.__lt__,
+        'le': series.__le__,
+        'gt': series.__gt__,
+        'ge': series.__ge__,
+    }[op](value)
+
+
+def query(df: pd.DataFrame,
+          sort: Optional[List[Sort]] = None,
+          filters: Optional[List[Filter]] = None) -> pd.DataFrame:
+    # df filtered and sorted, ignoring unknown columns
+    for column, op, value in filters or []:
+        if column in df.columns:
+            df = df[_mask(df[column], op, value)]
+    sort = [(c, asc) for c, asc in sort or [] if c in df.columns]
+    if sort:
+        df = df.sort_values(
+            by=[c for c, _ in sort],
+            ascending=[asc for _, asc in sort],
+            kind='stable')
+    return df
+
+
+def page_count(rows: int, page_size: int) -> int:
+    return max(1, math.ceil(rows / page_size))
+
+
+def page(df: pd.DataFrame,
+         page_current: Optional[int],
+         page_size: int,
+         sort_by: Optional[List[Dict]] = None,
+         filter_query: Optional[str] = None) -> Tuple[List[Dict], int]:
+    # the records of the page in view, and how many pages there are
+    df = query(df, parse_sort(sort_by), parse_filter(filter_query))
+    start = (page_current or 0) * page_size
+    records = df.iloc[start:start + page_size].to_dict('records')
+    return records, page_count(len(df), page_size)
+
+
+def csv_chunks(frames: Iterator[pd.DataFrame]) -> Iterator[str]:
+    # CSV text a chunk of rows at a time, for streaming responses
+    header = True
+    for df in frames:
+        yield df.to_csv(index=False, header=header)
+        header = False
+
+
+class _Sink:
+    # a write-only file, handing on what's been written so far
+    closed = False
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def take(self) -> bytes:
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_chunks(frames: Iterator[pd.DataFrame]) -> Iterator[bytes]:
+    # a Parquet file a row group (chunk of rows) at a time, for streaming
+    # responses - the schema is the first chunk's. Needs pyarrow.
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    sink, writer = _Sink(), None
+    for df in frames:
+        if writer is None:
+            schema = pa.Schema.from_pandas(df, preserve_index=False)
+            writer = pq.ParquetWriter(sink, schema)
+        writer.write_table(
+            pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+        yield sink.take()
+    if writer is not None:
+        writer.close()
+        yield sink.take()
+
+
+def chunks(df: pd.DataFrame, size: int = 10000) -> Iterator[pd.DataFrame]:
+    # (an empty df still gives one, empty, chunk - so a CSV gets its header)
+    for start in range(0, max(len(df), 1), size):
+        yield df.iloc[start:start + size]
@@ -1,21 +1,93 @@
 import os
+import time
 
-from gevent.pywsgi import WSGIServer
+STARTED = time.monotonic()
+
+if os.environ['DEVELOPMENT'] != '1':
+    # before anything else is imported, so locks and sockets are cooperative
+    from gevent import monkey
+    monkey.patch_all()
+
+import tempfile
+import threading
 
 from pna import init_app
-from pna.dbi import Dbi
-from pna.logic import PhillipinesEmbassyLogic
+from pna.cache import CachedLogic, LRUCache
+from pna.corpora import Corpora, DEFAULT_MANIFEST
+from pna.dbi import Dbi, make_green
+from pna.executor import Executor
+from pna.figures import FigureCache
+from pna.metrics import instrument_dbi, MeteredLogic, Metrics
+from pna.server import bind, PreforkServer
+from pna.startup import Startup
+from pna.store import DiskStore, MemoryStore
 
 
 if __name__ == '__main__':
-    dbi = Dbi()
-    logic = PhillipinesEmbassyLogic(dbi)
-    app = init_app(logic)
+    budget = os.environ.get('PNA_STARTUP_BUDGET')
+    startup = Startup(STARTED, budget=float(budget) if budget else None)
+    startup.since_start('imports')
+    development = os.environ['DEVELOPMENT'] == '1'
+    # with PNA_BACKGROUND_LOAD=1 the port is served at once and the default
+    # corpus loaded while /ready says so - in each worker, as the data isn't
+    # loaded before forking
+    background = os.environ.get('PNA_BACKGROUND_LOAD') == '1'
+    if not development:
+        with startup.phase('bind'):
+            listener = bind(('', 5000))
+    workers = int(os.environ.get('PNA_WORKERS', os.cpu_count()))
+    slow_callback = os.environ.get('PNA_SLOW_CALLBACK')
+    metrics = Metrics(
+        slow_callback=float(slow_callback) if slow_callback else None)
+    dbi = instrument_dbi(Dbi(), metrics)
+    max_bytes = os.environ.get('PNA_CACHE_BYTES')
+    ttl = os.environ.get('PNA_CACHE_TTL')
+    cache = LRUCache(
+        max_entries=int(os.environ.get('PNA_CACHE_ENTRIES', 1024)),
+        max_bytes=int(max_bytes) if max_bytes else None,
+        ttl=float(ttl) if ttl else None)
+    # corpora are loaded when first chosen, and the least recently used let
+    # go when they map more than PNA_CORPUS_BYTES; query results of them
+    # all share the one cache
+    corpus_bytes = os.environ.get('PNA_CORPUS_BYTES')
+    corpora = Corpora.from_manifest(
+        dbi,
+        os.environ.get('PNA_CORPORA', DEFAULT_MANIFEST),
+        max_bytes=int(corpus_bytes) if corpus_bytes else None,
+        wrap=lambda logic: MeteredLogic(CachedLogic(logic, cache), metrics))
+    metrics.gauges('pna_logic_cache', cache.stats)
+    store_ttl = float(os.environ.get('PNA_STORE_TTL', 3600))
+    if os.environ.get('PNA_STORE_DIR'):
+        store = DiskStore(os.environ['PNA_STORE_DIR'], ttl=store_ttl)
+    elif not development and workers > 1:
+        # requests from one browser may hit any worker
+        store = DiskStore(tempfile.mkdtemp(prefix='pna-store-'), ttl=store_ttl)
+    else:
+        store = MemoryStore(ttl=store_ttl)
+    figures = FigureCache(os.environ.get('PNA_FIGURE_DIR'))
+    executor = Executor(
+        max_workers=int(os.environ.get('PNA_EXECUTOR_WORKERS', 4)),
+        max_queue=int(os.environ.get('PNA_EXECUTOR_QUEUE', 64)),
+        timeout=float(os.environ.get('PNA_TASK_TIMEOUT', 30)))
+    with startup.phase('app'):
+        app = init_app(corpora, store, figures, executor, metrics, startup)
+    if not background:
+        # the default corpus before forking, so workers share it
+        app.warm_up()
 
-    if os.environ['DEVELOPMENT'] == '1':
+    if development:
         print('Running development server on localhost.')
+        if background:
+            threading.Thread(target=app.warm_up, daemon=True).start()
         app.run(host='0.0.0.0', port=5000, debug=True)
     else:
-        print('Running production WSGI server.')
-        http_server = WSGIServer(('', 5000), app)
-        http_server.serve_forever()
+        print(f'Running production WSGI server with {workers} workers.')
+        make_green()
+        server = PreforkServer(
+            app,
+            listener,
+            workers=workers,
+            graceful_timeout=float(os.environ.get('PNA_GRACEFUL_TIMEOUT', 30)),
+            ready_file=os.environ.get('PNA_READY_FILE'),
+            warm_up=app.warm_up if background else None)
+        server.serve_forever()
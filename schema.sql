@@ -4,6 +4,7 @@ CREATE TABLE narrative (
 );
 
 CREATE TABLE narrative_label (
+    id BIGSERIAL PRIMARY KEY,
     narrative_code VARCHAR(10) NOT NULL,
     annotator VARCHAR(30) NOT NULL,
     text TEXT NOT NULL,
@@ -11,3 +12,23 @@ CREATE TABLE narrative_label (
         FOREIGN KEY(narrative_code)
         REFERENCES narrative(code)
 );
+
+-- lookups by code or annotator, paged by id
+CREATE INDEX narrative_label_narrative_code_idx
+    ON narrative_label (narrative_code, id);
+CREATE INDEX narrative_label_annotator_idx
+    ON narrative_label (annotator, id);
+-- exact text, e.g. for deletes
+CREATE INDEX narrative_label_text_idx
+    ON narrative_label USING hash (text);
+
+-- text substrings (ILIKE), where the pg_trgm extension is available
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+    CREATE INDEX narrative_label_text_trgm_idx
+        ON narrative_label USING gin (text gin_trgm_ops);
+EXCEPTION WHEN OTHERS THEN
+    RAISE NOTICE 'No trigram index on narrative_label.text: %', SQLERRM;
+END
+$$;
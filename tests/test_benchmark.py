@@ -0,0 +1,26 @@
+import unittest
+
+from pna.benchmark import run_scale, timings
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_timings(self):
+        calls = []
+        result = timings(lambda: calls.append(1), repeat=3)
+        self.assertEqual(3, len(calls))
+        self.assertEqual(3, result['runs'])
+        self.assertLessEqual(result['min'], result['median'])
+        self.assertLessEqual(result['median'], result['max'])
+
+    def test_run_scale(self):
+        result = run_scale(0.01, repeat=1)
+        self.assertEqual(20, result['sizes']['tweets'])
+        self.assertIn('search_sentences[any]', result['logic'])
+        callbacks = result['callbacks']
+        self.assertIn('top_entities.children', callbacks)
+        self.assertIn('entity_liwc_plot.figure', callbacks)
+        # nothing using the database
+        self.assertNotIn('tagged_data.children', callbacks)
+        self.assertNotIn('narrative_list.children', callbacks)
+        self.assertEqual({200}, {c['status'] for c in callbacks.values()})
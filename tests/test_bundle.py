@@ -0,0 +1,203 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pna.bundle import Bundle, date_window, write_bundle
+
+
+class TestBundle(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'bundle')
+        write_bundle(
+            self.path,
+            tables={
+                'counts': pd.DataFrame({'Entity': ['b', 'a', 'b'],
+                                        'Count': [1, 2, 3]}),
+            },
+            groups={'counts': 'Entity'},
+            meta={'name': 'test'})
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_exists(self):
+        self.assertTrue(Bundle.exists(self.path))
+        self.assertFalse(Bundle.exists(self.dir.name))
+
+    def test_readers_keep_their_version(self):
+        bundle = Bundle(self.path)
+        write_bundle(self.path, tables={
+            'counts': pd.DataFrame({'Entity': ['c'], 'Count': [9]})})
+        # not mapped before the new version was published
+        self.assertEqual([2, 1, 3], list(bundle.column('counts', 'Count')))
+        self.assertEqual(
+            [9], list(Bundle(self.path).column('counts', 'Count')))
+
+    def test_keeps_current_and_previous_versions(self):
+        for count in range(3):
+            write_bundle(self.path, tables={
+                'counts': pd.DataFrame({'Count': [count]})})
+        self.assertTrue(os.path.islink(self.path))
+        entries = [e for e in os.listdir(self.dir.name)
+                   if e.startswith('bundle.') and not e.endswith('.lock')]
+        self.assertEqual(2, len(entries))
+
+    def test_concurrent_writers(self):
+        errors = []
+
+        def write(count):
+            try:
+                write_bundle(self.path, tables={
+                    'counts': pd.DataFrame({'Count': [count] * 1000})})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        counts = Bundle(self.path).column('counts', 'Count')
+        self.assertEqual(1, len(set(counts)))
+
+    def test_older_version_is_rebuilt(self):
+        manifest = os.path.join(self.path, 'manifest.json')
+        with open(manifest) as f:
+            data = json.loads(f.read())
+        data['version'] -= 1
+        with open(manifest, 'w') as f:
+            f.write(json.dumps(data))
+        self.assertFalse(Bundle.exists(self.path))
+        with self.assertRaises(ValueError):
+            Bundle(self.path)
+
+    def test_columns_are_memory_mapped(self):
+        bundle = Bundle(self.path)
+        self.assertIsInstance(bundle.column('counts', 'Count'), np.memmap)
+        self.assertEqual({'name': 'test'}, bundle.meta)
+
+    def test_groups(self):
+        bundle = Bundle(self.path)
+        groups = bundle.groups('counts')
+        self.assertEqual(['a', 'b'], sorted(groups.keys()))
+        df = bundle.frame('counts', rows=groups['b'])
+        # order within a group is preserved
+        self.assertEqual([1, 3], list(df.Count))
+
+    def test_frame(self):
+        df = Bundle(self.path).frame('counts')
+        self.assertEqual(['Entity', 'Count'], list(df.columns))
+        self.assertEqual(3, len(df))
+
+    def test_arrays(self):
+        path = os.path.join(self.dir.name, 'arrays')
+        matrix = np.arange(6, dtype=np.float32).reshape(2, 3)
+        write_bundle(path, tables={}, arrays={'vectors': matrix})
+        bundle = Bundle(path)
+        self.assertEqual(['vectors'], bundle.arrays())
+        np.testing.assert_array_equal(matrix, bundle.array('vectors'))
+
+    def test_base(self):
+        path = os.path.join(self.dir.name, 'based')
+        matrix = np.arange(6, dtype=np.float32).reshape(2, 3)
+        write_bundle(path, tables={'other': pd.DataFrame({'a': [1]})},
+                     arrays={'vectors': matrix}, base=Bundle(self.path))
+        base = Bundle(path)
+        write_bundle(path, tables={'other': pd.DataFrame({'a': [2]})},
+                     base=base)
+        bundle = Bundle(path)
+        self.assertEqual([2], list(bundle.column('other', 'a')))
+        self.assertEqual({'b': slice(1, 3), 'a': slice(0, 1)},
+                         bundle.groups('counts'))
+        np.testing.assert_array_equal(matrix, bundle.array('vectors'))
+
+    def test_base_with_dictionaries(self):
+        path = os.path.join(self.dir.name, 'coded')
+        write_bundle(path, tables={'t': pd.DataFrame({'Entity': ['a']})},
+                     dictionaries={'entity': ['t.Entity']})
+        with self.assertRaises(ValueError):
+            write_bundle(os.path.join(self.dir.name, 'other'), tables={},
+                         base=Bundle(path))
+
+    def test_dictionaries(self):
+        path = os.path.join(self.dir.name, 'coded')
+        write_bundle(
+            path,
+            tables={
+                'counts': pd.DataFrame({'Entity': ['b', 'a', 'b'],
+                                        'Count': [1, 2, 3]}),
+                'pairs': pd.DataFrame({'Entity': ['c', 'a'],
+                                       'Other': ['b', 'c']}),
+            },
+            groups={'counts': 'Entity'},
+            dictionaries={'entity': ['counts.Entity', 'pairs.Entity',
+                                     'pairs.Other', 'missing.Entity']})
+        bundle = Bundle(path)
+        self.assertEqual(['a', 'b', 'c'], list(bundle.dictionary('entity')))
+        # the same code for the same string, whichever the table
+        codes = bundle.column('counts', 'Entity')
+        self.assertEqual(np.int32, codes.dtype)
+        self.assertEqual([0, 1, 1], list(codes))
+        self.assertEqual([2, 0], list(bundle.column('pairs', 'Entity')))
+        self.assertEqual(['b', 'b'], list(bundle.frame(
+            'counts', rows=bundle.groups('counts')['b']).Entity))
+        df = bundle.frame('pairs')
+        self.assertEqual(['c', 'a'], list(df.Entity))
+        self.assertEqual(['b', 'c'], list(df.Other))
+
+    def test_days(self):
+        path = os.path.join(self.dir.name, 'days')
+        days = pd.to_datetime(['2021-01-01', '2021-01-03'])
+        times = pd.to_datetime(['2021-01-01 10:00', '2021-01-03'])
+        write_bundle(path, tables={
+            'dates': pd.DataFrame({'Date': days, 'Time': times})})
+        bundle = Bundle(path)
+        self.assertEqual(np.int32, bundle.column('dates', 'Date').dtype)
+        # not whole days: stored as they are
+        self.assertEqual(times.values.dtype,
+                         bundle.column('dates', 'Time').dtype)
+        df = bundle.frame('dates')
+        self.assertEqual(list(days), list(df.Date))
+        self.assertEqual(list(times), list(df.Time))
+        self.assertEqual(slice(1, 2), date_window(
+            bundle.column('dates', 'Date'), start='2021-01-02'))
+
+    def test_text(self):
+        path = os.path.join(self.dir.name, 'text')
+        texts = ['a', '', 'Mabuhay! 中国', 'x' * 1000]
+        write_bundle(path, tables={'tweets': pd.DataFrame({'text': texts})})
+        bundle = Bundle(path)
+        # the bytes, not every row as wide as the longest
+        self.assertEqual(np.uint8, bundle.column('tweets', 'text').dtype)
+        self.assertEqual(
+            sum(len(t.encode()) for t in texts),
+            len(bundle.column('tweets', 'text')))
+        self.assertEqual(texts, list(bundle.frame('tweets').text))
+        self.assertEqual(['Mabuhay! 中国', ''],
+                         list(bundle.values('tweets', 'text', [2, 1])))
+        self.assertEqual(['x' * 1000, ''],
+                         list(bundle.values('tweets', 'text',
+                                            slice(None, None, -2))))
+
+
+class TestDateWindow(unittest.TestCase):
+
+    def test_date_window(self):
+        dates = pd.to_datetime(
+            ['2021-01-01', '2021-01-02', '2021-01-02', '2021-01-05']).values
+        self.assertEqual(slice(0, 4), date_window(dates))
+        self.assertEqual(slice(1, 3), date_window(dates, '2021-01-02',
+                                                  '2021-01-02'))
+        self.assertEqual(slice(1, 4), date_window(dates, start='2021-01-02'))
+        self.assertEqual(slice(0, 3), date_window(dates, end='2021-01-04'))
+        self.assertEqual(slice(4, 4), date_window(dates, '2021-02-01',
+                                                  '2021-01-01'))
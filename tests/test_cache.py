@@ -0,0 +1,105 @@
+import time
+import unittest
+
+import pandas as pd
+
+from pna.cache import CachedLogic, LRUCache
+from pna.logic import Logic
+
+
+class CountingLogic(Logic):
+
+    def __init__(self, version: str = 'v1'):
+        super().__init__(dbi=None)
+        self.calls = 0
+        self.version = version
+
+    def corpus_version(self) -> str:
+        return self.version
+
+    def refresh(self) -> bool:
+        self.version += '+'
+        return True
+
+    def liwc_profile(self, entity: str) -> pd.DataFrame:
+        self.calls += 1
+        return pd.DataFrame({'Entity': [entity], 'NPMI': [0.1]})
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = LRUCache()
+        self.assertEqual((False, None), cache.get('a'))
+        cache.put('a', 1)
+        self.assertEqual((True, 1), cache.get('a'))
+        self.assertEqual(1, cache.stats()['hits'])
+        self.assertEqual(1, cache.stats()['misses'])
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(1, cache.stats()['evictions'])
+
+    def test_byte_budget(self):
+        cache = LRUCache(max_bytes=100)
+        cache.put('a', 1, size=60)
+        cache.put('b', 2, size=60)
+        self.assertNotIn('a', cache)
+        self.assertEqual(60, cache.stats()['bytes'])
+        cache.put('c', 3, size=200)
+        self.assertNotIn('c', cache)
+
+    def test_discard(self):
+        cache = LRUCache()
+        cache.put(('v1', 'a'), 1, size=10)
+        cache.put(('v2', 'a'), 2, size=10)
+        self.assertEqual(1, cache.discard(lambda key: key[0] == 'v1'))
+        self.assertNotIn(('v1', 'a'), cache)
+        self.assertEqual(10, cache.stats()['bytes'])
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=0.01)
+        cache.put('a', 1)
+        time.sleep(0.02)
+        self.assertEqual((False, None), cache.get('a'))
+        self.assertEqual(1, cache.stats()['expirations'])
+
+
+class TestCachedLogic(unittest.TestCase):
+
+    def test_repeated_queries_hit_cache(self):
+        inner = CountingLogic()
+        logic = CachedLogic(inner)
+        logic.liwc_profile('china')
+        df = logic.liwc_profile('china')
+        self.assertEqual(1, inner.calls)
+        self.assertEqual(['china'], list(df.Entity))
+        logic.liwc_profile('us')
+        self.assertEqual(2, inner.calls)
+
+    def test_refresh_keeps_other_corpora(self):
+        cache = LRUCache()
+        first = CachedLogic(CountingLogic('a'), cache)
+        second = CachedLogic(CountingLogic('b'), cache)
+        first.liwc_profile('china')
+        second.liwc_profile('china')
+        self.assertTrue(first.refresh())
+        self.assertEqual(1, len(cache))
+        second.liwc_profile('china')
+        self.assertEqual(1, second.logic.calls)
+
+    def test_results_are_copies(self):
+        logic = CachedLogic(CountingLogic())
+        df = logic.liwc_profile('china')
+        df['extra'] = 1
+        self.assertNotIn('extra', logic.liwc_profile('china').columns)
+
+    def test_passes_through_attributes(self):
+        logic = CachedLogic(CountingLogic())
+        self.assertEqual(0, logic.calls)
@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pna.cache import CachedLogic, LRUCache
+from pna.corpora import Corpora, load_manifest
+from pna.dbi import Dbi
+from pna.logic import PhillipinesEmbassyLogic
+
+
+class TestCorpora(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.TemporaryDirectory()
+        # make sure the bundle is built, then use copies of it
+        logic = PhillipinesEmbassyLogic(dbi=Dbi())
+        cls.nbytes = logic.nbytes()
+        cls.manifest = []
+        for name in ['a', 'b', 'c']:
+            bundle_dir = os.path.join(cls.dir.name, name)
+            shutil.copytree(logic.bundle_dir, bundle_dir)
+            cls.manifest.append({
+                'id': name,
+                'label': f'Corpus {name.upper()}',
+                'logic': 'pna.logic.PhillipinesEmbassyLogic',
+                'args': {'bundle_dir': bundle_dir}})
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dir.cleanup()
+
+    def test_lazy(self):
+        corpora = Corpora(Dbi(), self.manifest)
+        self.assertEqual('a', corpora.default)
+        self.assertEqual([], corpora.loaded())
+        logic = corpora.get('b')
+        self.assertIsInstance(logic, PhillipinesEmbassyLogic)
+        self.assertIs(logic, corpora.get('b'))
+        self.assertIs(corpora.get(), corpora.get('a'))
+        self.assertEqual(['b', 'a'], corpora.loaded())
+        self.assertEqual(2, corpora.loads)
+        with self.assertRaises(KeyError):
+            corpora.get('nope')
+
+    def test_evicts_least_recently_used(self):
+        corpora = Corpora(
+            Dbi(), self.manifest, max_bytes=int(self.nbytes * 2.5))
+        self.assertGreater(self.nbytes, 0)
+        a = corpora.get('a')
+        corpora.get('b')
+        corpora.get('a')
+        corpora.get('c')
+        self.assertEqual(['a', 'c'], corpora.loaded())
+        self.assertEqual(1, corpora.evictions)
+        self.assertIs(a, corpora.get('a'))
+        corpora.get('b')
+        self.assertEqual(['a', 'b'], corpora.loaded())
+        self.assertEqual(4, corpora.loads)
+
+    def test_keeps_the_one_asked_for(self):
+        corpora = Corpora(Dbi(), self.manifest, max_bytes=1)
+        corpora.get('a')
+        corpora.get('b')
+        self.assertEqual(['b'], corpora.loaded())
+
+    def test_wrap(self):
+        corpora = Corpora(Dbi(), self.manifest, wrap=CachedLogic)
+        logic = corpora.get('c')
+        self.assertIsInstance(logic, CachedLogic)
+        self.assertEqual(self.nbytes, logic.nbytes())
+        self.assertFalse(corpora.refresh())
+
+    def test_evicting_releases(self):
+        cache = LRUCache()
+        corpora = Corpora(Dbi(), self.manifest,
+                          wrap=lambda logic: CachedLogic(logic, cache))
+        evicted = []
+        corpora.on_evict(evicted.append)
+        corpora.get('a').entity_counts()
+        self.assertEqual(1, len(cache))
+        corpora.evict('a')
+        self.assertEqual(['a'], evicted)
+        self.assertEqual(0, len(cache))
+
+    def test_options(self):
+        corpora = Corpora(Dbi(), self.manifest[:2])
+        self.assertEqual(
+            [{'label': 'Corpus A', 'value': 'a'},
+             {'label': 'Corpus B', 'value': 'b'}],
+            corpora.options())
+
+    def test_of(self):
+        logic = PhillipinesEmbassyLogic(dbi=Dbi())
+        corpora = Corpora.of(logic)
+        self.assertIs(logic, corpora.get())
+        self.assertEqual(['default'], corpora.loaded())
+
+    def test_manifest(self):
+        corpora = load_manifest()
+        self.assertEqual('pna.logic.PhillipinesEmbassyLogic',
+                         corpora[0]['logic'])
@@ -1,6 +1,13 @@
+import os
+import time
 import unittest
 
-from pna.dbi import NarrativeRepository, NarrativeLabelRepository
+import pandas as pd
+import psycopg2
+from psycopg2 import errors
+
+from pna.dbi import Changes, ConnectionPool, get_connection, \
+    NarrativeRepository, NarrativeLabelRepository, PoolTimeout
 
 
 class TestNarrativeRepository(unittest.TestCase):
@@ -22,6 +29,26 @@ class TestNarrativeRepository(unittest.TestCase):
         codes = list(narratives.code.unique())
         self.assertIn('n3', codes)
 
+    def test_create_many(self):
+        repo = NarrativeRepository()
+        narratives = pd.DataFrame({
+            'code': ['m1', 'm2', 'n1'],
+            'description': ['One', 'Two', 'Not replaced']})
+        repo.create(code='n1', description='Democracy is failing')
+        self.assertEqual(2, repo.create_many(narratives))
+        df = repo.all().set_index('code')
+        self.assertEqual('Two', df.description['m2'])
+        self.assertEqual('Democracy is failing', df.description['n1'])
+        self.assertEqual(0, repo.create_many(narratives))
+
+    def test_iter_all(self):
+        repo = NarrativeRepository()
+        repo.create(code='n5', description='Sinovac works')
+        chunks = list(repo.iter_all(chunk_size=1))
+        self.assertEqual([1] * len(chunks), [len(c) for c in chunks])
+        df = pd.concat(chunks)
+        self.assertEqual(sorted(repo.all().code), list(df.code))
+
     def test_delete(self):
         repo = NarrativeRepository()
         repo.create(code='n4', description='China is your friend')
@@ -54,6 +81,135 @@ class TestNarrativeLabelRepository(unittest.TestCase):
     def test_create(self):
         pass  # tested in all
 
+    def test_create_many(self):
+        repo = NarrativeLabelRepository()
+        labels = pd.DataFrame({
+            'narrative_code': ['c1', 'c2', 'c1'],
+            'annotator': ['Bulk'] * 3,
+            'text': ['a, "quoted" one', '', 'multi\nline']})
+        try:
+            self.assertEqual(3, repo.create_many(labels))
+            df = repo.all()
+            df = df[df.annotator == 'Bulk']
+            self.assertEqual(sorted(labels.text), sorted(df.text))
+        finally:
+            for text in labels.text:
+                repo.delete(narrative_code='c1', annotator='Bulk', text=text)
+                repo.delete(narrative_code='c2', annotator='Bulk', text=text)
+        # all or nothing
+        labels = labels.assign(narrative_code=['c1', 'nope', 'c1'])
+        with self.assertRaises(errors.ForeignKeyViolation):
+            repo.create_many(labels)
+        self.assertNotIn('Bulk', list(repo.all().annotator))
+        with self.assertRaises(ValueError):
+            repo.create_many(labels.assign(text=['a', None, 'b']))
+
+    def test_iter_all(self):
+        repo = NarrativeLabelRepository()
+        labels = pd.DataFrame({
+            'narrative_code': ['c2'] * 5,
+            'annotator': ['Iter'] * 5,
+            'text': [f't{i}' for i in range(5)]})
+        repo.create_many(labels)
+        try:
+            chunks = list(repo.iter_all(
+                chunk_size=2,
+                sort=[('text', False)],
+                filters=[('annotator', 'eq', 'Iter')]))
+            self.assertEqual([2, 2, 1], [len(c) for c in chunks])
+            df = pd.concat(chunks)
+            self.assertEqual(['t4', 't3', 't2', 't1', 't0'], list(df.text))
+            self.assertIn('description', df.columns)
+            chunks = list(repo.iter_all(filters=[('annotator', 'eq', 'Nope')]))
+            self.assertEqual([0], [len(c) for c in chunks])
+        finally:
+            for text in labels.text:
+                repo.delete(narrative_code='c2', annotator='Iter', text=text)
+
+    def test_search(self):
+        repo = NarrativeLabelRepository()
+        labels = pd.DataFrame({
+            'narrative_code': ['c1', 'c2', 'c1', 'c1', 'c2'],
+            'annotator': ['Sam', 'Sam', 'Sam', 'Kim', 'Sam'],
+            'text': ['Vaccines', 'a vaccine', 'trade', 'VACCINE', 'other']})
+        repo.create_many(labels)
+        try:
+            df = repo.search(annotator='Sam', text='vaccine')
+            self.assertEqual(['Vaccines', 'a vaccine'], list(df.text))
+            self.assertIn('description', df.columns)
+            df = repo.search(narrative_code='c1', text='vaccine')
+            self.assertEqual(['Vaccines', 'VACCINE'], list(df.text))
+            # keyset paging
+            pages, after = [], None
+            while True:
+                df = repo.search(annotator='Sam', after=after, limit=3)
+                if not len(df):
+                    break
+                pages.append(list(df.text))
+                after = df.id.iloc[-1]
+            self.assertEqual(
+                [['Vaccines', 'a vaccine', 'trade'], ['other']], pages)
+        finally:
+            ids = repo.search(annotator='Sam').id
+            ids = [*ids, *repo.search(annotator='Kim').id]
+            self.assertEqual(5, repo.delete_ids(ids))
+        self.assertEqual(0, len(repo.search(annotator='Sam')))
+
+    def test_page(self):
+        repo = NarrativeLabelRepository()
+        texts = ['p1', 'p2', 'p3 100%', 'p4']
+        for text in texts:
+            repo.create(narrative_code='c2', annotator='Ann', text=text)
+        try:
+            filters = [('annotator', 'eq', 'Ann')]
+            df, total = repo.page(0, 3, filters=filters)
+            self.assertEqual(4, total)
+            self.assertEqual(texts[:3], list(df.text))
+            self.assertIn('description', df.columns)
+            df, _ = repo.page(3, 3, filters=filters)
+            self.assertEqual(texts[3:], list(df.text))
+            df, _ = repo.page(0, 2, sort=[('text', False)], filters=filters)
+            self.assertEqual(['p4', 'p3 100%'], list(df.text))
+            df, total = repo.page(
+                0, 10, filters=filters + [('text', 'contains', '0%')])
+            self.assertEqual((1, ['p3 100%']), (total, list(df.text)))
+            # unknown columns are ignored
+            _, total = repo.page(
+                0, 10, sort=[('nope', True)],
+                filters=filters + [('nope', 'eq', 1)])
+            self.assertEqual(4, total)
+        finally:
+            for text in texts:
+                repo.delete(narrative_code='c2', annotator='Ann', text=text)
+
+    def test_page_after_page(self):
+        repo = NarrativeLabelRepository()
+        texts = ['q1', 'q2', 'q2', 'q3', 'q4']
+        for text in texts:
+            repo.create(narrative_code='c2', annotator='Bea', text=text)
+        try:
+            filters = [('annotator', 'eq', 'Bea')]
+            sort = [('text', False)]
+            pages = [repo.page(offset, 2, sort=sort, filters=filters)
+                     for offset in [0, 2, 4, 2]]
+            self.assertEqual(
+                [['q4', 'q3'], ['q2', 'q2'], ['q1'], ['q2', 'q2']],
+                [list(df.text) for df, _ in pages])
+            self.assertEqual([5] * 4, [total for _, total in pages])
+            # a page further on than any so far starts from the nearest
+            df, _ = repo.page(3, 2, sort=sort, filters=filters)
+            self.assertEqual(['q2', 'q1'], list(df.text))
+            # counted again once the labels change
+            repo.create(narrative_code='c2', annotator='Bea', text='q5')
+            texts.append('q5')
+            df, total = repo.page(0, 2, sort=sort, filters=filters)
+            self.assertEqual((6, ['q5', 'q4']), (total, list(df.text)))
+            df, _ = repo.page(2, 2, sort=sort, filters=filters)
+            self.assertEqual(['q3', 'q2'], list(df.text))
+        finally:
+            for text in set(texts):
+                repo.delete(narrative_code='c2', annotator='Bea', text=text)
+
     def test_delete(self):
         repo = NarrativeLabelRepository()
         repo.create(narrative_code='c2', annotator='Tim', text='Pfft')
@@ -62,3 +218,143 @@ class TestNarrativeLabelRepository(unittest.TestCase):
         repo.delete(narrative_code='c2', annotator='Tim', text='Pfft')
         annotations = repo.all()
         self.assertNotIn('Pfft', annotations.text.unique())
+
+
+class TestChanges(unittest.TestCase):
+
+    def setUp(self):
+        # as if in two processes, each with its own view of the changes
+        self.changes = Changes(poll_every=0.)
+        self.other = Changes(poll_every=0.)
+        self.repo = NarrativeRepository(changes=self.changes)
+        self.other_repo = NarrativeRepository(changes=self.other)
+
+    def codes(self, repo):
+        return set(repo.all().code)
+
+    def test_cached_until_changed(self):
+        self.repo.create(code='k1', description='Cached')
+        self.assertIn('k1', self.codes(self.repo))
+        self.assertIn('k1', self.codes(self.other_repo))
+        # written behind the repositories' backs: not seen
+        conn = get_connection()
+        with conn, conn.cursor() as cursor:
+            cursor.execute("INSERT INTO narrative VALUES ('k2', 'Sneaky');")
+        conn.close()
+        self.assertNotIn('k2', self.codes(self.repo))
+        self.assertNotIn('k2', self.codes(self.other_repo))
+        # until a write through one of them
+        self.repo.delete('k1')
+        self.assertEqual({'k2'}, {'k1', 'k2'} & self.codes(self.repo))
+        deadline = time.monotonic() + 5.
+        while 'k1' in self.codes(self.other_repo):
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+        self.assertIn('k2', self.codes(self.other_repo))
+        self.repo.delete('k2')
+
+    def test_labels_follow_narratives(self):
+        labels = NarrativeLabelRepository(changes=self.changes)
+        self.repo.create(code='k3', description='Before')
+        labels.create(narrative_code='k3', annotator='Kay', text='x')
+        df = labels.all()
+        self.assertEqual(
+            ['Before'], list(df[df.annotator == 'Kay'].description))
+        conn = get_connection()
+        with conn, conn.cursor() as cursor:
+            cursor.execute(
+                "UPDATE narrative SET description = 'After' "
+                "WHERE code = 'k3';")
+        conn.close()
+        self.repo.create(code='k4', description='Unrelated')
+        df = labels.all()
+        self.assertEqual(
+            ['After'], list(df[df.annotator == 'Kay'].description))
+        labels.delete(narrative_code='k3', annotator='Kay', text='x')
+        for code in ['k3', 'k4']:
+            self.repo.delete(code)
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def test_reuses_connections(self):
+        pool = ConnectionPool(max_size=2)
+        with pool.connection() as conn:
+            first = conn
+        with pool.connection() as conn:
+            self.assertIs(first, conn)
+        self.assertEqual(1, pool.stats()['created'])
+        pool.close()
+
+    def test_replaces_closed_connections(self):
+        pool = ConnectionPool(max_size=2)
+        with pool.connection() as conn:
+            first = conn
+        first.close()
+        with pool.connection() as conn:
+            self.assertIsNot(first, conn)
+            self.assertFalse(conn.closed)
+        pool.close()
+
+    def test_timeout_when_exhausted(self):
+        pool = ConnectionPool(max_size=1)
+        conn = pool.checkout()
+        with self.assertRaises(PoolTimeout):
+            pool.checkout(timeout=0.01)
+        pool.checkin(conn)
+        pool.close()
+
+    def test_rolls_back_on_error(self):
+        pool = ConnectionPool(max_size=1)
+        with self.assertRaises(errors.UndefinedTable):
+            with pool.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute('SELECT * FROM not_a_table;')
+        # the same connection is usable afterwards
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1;')
+                self.assertEqual((1,), cursor.fetchone())
+        self.assertEqual(1, pool.stats()['created'])
+        pool.close()
+
+    def test_recycles_idle_connections(self):
+        pool = ConnectionPool(min_size=0, max_size=2, max_idle=0.)
+        with pool.connection():
+            pass
+        self.assertEqual(0, pool.stats()['idle'])
+        pool.close()
+
+    def test_opens_min_size_on_first_checkout(self):
+        pool = ConnectionPool(min_size=2, max_size=3)
+        self.assertEqual(0, pool.stats()['created'])
+        first = pool.checkout()
+        self.assertEqual(1, pool.stats()['idle'])
+        second = pool.checkout()
+        self.assertEqual(2, pool.stats()['created'])
+        pool.checkin(first)
+        pool.checkin(second)
+        pool.close()
+
+    def test_without_database(self):
+        host = os.environ.pop('PGSQL_HOST', None)
+        try:
+            pool = ConnectionPool()
+            with self.assertRaises(psycopg2.OperationalError):
+                pool.checkout()
+            self.assertEqual(0, pool.stats()['in_use'])
+        finally:
+            if host is not None:
+                os.environ['PGSQL_HOST'] = host
+
+    def test_recycles_idle_connections_on_checkout(self):
+        pool = ConnectionPool(min_size=1, max_size=3, max_idle=0.2)
+        conns = [pool.checkout() for _ in range(3)]
+        for conn in conns:
+            pool.checkin(conn)
+        self.assertEqual(3, pool.stats()['idle'])
+        time.sleep(0.3)
+        with pool.connection():
+            # the two above min_size were closed before handing one out
+            self.assertEqual(0, pool.stats()['idle'])
+        pool.close()
@@ -0,0 +1,50 @@
+import threading
+import time
+import unittest
+
+from pna.executor import Executor, QueueFull, TaskTimeout
+
+
+class TestExecutor(unittest.TestCase):
+
+    def test_run(self):
+        executor = Executor()
+        self.assertEqual(3, executor.run(sum, [1, 2]))
+        self.assertEqual('a-b', executor.run('-'.join, ['a', 'b']))
+        self.assertEqual(2, executor.stats()['completed'])
+
+    def test_runs_off_the_calling_thread(self):
+        executor = Executor()
+        thread = executor.run(threading.get_ident)
+        self.assertNotEqual(threading.get_ident(), thread)
+
+    def test_errors_propagate(self):
+        executor = Executor()
+        with self.assertRaises(ZeroDivisionError):
+            executor.run(lambda: 1 / 0)
+        self.assertEqual(1, executor.stats()['failed'])
+
+    def test_timeout(self):
+        executor = Executor(timeout=0.01)
+        with self.assertRaises(TaskTimeout):
+            executor.run(time.sleep, 0.2)
+        self.assertEqual(1, executor.stats()['timed_out'])
+
+    def test_queue_full(self):
+        executor = Executor(max_workers=1, max_queue=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        thread = threading.Thread(target=executor.run, args=(block,))
+        thread.start()
+        started.wait()
+        with self.assertRaises(QueueFull):
+            executor.run(sum, [1])
+        release.set()
+        thread.join()
+        self.assertEqual(1, executor.stats()['rejected'])
+        self.assertEqual(0, executor.stats()['pending'])
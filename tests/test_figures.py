@@ -0,0 +1,75 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import plotly.express as px
+
+from pna.figures import FigureCache
+
+
+def build():
+    return px.bar(x=['2020-01-01', '2020-01-02'], y=[1, 2])
+
+
+class TestFigureCache(unittest.TestCase):
+
+    def test_builds_once(self):
+        calls = []
+
+        def counting_build():
+            calls.append(1)
+            return build()
+
+        figures = FigureCache()
+        first = figures.get('a', 'v1', 'volume', counting_build)
+        second = figures.get('a', 'v1', 'volume', counting_build)
+        self.assertEqual(1, len(calls))
+        self.assertIs(first, second)
+        self.assertIn('data', first)
+
+    def test_new_version_rebuilds(self):
+        calls = []
+        figures = FigureCache()
+        figures.get('a', 'v1', 'volume', lambda: calls.append(1) or build())
+        figures.get('a', 'v2', 'volume', lambda: calls.append(1) or build())
+        self.assertEqual(2, len(calls))
+
+    def test_new_version_replaces_old(self):
+        figures = FigureCache()
+        figures.get('a', 'v1', 'volume', build)
+        figures.get('b', 'v1', 'volume', build)
+        figures.get('a', 'v2', 'volume', build)
+        self.assertEqual(2, figures.stats()['figures'])
+        figures.forget('a')
+        self.assertEqual(1, figures.stats()['figures'])
+
+    def test_builds_figures_concurrently(self):
+        figures = FigureCache()
+        started = threading.Barrier(2, timeout=5)
+
+        def build_together():
+            # both builds must be running at once to get past this
+            started.wait()
+            return build()
+
+        threads = [threading.Thread(target=figures.get,
+                                    args=('a', 'v1', name, build_together))
+                   for name in ['volume', 'liwc']]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(2, figures.stats()['builds'])
+
+    def test_disk(self):
+        with tempfile.TemporaryDirectory() as path:
+            figure = FigureCache(path).get('a', 'v1', 'volume', build)
+
+            def fail():
+                raise AssertionError('should be loaded from disk')
+
+            self.assertEqual(
+                figure, FigureCache(path).get('a', 'v1', 'volume', fail))
+            FigureCache(path).get('a', 'v2', 'volume', build)
+            self.assertEqual(['v2'], os.listdir(os.path.join(path, 'a')))
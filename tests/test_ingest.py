@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import pandas as pd
+
+from pna.cache import CachedLogic
+from pna.dbi import Dbi
+from pna.logic import PhillipinesEmbassyLogic
+
+
+class TestIngest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.bundle_dir = os.path.join(self.dir.name, 'bundle')
+        # make sure the bundle is built, then work on a copy
+        logic = PhillipinesEmbassyLogic(dbi=Dbi())
+        shutil.copytree(logic.bundle_dir, self.bundle_dir)
+        self.logic = PhillipinesEmbassyLogic(
+            dbi=Dbi(), bundle_dir=self.bundle_dir, refresh_every=0.)
+        self.tweets = pd.DataFrame([
+            dict(id=1, date='2021-05-18T10:00:00', likes=3, retweets=1,
+                 text='China and the Philippines sign a vaccine deal',
+                 n_tokens=8, entities=['china', 'philippines'],
+                 cats={'posemo': 2, 'we': 1}),
+            dict(id=2, date='2021-05-17', likes=0, retweets=0,
+                 text='Wuhan news', n_tokens=2,
+                 entities=['wuhan', 'china', 'china'], cats={'negemo': 1}),
+        ])
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def counts(self, entity):
+        df = self.logic.entity_counts()
+        return df.set_index('Entity').Count[entity]
+
+    def test_ingest(self):
+        version = self.logic.corpus_version()
+        china = self.counts('china')
+        profile = self.logic.liwc_profile('china').set_index('Category')
+        sentences = self.logic.sentences('china')
+
+        self.assertEqual(2, self.logic.ingest(self.tweets))
+        self.assertNotEqual(version, self.logic.corpus_version())
+        self.assertEqual(china + 3, self.counts('china'))
+        updated = self.logic.liwc_profile('china').set_index('Category')
+        self.assertEqual(profile.n_tokens.iloc[0] + 10,
+                         updated.n_tokens.iloc[0])
+        self.assertEqual(profile.n_tokens_entity.iloc[0] + 10,
+                         updated.n_tokens_entity.iloc[0])
+        self.assertEqual(profile.n_tokens_entity_cat['posemo'] + 2,
+                         updated.n_tokens_entity_cat['posemo'])
+        self.assertEqual(list(profile.index), list(updated.index))
+        attention = self.logic.entity_counts_over_time('china')
+        self.assertEqual(['2021-05-17', '2021-05-18'],
+                         list(attention.Date.iloc[-2:]))
+        self.assertEqual([2, 1], list(attention.Count.iloc[-2:]))
+
+        df = self.logic.sentences('china')
+        self.assertEqual(len(sentences) + 2, len(df))
+        self.assertEqual(['2021-05-18', '2021-05-17'], list(df.Date[:2]))
+        self.assertEqual(list(sentences.Url), list(df.Url[2:]))
+        df = self.logic.search_sentences('philippines', ['vaccine deal'])
+        self.assertEqual(['2021-05-18'], list(df.Date))
+
+    def test_windowed_profile(self):
+        self.logic.ingest(self.tweets)
+        df = self.logic.liwc_profiles(
+            ['china'], start='2021-05-18', end='2021-05-18')
+        df = df.set_index('Category')
+        self.assertEqual(8, df.n_tokens_entity['posemo'])
+        self.assertEqual(2, df.n_tokens_entity_cat['posemo'])
+        self.assertEqual(0, df.n_tokens_entity_cat['negemo'])
+        df = self.logic.liwc_profiles(['china', 'wuhan'], start='2021-05-17')
+        self.assertEqual({'china': 10, 'wuhan': 2},
+                         df.groupby('Entity').n_tokens_entity.first().to_dict())
+
+    def test_untouched_tables_are_linked(self):
+        pca = os.path.join(self.bundle_dir, 'pca.token.npy')
+        inode = os.stat(pca).st_ino
+        self.logic.ingest(self.tweets)
+        self.assertEqual(inode, os.stat(pca).st_ino)
+        self.assertEqual(len(self.logic.bundle.frame('pca')),
+                         self.logic.bundle.rows('pca'))
+
+    def test_ingest_twice(self):
+        self.logic.ingest(self.tweets)
+        version = self.logic.corpus_version()
+        self.assertEqual(0, self.logic.ingest(self.tweets))
+        self.assertEqual(version, self.logic.corpus_version())
+
+    def test_new_entity(self):
+        tweets = self.tweets.assign(entities=[['newthing'], []])
+        self.logic.ingest(tweets)
+        self.assertEqual(1, self.counts('newthing'))
+        df = self.logic.liwc_profile('newthing')
+        self.assertEqual(len(self.logic.liwc_profile('china')), len(df))
+        self.assertEqual(1, len(self.logic.sentences('newthing')))
+
+    def test_refresh(self):
+        other = CachedLogic(PhillipinesEmbassyLogic(
+            dbi=Dbi(), bundle_dir=self.bundle_dir, refresh_every=0.))
+        china = other.entity_counts().set_index('Entity').Count['china']
+        self.assertFalse(other.refresh())
+        self.logic.ingest(self.tweets)
+        self.assertTrue(other.refresh())
+        self.assertEqual(self.logic.corpus_version(), other.corpus_version())
+        self.assertEqual(
+            china + 3,
+            other.entity_counts().set_index('Entity').Count['china'])
@@ -1,3 +1,6 @@
+import os
+import tempfile
+import threading
 import unittest
 
 import pandas as pd
@@ -23,6 +26,26 @@ class TestPhillipinesEmbassyLogic(unittest.TestCase):
         for column in ['PC1', 'PC2']:
             self.assertIn(column, df.columns)
 
+    def test_vector_neighbourhood_of_any_word(self):
+        # not an entity, but in the vocabulary
+        word = next(w for w in self.logic.neighbours.tokens
+                    if not self.logic.bundle.groups('neighbours').get(w))
+        self.assertTrue(self.logic.in_vocab(word))
+        df = self.logic.vector_neighbourhood(word)
+        self.assertIn(word, list(df.token))
+        self.assertEqual(0, len(self.logic.sentences(word)))
+
+    def test_vector_neighbourhoods(self):
+        df = self.logic.vector_neighbourhoods(['china', 'us'])
+        for column in ['token', 'PC1', 'PC2', 'Anchor']:
+            self.assertIn(column, df.columns)
+        self.assertTrue(df.token.is_unique)
+        self.assertEqual({'china', 'us'}, set(df.Anchor))
+        self.assertEqual(
+            'china', df.set_index('token').loc['china', 'Anchor'])
+        single = self.logic.vector_neighbourhood('china')
+        self.assertTrue(set(single.token) <= set(df.token))
+
     def test_liwc_profile(self):
         df = self.logic.liwc_profile('China')
         self.assertIsInstance(df, pd.DataFrame)
@@ -34,12 +57,63 @@ class TestPhillipinesEmbassyLogic(unittest.TestCase):
         self.assertIsInstance(df, pd.DataFrame)
         self.assertIn('Sentence', df.columns)
 
+    def test_search_sentences(self):
+        df = self.logic.search_sentences('china', [])
+        self.assertEqual(len(self.logic.sentences('china')), len(df))
+        df = self.logic.search_sentences(
+            'china', ['Positive Definite Matrix'], match_all=True)
+        self.assertEqual(0, len(df))
+        self.assertIn('Sentence', df.columns)
+
     def test_entity_counts_over_time(self):
         df = self.logic.entity_counts_over_time('China')
         self.assertIsInstance(df, pd.DataFrame)
         for column in ['Entity', 'Date', 'Count']:
             self.assertIn(column, df.columns)
 
+    def test_entity_counts_over_time_sorted_by_date(self):
+        df = self.logic.entity_counts_over_time('china')
+        self.assertGreater(len(df), 0)
+        self.assertTrue((df.Entity == 'china').all())
+        self.assertTrue(df.Date.is_monotonic_increasing)
+
+    def test_entity_counts_over_time_unknown_entity(self):
+        df = self.logic.entity_counts_over_time('Positive Definite Matrix')
+        self.assertEqual(0, len(df))
+
+    def test_date_windows(self):
+        start, end = '2021-01-01', '2021-01-31'
+        for df, window in [
+                (self.logic.sentences('china'),
+                 self.logic.sentences('china', start, end)),
+                (self.logic.entity_counts_over_time('china'),
+                 self.logic.entity_counts_over_time('china', start, end)),
+                (self.logic.corpus_volume_over_time(),
+                 self.logic.corpus_volume_over_time(start, end)),
+                (self.logic.liwc_over_time(),
+                 self.logic.liwc_over_time(start, end))]:
+            self.assertGreater(len(window), 0)
+            expected = df[(df.Date >= start) & (df.Date <= end)]
+            pd.testing.assert_frame_equal(
+                expected.reset_index(drop=True), window.reset_index(drop=True))
+        self.assertEqual(
+            0, len(self.logic.search_sentences('china', [], start='2030-01-01')))
+
+    def test_iter_sentences(self):
+        df = self.logic.sentences('china', start='2021-01-01')
+        chunks = list(self.logic.iter_sentences(
+            'china', start='2021-01-01', chunk_size=10))
+        self.assertEqual(-(-len(df) // 10), len(chunks))
+        pd.testing.assert_frame_equal(
+            df, pd.concat(chunks).reset_index(drop=True))
+        chunks = list(self.logic.iter_sentences('china', start='2030-01-01'))
+        self.assertEqual([0], [len(c) for c in chunks])
+
+    def test_date_range(self):
+        first, last = self.logic.date_range()
+        self.assertLess(first, last)
+        self.assertEqual(first, self.logic.corpus_volume_over_time().Date[0])
+
     def test_corpus_volume_over_time(self):
         df = self.logic.corpus_volume_over_time()
         self.assertIsInstance(df, pd.DataFrame)
@@ -49,3 +123,30 @@ class TestPhillipinesEmbassyLogic(unittest.TestCase):
     def test_in_vocab(self):
         self.assertTrue(self.logic.in_vocab('China'))
         self.assertFalse(self.logic.in_vocab('Positive Definite Matrix'))
+
+
+class TestBundleBuild(unittest.TestCase):
+
+    def test_built_once(self):
+        with tempfile.TemporaryDirectory() as dir:
+            bundle_dir = os.path.join(dir, 'ph_bundle')
+            threads = [threading.Thread(
+                target=PhillipinesEmbassyLogic,
+                kwargs={'dbi': Dbi(), 'bundle_dir': bundle_dir})
+                for _ in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            versions = [entry for entry in os.listdir(dir)
+                        if entry.startswith('ph_bundle.')
+                        and not entry.endswith('.lock')]
+            self.assertEqual(1, len(versions))
+
+    def test_warns_without_text(self):
+        # the shipped tweets have no text
+        with tempfile.TemporaryDirectory() as dir:
+            with self.assertLogs('pna.logic', 'WARNING') as logs:
+                PhillipinesEmbassyLogic.build_bundle(
+                    os.path.join(dir, 'ph_bundle'))
+        self.assertIn('no tweet text', logs.output[0])
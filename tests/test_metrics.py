@@ -0,0 +1,116 @@
+import unittest
+
+from dash.exceptions import PreventUpdate
+import pandas as pd
+
+from pna.logic import Logic
+from pna.metrics import callback_name, instrument_dbi, MeteredLogic, Metrics
+
+
+class SentenceLogic(Logic):
+
+    def __init__(self):
+        super().__init__(dbi=None)
+
+    def corpus_version(self) -> str:
+        return 'v1'
+
+    def entity_counts(self) -> pd.DataFrame:
+        return pd.DataFrame({'Entity': ['china'], 'Count': [3]})
+
+    def iter_sentences(self, entity, *args, **kwargs):
+        yield pd.DataFrame({'Sentence': ['a']})
+        yield pd.DataFrame({'Sentence': ['b']})
+
+
+class Repository:
+
+    def all(self):
+        return 'all'
+
+    def stats(self):
+        return dict(hits=1)
+
+
+class Dbi:
+
+    def __init__(self):
+        self.narratives = Repository()
+        self.narrative_labels = Repository()
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics(slow_callback=0.)
+
+    def test_histogram(self):
+        for seconds in [.001, .02, 100.]:
+            self.metrics.observe('pna_test_seconds', seconds, method='m')
+        text = self.metrics.render()
+        self.assertIn('# TYPE pna_test_seconds histogram', text)
+        self.assertIn('pna_test_seconds_bucket{method="m",le="0.005"} 1',
+                      text)
+        self.assertIn('pna_test_seconds_bucket{method="m",le="0.025"} 2',
+                      text)
+        self.assertIn('pna_test_seconds_bucket{method="m",le="+Inf"} 3',
+                      text)
+        self.assertIn('pna_test_seconds_count{method="m"} 3', text)
+        self.assertIn('pna_test_seconds_sum{method="m"} 100.021', text)
+
+    def test_counters_and_gauges(self):
+        self.metrics.inc('pna_test_total', kind='a "quoted" one')
+        self.metrics.inc('pna_test_total', 2, kind='a "quoted" one')
+        self.metrics.gauges('pna_cache', lambda: dict(hits=4, misses=1))
+        text = self.metrics.render()
+        self.assertIn('pna_test_total{kind="a \\"quoted\\" one"} 3', text)
+        self.assertIn('# TYPE pna_cache_hits gauge\npna_cache_hits 4', text)
+
+    def test_callback(self):
+        def callback(value, outputs_list=None):
+            if value is None:
+                raise PreventUpdate
+            return '{"response": 1}'
+
+        call = self.metrics.callback('a.b', callback)
+        with self.assertLogs('pna.metrics', 'WARNING') as logs:
+            self.assertEqual('{"response": 1}', call(1, outputs_list=[]))
+        self.assertIn('Slow callback a.b', logs.output[0])
+        with self.assertLogs('pna.metrics', 'WARNING'), \
+                self.assertRaises(PreventUpdate):
+            call(None, outputs_list=[])
+        text = self.metrics.render()
+        self.assertIn('pna_callback_seconds_count{callback="a.b"} 2', text)
+        self.assertIn(
+            'pna_callback_calls_total{callback="a.b",outcome="prevented"} 1',
+            text)
+        self.assertIn('pna_callback_response_bytes_sum{callback="a.b"} 15',
+                      text)
+
+    def test_callback_name(self):
+        self.assertEqual('a.b', callback_name('a.b'))
+        self.assertEqual('a.b,c.d', callback_name('..a.b...c.d..'))
+
+    def test_metered_logic(self):
+        logic = MeteredLogic(SentenceLogic(), self.metrics)
+        self.assertEqual(['china'], list(logic.entity_counts().Entity))
+        self.assertEqual('v1', logic.corpus_version())
+        chunks = logic.iter_sentences('china')
+        # only counted once read
+        self.assertNotIn('iter_sentences', self.metrics.render())
+        self.assertEqual(2, len(list(chunks)))
+        text = self.metrics.render()
+        self.assertIn('pna_logic_seconds_count{method="entity_counts"} 1',
+                      text)
+        self.assertIn('pna_logic_seconds_count{method="iter_sentences"} 1',
+                      text)
+
+    def test_instrument_dbi(self):
+        dbi = instrument_dbi(Dbi(), self.metrics)
+        self.assertIs(dbi.narratives, instrument_dbi(dbi, self.metrics)
+                      .narratives)
+        self.assertEqual('all', dbi.narratives.all())
+        self.assertEqual(dict(hits=1), dbi.narratives.stats())
+        text = self.metrics.render()
+        self.assertIn('pna_db_seconds_count{method="narratives.all"} 1', text)
+        self.assertNotIn('stats', text)
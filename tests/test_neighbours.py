@@ -0,0 +1,71 @@
+import unittest
+
+import numpy as np
+
+from pna.neighbours import NeighbourIndex, normalise, project, top_k
+
+
+class TestNeighbourIndex(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.tokens = [f'token{i}' for i in range(50)]
+        self.vectors = normalise(rng.normal(size=(50, 8)))
+        # small blocks, so results are merged across blocks
+        self.index = NeighbourIndex(self.tokens, self.vectors, block_size=7)
+
+    def test_normalise(self):
+        vectors = normalise(np.array([[3., 4.], [0., 0.]]))
+        np.testing.assert_allclose([[.6, .8], [0., 0.]], vectors)
+
+    def test_top_k(self):
+        scores = np.array([.1, .5, .3, .9])
+        self.assertEqual([3, 1], list(top_k(scores, 2)))
+        self.assertEqual([3, 1, 2, 0], list(top_k(scores, 10)))
+
+    def test_neighbours_match_brute_force(self):
+        for i in [0, 13, 49]:
+            scores = self.vectors @ self.vectors[i]
+            expected = [self.tokens[j] for j in np.argsort(-scores)
+                        if j != i][:10]
+            self.assertEqual(
+                expected, list(self.index.neighbours(self.tokens[i], 10)))
+
+    def test_neighbours_many(self):
+        tokens = ['token3', 'token40', 'token7']
+        self.assertEqual(
+            [self.index.neighbours(token, 10) for token in tokens],
+            self.index.neighbours_many(tokens, 10))
+
+    def test_project_pca(self):
+        coordinates = project(self.vectors)
+        self.assertEqual((50, 2), coordinates.shape)
+        np.testing.assert_allclose([0, 0], coordinates.mean(axis=0),
+                                   atol=1e-9)
+        # first component explains the most variance, and they're orthogonal
+        variance = coordinates.var(axis=0)
+        self.assertGreater(variance[0], variance[1])
+        self.assertAlmostEqual(0, coordinates[:, 0] @ coordinates[:, 1])
+
+    def test_project_random(self):
+        coordinates = project(self.vectors, method='random')
+        self.assertEqual((50, 2), coordinates.shape)
+        np.testing.assert_array_equal(
+            coordinates, project(self.vectors, method='random'))
+        with self.assertRaises(ValueError):
+            project(self.vectors, method='tsne')
+
+    def test_projection_is_cached(self):
+        tokens = ('token1', 'token2', 'token3')
+        self.assertIs(self.index.projection(tokens),
+                      self.index.projection(tokens))
+
+    def test_neighbours_are_cached(self):
+        self.index.neighbours('token1', 5)
+        self.index.neighbours('token1', 5)
+        self.assertEqual(1, self.index.neighbours.cache_info().hits)
+
+    def test_unknown_token(self):
+        self.assertNotIn('unknown', self.index)
+        with self.assertRaises(KeyError):
+            self.index.neighbours('unknown')
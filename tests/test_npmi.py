@@ -0,0 +1,91 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from pna.npmi import NpmiEngine, npmi
+
+
+class TestNpmi(unittest.TestCase):
+
+    def test_matches_precomputed(self):
+        df = pd.read_csv('data/ph_npmis.csv')
+        computed = npmi(df.copy())
+        for column in ['p_y', 'p_y_x', 'p_xy', 'h_xy', 'pmi']:
+            np.testing.assert_allclose(df[column], computed[column])
+        np.testing.assert_allclose(df.npmi, computed.NPMI)
+
+
+class TestNpmiEngine(unittest.TestCase):
+
+    def setUp(self):
+        df_totals = pd.DataFrame({
+            'n_tokens': 100,
+            'n_tokens_entity': [40, 40, 10, 10],
+            'n_tokens_cat': [20, 5, 20, 5],
+            'n_tokens_entity_cat': [12, 0, 1, 2],
+            'Entity': ['a', 'a', 'b', 'b'],
+            'Category': ['posemo', 'negemo', 'posemo', 'negemo'],
+        })
+        df_daily = pd.DataFrame({
+            'Date': ['2021-01-01', '2021-01-01', '2021-01-02', '2021-01-02'],
+            'Category': ['posemo', 'negemo', 'posemo', 'negemo'],
+            'Count': [3, 1, 2, 0],
+            'Number of Tokens': [10, 10, 20, 20],
+        })
+        df_entity_tokens = pd.DataFrame({
+            'Date': np.array(['2021-01-02', '2021-01-01'],
+                             dtype='datetime64[D]'),
+            'Entity': ['a', 'a'],
+            'Tokens': [8, 5],
+        })
+        df_entity_cats = pd.DataFrame({
+            'Date': np.array(['2021-01-02'], dtype='datetime64[D]'),
+            'Entity': ['a'],
+            'Category': ['posemo'],
+            'Count': [2],
+        })
+        self.engine_args = (
+            df_totals, df_daily, df_entity_tokens, df_entity_cats)
+        self.engine = NpmiEngine(*self.engine_args)
+
+    def test_profiles(self):
+        df = self.engine.profiles(['b', 'unknown', 'a'])
+        self.assertEqual(['b', 'b', 'a', 'a'], list(df.Entity))
+        self.assertEqual([1, 2, 12, 0], list(df.n_tokens_entity_cat))
+        expected = npmi(pd.DataFrame({
+            'n_tokens': [100], 'n_tokens_entity': [40], 'n_tokens_cat': [20],
+            'n_tokens_entity_cat': [12]}))
+        self.assertAlmostEqual(expected.NPMI[0], df.NPMI.iloc[2])
+        self.assertEqual(0, df.NPMI.iloc[3])
+
+    def test_combined(self):
+        df = self.engine.profiles(['a', 'b'], combine=True)
+        self.assertEqual(['a, b', 'a, b'], list(df.Entity))
+        self.assertEqual([50, 50], list(df.n_tokens_entity))
+        self.assertEqual([13, 2], list(df.n_tokens_entity_cat))
+
+    def test_window(self):
+        df = self.engine.profiles(['a'], start='2021-01-02')
+        self.assertEqual([20, 20], list(df.n_tokens))
+        self.assertEqual([2, 0], list(df.n_tokens_cat))
+        self.assertEqual([8, 8], list(df.n_tokens_entity))
+        self.assertEqual([2, 0], list(df.n_tokens_entity_cat))
+        df = self.engine.profiles(['a'], end='2021-01-01')
+        self.assertEqual([10, 10], list(df.n_tokens))
+        self.assertEqual([5, 5], list(df.n_tokens_entity))
+        self.assertEqual([0, 0], list(df.n_tokens_entity_cat))
+
+    def test_window_not_covered(self):
+        engine = NpmiEngine(*self.engine_args, dated_from='2021-01-02')
+        df = engine.profiles(['a'], start='2021-01-02')
+        self.assertEqual([8, 8], list(df.n_tokens_entity))
+        self.assertTrue(engine.covers('2021-01-02'))
+        for start, end in [(None, '2021-01-02'), ('2021-01-01', None)]:
+            self.assertFalse(engine.covers(start, end))
+            df = engine.profiles(['a'], start=start, end=end)
+            self.assertTrue(df.NPMI.isna().all())
+            self.assertTrue(df.n_tokens_entity.isna().all())
+            self.assertFalse(df.n_tokens_cat.isna().any())
+        self.assertEqual([40, 40],
+                         list(engine.profiles(['a']).n_tokens_entity))
@@ -0,0 +1,122 @@
+import io
+import unittest
+
+import pandas as pd
+
+from pna import init_app
+from pna.cache import CachedLogic
+from pna.corpora import Corpora
+from pna.dbi import Dbi
+from pna.logic import PhillipinesEmbassyLogic
+from pna.startup import Startup
+
+
+class TestExportRoutes(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.logic = CachedLogic(PhillipinesEmbassyLogic(dbi=Dbi()))
+        cls.app = init_app(cls.logic)
+
+    def setUp(self):
+        self.client = self.app.test_client()
+
+    def csv(self, url: str) -> pd.DataFrame:
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/csv', response.mimetype)
+        return pd.read_csv(io.BytesIO(response.data))
+
+    def test_entity_sentences(self):
+        df = self.csv('/export/entity/china/sentences.csv'
+                      '?start=2021-01-01&end=2021-03-31')
+        expected = self.logic.sentences(
+            'china', start='2021-01-01', end='2021-03-31')
+        self.assertGreater(len(df), 0)
+        self.assertEqual(list(expected.Url), list(df.Url))
+
+    def test_entity_attention_and_liwc(self):
+        df = self.csv('/export/entity/china/attention.csv?end=2020-12-31')
+        self.assertEqual(
+            len(self.logic.entity_counts_over_time('china', end='2020-12-31')),
+            len(df))
+        df = self.csv('/export/entity/china/liwc.csv')
+        self.assertEqual(list(self.logic.liwc_profile('china').Category),
+                         list(df.Category))
+
+    def test_sentences_search(self):
+        key = self.app.store.put(self.logic.sentences('china'))
+        df = self.csv(
+            f'/export/sentences/{key}.csv?filter=%7BLikes%7D+%3E+100')
+        self.assertGreater(len(df), 0)
+        self.assertTrue((df.Likes > 100).all())
+        response = self.client.get('/export/sentences/nope.csv')
+        self.assertEqual(404, response.status_code)
+
+    def test_unknown_format(self):
+        response = self.client.get('/export/entity/china/liwc.xlsx')
+        self.assertEqual(404, response.status_code)
+
+
+class TestExportCorpora(unittest.TestCase):
+
+    def test_loads_on_executor(self):
+        corpora = Corpora(Dbi(), [
+            {'id': name, 'logic': 'pna.logic.PhillipinesEmbassyLogic'}
+            for name in ['a', 'b']])
+        app = init_app(corpora)
+        client = app.test_client()
+        response = client.get('/export/entity/china/attention.csv?corpus=b')
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(['b'], corpora.loaded())
+        self.assertEqual(1, app.executor.stats()['completed'])
+        client.get('/export/entity/china/attention.csv?corpus=b')
+        self.assertEqual(1, app.executor.stats()['completed'])
+        response = client.get('/export/entity/china/attention.csv?corpus=c')
+        self.assertEqual(404, response.status_code)
+
+
+class TestMetricsRoute(unittest.TestCase):
+
+    def test_metrics(self):
+        app = init_app(CachedLogic(PhillipinesEmbassyLogic(dbi=Dbi())))
+        client = app.test_client()
+        response = client.post('/propaganda_analysis/_dash-update-component',
+                               json=dict(
+                                   output='top_entities.children',
+                                   outputs=dict(id='top_entities',
+                                                property='children'),
+                                   inputs=[dict(id='initialize',
+                                                property='n_clicks',
+                                                value=1),
+                                           dict(id='document_set',
+                                                property='value',
+                                                value='default')],
+                                   changedPropIds=['initialize.n_clicks']))
+        self.assertEqual(200, response.status_code)
+        response = client.get('/metrics')
+        self.assertEqual(200, response.status_code)
+        text = response.data.decode()
+        self.assertIn('pna_callback_seconds_count'
+                      '{callback="top_entities.children"} 1', text)
+        self.assertIn('pna_callback_calls_total'
+                      '{callback="top_entities.children",outcome="ok"} 1',
+                      text)
+        self.assertIn('pna_corpora_loaded 1', text)
+        self.assertIn('pna_db_cache_hits{repository="narratives"}', text)
+
+
+class TestReadyRoute(unittest.TestCase):
+
+    def test_ready_once_warmed_up(self):
+        startup = Startup(log=lambda x: None)
+        app = init_app(PhillipinesEmbassyLogic(dbi=Dbi()), startup=startup)
+        client = app.test_client()
+        self.assertEqual(503, client.get('/ready').status_code)
+        self.assertIn('pna_startup_ready 0',
+                      client.get('/metrics').data.decode())
+        app.warm_up()
+        self.assertEqual(200, client.get('/ready').status_code)
+        self.assertIn('corpus', startup.phases)
+        self.assertIn('pna_startup_ready 1',
+                      client.get('/metrics').data.decode())
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+
+from pna.search import build_postings, match, parse_keywords, tokenize
+
+
+class TestSearch(unittest.TestCase):
+
+    def setUp(self):
+        texts = [
+            'China donates vaccines to the Philippines.',
+            'Vaccines arrive in Manila.',
+            'The South China Sea.',
+            'Sinovac vaccines for Manila, from China.',
+        ]
+        df = build_postings(texts)
+        self.index = {
+            term: group.row.values for term, group in df.groupby('term')}
+
+    def postings(self, term):
+        return self.index.get(term, np.empty(0, dtype=np.int64))
+
+    def test_tokenize(self):
+        self.assertEqual(['south', 'china', 'sea'],
+                         tokenize('South China, Sea!'))
+
+    def test_parse_keywords(self):
+        self.assertEqual(['china', 'south china sea'],
+                         parse_keywords('china, south china sea,'))
+
+    def test_any(self):
+        rows = match(self.postings, slice(0, 4), ['manila', 'sea'])
+        self.assertEqual([1, 2, 3], list(rows))
+
+    def test_all(self):
+        rows = match(self.postings, slice(0, 4), ['china', 'vaccines'],
+                     match_all=True)
+        self.assertEqual([0, 3], list(rows))
+
+    def test_phrase_needs_every_word(self):
+        rows = match(self.postings, slice(0, 4), ['south china'])
+        self.assertEqual([2], list(rows))
+
+    def test_restricted_to_rows(self):
+        self.assertEqual([3], list(match(self.postings, slice(1, 4),
+                                         ['china', 'sinovac'],
+                                         match_all=True)))
+        self.assertEqual([0], list(match(self.postings, np.array([0, 2]),
+                                         ['vaccines'])))
+
+    def test_case_insensitive_and_unknown(self):
+        self.assertEqual([1, 3], list(match(self.postings, slice(0, 4),
+                                            ['MANILA'])))
+        self.assertEqual([], list(match(self.postings, slice(0, 4),
+                                        ['taiwan'])))
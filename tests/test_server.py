@@ -0,0 +1,100 @@
+import os
+import signal
+import tempfile
+import time
+import unittest
+import urllib.request
+
+from pna.server import bind, PreforkServer
+
+
+def app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [str(os.getpid()).encode()]
+
+
+class TestPreforkServer(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.ready_file = os.path.join(self.dir.name, 'ready')
+        self.master = None
+
+    def serve(self, warm_up=None):
+        listener = bind(('127.0.0.1', 0))
+        self.url = f'http://127.0.0.1:{listener.getsockname()[1]}/'
+        self.master = os.fork()
+        if self.master == 0:
+            try:
+                server = PreforkServer(
+                    app, listener, workers=2, graceful_timeout=5.,
+                    ready_file=self.ready_file, warm_up=warm_up,
+                    log=lambda x: None)
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        listener.close()
+
+    def tearDown(self):
+        try:
+            if self.master is not None:
+                os.kill(self.master, signal.SIGTERM)
+                os.waitpid(self.master, 0)
+        except (ProcessLookupError, ChildProcessError):
+            pass  # already stopped by the test
+        self.dir.cleanup()
+
+    def wait_for(self, condition, timeout=10.):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def get(self):
+        try:
+            with urllib.request.urlopen(self.url) as response:
+                return response.read()
+        except OSError:
+            return None
+
+    def test_serves_from_workers(self):
+        self.serve()
+        self.wait_for(lambda: os.path.exists(self.ready_file))
+        pids = set()
+        for _ in range(20):
+            with urllib.request.urlopen(self.url) as response:
+                pids.add(int(response.read()))
+        self.assertNotIn(self.master, pids)
+
+    def test_shutdown(self):
+        self.serve()
+        self.wait_for(lambda: os.path.exists(self.ready_file))
+        os.kill(self.master, signal.SIGTERM)
+        _, status = os.waitpid(self.master, 0)
+        self.assertEqual(0, status)
+        self.assertFalse(os.path.exists(self.ready_file))
+
+    def test_serves_while_warming_up(self):
+        loaded = os.path.join(self.dir.name, 'loaded')
+
+        def warm_up():
+            while not os.path.exists(loaded):
+                time.sleep(0.05)
+
+        self.serve(warm_up)
+        self.wait_for(lambda: self.get() is not None)
+        self.assertFalse(os.path.exists(self.ready_file))
+        open(loaded, 'w').close()
+        self.wait_for(lambda: os.path.exists(self.ready_file))
+
+    def test_replaces_worker_failing_to_warm_up(self):
+        failed = os.path.join(self.dir.name, 'failed')
+
+        def warm_up():
+            if not os.path.exists(failed):
+                open(failed, 'w').close()
+                raise RuntimeError('no corpus')
+
+        self.serve(warm_up)
+        self.wait_for(lambda: os.path.exists(self.ready_file))
+        self.assertTrue(os.path.exists(failed))
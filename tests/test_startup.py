@@ -0,0 +1,46 @@
+import subprocess
+import sys
+import unittest
+
+from pna.startup import Startup
+
+
+class TestStartup(unittest.TestCase):
+
+    def setUp(self):
+        self.logged = []
+        self.startup = Startup(started=0., budget=1.,
+                               log=self.logged.append)
+
+    def test_phases(self):
+        self.startup.done('imports', 0.25)
+        with self.startup.phase('corpus'):
+            pass
+        self.assertFalse(self.startup.ready)
+        self.startup.finish()
+        self.assertTrue(self.startup.ready)
+        self.assertEqual(['imports', 'corpus'], list(self.startup.phases))
+        self.assertAlmostEqual(0.25, self.startup.seconds, places=2)
+        stats = self.startup.stats()
+        self.assertEqual(1, stats['ready'])
+        self.assertEqual(0.25, stats['imports_seconds'])
+        self.assertIn('corpus_seconds', stats)
+
+    def test_over_budget(self):
+        self.startup.done('corpus', 2.)
+        self.startup.finish()
+        self.assertIn('over its budget', self.logged[-1])
+
+    def test_within_budget(self):
+        self.startup.done('corpus', .5)
+        self.startup.finish()
+        self.assertNotIn('over its budget', self.logged[-1])
+
+    def test_app_import_is_lazy(self):
+        # plotly.express is only imported once a figure is made
+        out = subprocess.run(
+            [sys.executable, '-c',
+             'import sys; from pna import init_app; '
+             'print("plotly.express" in sys.modules)'],
+            capture_output=True, text=True, check=True).stdout
+        self.assertEqual('False', out.strip())
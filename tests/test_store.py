@@ -0,0 +1,50 @@
+import os
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+
+from pna.store import DiskStore, MemoryStore
+
+
+class TestMemoryStore(unittest.TestCase):
+
+    def test_put_and_get(self):
+        store = MemoryStore()
+        df = pd.DataFrame({'Count': [1, 2]})
+        key = store.put({'df': df})
+        self.assertLess(len(key), 16)
+        pd.testing.assert_frame_equal(df, store.get(key)['df'])
+
+    def test_unknown_key(self):
+        self.assertIsNone(MemoryStore().get('nope'))
+
+
+class TestDiskStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_put_and_get(self):
+        store = DiskStore(self.dir.name)
+        df = pd.DataFrame({'Count': [1, 2]})
+        key = store.put(df)
+        # visible to another instance, e.g. in another worker
+        pd.testing.assert_frame_equal(df, DiskStore(self.dir.name).get(key))
+
+    def test_rejects_paths(self):
+        store = DiskStore(os.path.join(self.dir.name, 'store'))
+        self.assertIsNone(store.get('../secret'))
+
+    def test_expiry(self):
+        store = DiskStore(self.dir.name, ttl=0.01)
+        key = store.put('value')
+        time.sleep(0.02)
+        self.assertIsNone(store.get(key))
+        store.put('value')
+        time.sleep(0.02)
+        self.assertEqual(1, store.sweep())
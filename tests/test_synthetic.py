@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+
+from pna.dbi import Dbi
+from pna.logic import PhillipinesEmbassyLogic
+from pna.synthetic import sizes, write_corpus
+
+
+class TestSynthetic(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        write_corpus(self.dir.name, tweets=200, entities=10, words=50,
+                     days=30)
+        self.logic = PhillipinesEmbassyLogic(
+            Dbi(), bundle_dir=os.path.join(self.dir.name, 'bundle'),
+            data_dir=self.dir.name)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_sizes(self):
+        self.assertEqual(dict(tweets=20000, entities=379, words=4743,
+                              days=500), sizes(10))
+
+    def test_corpus(self):
+        counts = self.logic.entity_counts().set_index('Entity').Count
+        self.assertEqual(10, len(counts))
+        # the most mentioned entity comes first
+        self.assertEqual('entity0', counts.index[0])
+        attention = self.logic.entity_counts_over_time('entity0')
+        self.assertEqual(30, len(attention))
+        self.assertEqual(counts['entity0'], attention.Count.sum())
+        self.assertEqual(('2020-01-01', '2020-01-30'),
+                         self.logic.date_range())
+        self.assertEqual(200, self.logic.corpus_volume_over_time().Count.sum())
+
+    def test_sentences(self):
+        df = self.logic.sentences('entity0')
+        self.assertTrue(len(df))
+        self.assertEqual(sorted(df.Date, reverse=True), list(df.Date))
+        self.assertTrue(len(self.logic.search_sentences('entity0', ['word0'])))
+
+    def test_search(self):
+        df = self.logic.search_sentences('entity0', ['word1'])
+        self.assertTrue(len(df))
+        self.assertTrue(all('word1' in s.split() for s in df.Sentence))
+
+    def test_profile(self):
+        df = self.logic.liwc_profile('entity0')
+        self.assertEqual(7, len(df))
+        self.assertTrue((df.n_tokens_entity_cat <= df.n_tokens_cat).all())
@@ -0,0 +1,74 @@
+import io
+import unittest
+
+import pandas as pd
+
+from pna import table
+
+
+class TestTable(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'Date': ['2021-05-01', '2021-05-02', '2021-06-01', '2021-06-02'],
+            'Url': ['a/1', 'b/2', 'a/3', 'b/4'],
+            'Likes': [3, 0, 3, 10],
+        })
+
+    def test_parse_filter(self):
+        self.assertEqual(
+            [('Likes', 'ge', 3), ('Url', 'contains', 'a/'),
+             ('Date', 'datestartswith', '2021-06')],
+            table.parse_filter(
+                '{Likes} >= 3 && {Url} contains "a/" '
+                '&& {Date} datestartswith 2021-06'))
+        self.assertEqual([], table.parse_filter(None))
+        self.assertEqual([], table.parse_filter('{Likes} ~ 3'))
+
+    def test_parse_sort(self):
+        self.assertEqual(
+            [('Likes', False), ('Date', True)],
+            table.parse_sort([
+                {'column_id': 'Likes', 'direction': 'desc'},
+                {'column_id': 'Date', 'direction': 'asc'}]))
+
+    def test_query(self):
+        df = table.query(
+            self.df,
+            sort=[('Likes', False), ('Date', True)],
+            filters=[('Likes', 'gt', 0), ('Nope', 'eq', 1)])
+        self.assertEqual(['b/4', 'a/1', 'a/3'], list(df.Url))
+        df = table.query(self.df, filters=[('Date', 'eq', '2021-05-02')])
+        self.assertEqual(['b/2'], list(df.Url))
+        df = table.query(self.df, filters=[('Likes', 'eq', '3')])
+        self.assertEqual(['a/1', 'a/3'], list(df.Url))
+        df = table.query(self.df, filters=[('Url', 'contains', 'B/')])
+        self.assertEqual(['b/2', 'b/4'], list(df.Url))
+
+    def test_page(self):
+        records, page_count = table.page(
+            self.df, 1, 3,
+            sort_by=[{'column_id': 'Likes', 'direction': 'asc'}])
+        self.assertEqual(2, page_count)
+        self.assertEqual([{'Date': '2021-06-02', 'Url': 'b/4', 'Likes': 10}],
+                         records)
+        records, page_count = table.page(
+            self.df, 0, 3, filter_query='{Likes} > 100')
+        self.assertEqual(([], 1), (records, page_count))
+
+    def test_csv_chunks(self):
+        text = ''.join(table.csv_chunks(table.chunks(self.df, size=3)))
+        self.assertEqual(self.df.to_csv(index=False), text)
+        text = ''.join(table.csv_chunks(table.chunks(self.df.iloc[:0])))
+        self.assertEqual('Date,Url,Likes\n', text)
+
+    def test_parquet_chunks(self):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            self.skipTest('pyarrow is not available')
+        data = b''.join(table.parquet_chunks(table.chunks(self.df, size=3)))
+        pd.testing.assert_frame_equal(
+            self.df, pq.read_table(io.BytesIO(data)).to_pandas())
+        self.assertEqual(
+            2, pq.ParquetFile(io.BytesIO(data)).metadata.num_row_groups)